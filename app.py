@@ -1,143 +1,41 @@
 from unicodedata import category
-from flask import Flask, render_template, jsonify, request, redirect, url_for, flash
+from flask import Flask, Response, render_template, jsonify, request, redirect, url_for, flash, stream_with_context
 from config_loader import Config
 from db import get_cursor
 from email_fetcher import connect_to_imap, fetch_emails
 from categories import category_map, email_map
-from extract_mail_data import extract_transaction_data, parse_email_content
+from extract_mail_data import classify_email, parse_email_content
 from handlers import handle_upi_email
+from email_headers import message_id_from_bytes, parse_headers
+from records import TransactionRecord
+from bulk_writer import bulk_insert, summarise as bulk_summarise, INSERTED, DUPLICATE, FAILED
+from seen_filter import seen_ids
+from pagination import MAX_PAGE_SIZE, InvalidCursor, decode_cursor, keyset_before, split_page
+import categoriser
+import metadata_cache
+import exporter
+import json_fast
+import search
+from sender_index import index as sender_index
+from quarantine import quarantine, store as quarantine_store
+from pattern_registry import registry as pattern_registry, PatternRegistryError
 import logging
-from logging.handlers import RotatingFileHandler
+from logging_setup import configure_logging, sampler as log_sampler, log_stage_summary
 from datetime import datetime, timezone
 import os
 from dotenv import load_dotenv
 import time
 import functools
 import re
-import hashlib
 import sys, pdb 
 import db
 
-def process_transaction_email(subject, body, sender_email, email_date_tms,cursor):
-    """
-    Process a transaction email and insert into the transactions table.
-    Normalizes and assigns defaults to required fields.
-    """
-    #pdb.Pdb(stdout=sys.__stdout__).set_trace()
-
-    txn_data = extract_transaction_data(body)
-
-    # ✅ make sure we have a dictionary
-    if not isinstance(txn_data, dict):
-       logger.warning("No transaction data extracted; skipping this email.")
-       return False
-
-    # Assign defaults and normalize fields
-    required_keys = ["imap_server", "merchant_name", "transactiontype", "message_id"]
-    # Set default values if missing
-    for key in required_keys:
-        if key not in txn_data or txn_data[key] in [None, ""]:
-            if key == "imap_server":
-                txn_data[key] = IMAP_SERVER if 'IMAP_SERVER' in globals() else ""
-            elif key == "merchant_name":
-                txn_data[key] = "unknown"
-            elif key == "transactiontype":
-                txn_data[key] = "debit"
-            elif key == "message_id":
-                # Generate a message_id if not present (use subject, email_timestamp, merchant_name)
-                subject = txn_data.get("subject", "")
-                email_timestamp = txn_data.get("email_timestamp", "")
-                merchant_name = txn_data.get("merchant_name", "")
-                unique_str = f"{subject}{email_timestamp}{merchant_name}"
-                txn_data[key] = hashlib.sha256(unique_str.encode('utf-8')).hexdigest()
-
-    #pdb.Pdb(stdout=sys.__stdout__).set_trace()
-    # Normalize transactiontype
-    txn_data["transactiontype"] = normalize_transaction_type(txn_data.get("transactiontype"))
-
-    # Ensure email_timestamp is set (default to now if missing)
-    if not txn_data.get("email_timestamp"):
-        txn_data["email_timestamp"] = email_date_tms
-
-    # Log warnings for missing fields before validation
-    missing_fields = [k for k in required_keys if not txn_data.get(k)]
-    if missing_fields:
-        logger.warning(f"Transaction missing fields {missing_fields}: {txn_data}")
-    #if not is_valid_transaction(txn_data):
-    #    logger.warning(f"Transaction missing critical fields or invalid: {txn_data}")
-        return False
-    inserted = insert_transaction_to_db(txn_data, cursor)
-    if inserted:
-        logger.info(f"Transaction inserted successfully: {txn_data.get('message_id')}")
-        return True
-    else:
-        logger.error(f"Failed to insert transaction for message_id: {txn_data.get('message_id')}")
-        return False
-
-def process_bill_email(txn_data, cursor):
-    """
-    Process a bill email and insert into the bills table.
-    """
-    # The keys and normalization logic are similar to transaction, but use insert_bill_to_db
-    required_keys = ["amount", "merchant_name", "transactiontype", "category", "subject", "message_id"]
-    # Add missing fields with defaults for validation
-    for key in required_keys:
-        if key not in txn_data:
-            if key == "merchant_name":
-                txn_data[key] = "unknown"
-            elif key == "transactiontype":
-                txn_data[key] = "debit"
-            elif key == "category":
-                txn_data[key] = "unknown"
-            elif key == "subject":
-                txn_data[key] = ""
-            elif key == "message_id":
-                txn_data[key] = ""
-            elif key == "amount":
-                txn_data[key] = 0.0
-    inserted = insert_bill_to_db(txn_data, cursor)
-    if inserted:
-        logger.info(f"Bill inserted successfully: {txn_data.get('message_id')}")
-        return True
-    else:
-        logger.error(f"Failed to insert bill for message_id: {txn_data.get('message_id')}")
-        return False
-
-def process_statement_email(txn_data, cursor):
-    """
-    Process a statement email and insert into the loans/statements table.
-    """
-    try:
-        from db import insert_loan_to_db
-        inserted = insert_loan_to_db(txn_data, cursor)
-        if inserted:
-            logger.info(f"Statement/loan inserted successfully: {txn_data.get('message_id')}")
-            return True
-        else:
-            logger.error(f"Failed to insert statement/loan for message_id: {txn_data.get('message_id')}")
-            return False
-    except Exception as e:
-        logger.error(f"Error processing statement email: {e}", exc_info=True)
-        return False
-
-def process_dividend_email(txn_data, cursor):
-    """
-    Process a dividend email. Placeholder for actual implementation.
-    """
-    logger.warning(f"Dividend email processing not implemented. txn_data: {txn_data}")
-    return False
-
 config = Config()
 app_conf = config.app
 app = Flask(__name__)
 
-if not os.path.exists('logs'):
-    os.makedirs('logs')
-file_handler = RotatingFileHandler('logs/app.log', maxBytes=10240, backupCount=5)
-file_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s: %(message)s'))
-file_handler.setLevel(logging.DEBUG)
-app.logger.addHandler(file_handler)
-app.logger.setLevel(logging.DEBUG)
+# Queue-based handlers on the root logger; the file is written by a listener thread
+configure_logging()
 logger = app.logger
 
 def retry(exceptions, tries=3, delay=2, backoff=2, logger=None):
@@ -192,99 +90,6 @@ def normalize_amount(amount):
     else:
         return None
 
-def normalize_transaction_type(transaction_type_value):
-    """Map various transaction type strings to one of: debit, credit, upi."""
-    if not transaction_type_value:
-        return "debit"
-    t = str(transaction_type_value).lower()
-    if "credit" in t:
-        return "credit"
-    if "upi" in t:
-        return "upi"
-    return "debit"
-
-def insert_transaction_to_db(txn_data, cursor):
-    try:
-        #pdb.Pdb(stdout=sys.__stdout__).set_trace()
-        # Use a savepoint so a single bad row doesn't abort the whole batch
-        try:
-            cursor.execute("SAVEPOINT sp_txn")
-        except Exception:
-            logger.warning(f"transaction data: {txn_data}")
-        cursor.execute("""
-            INSERT INTO transactions (amount, merchant_name, transactiontype, category, subject, imap_server, message_id, currency, email_timestamp, card_number)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (message_id) DO NOTHING
-        """, (
-            txn_data.get("amount"),
-            txn_data.get("merchant_name"),
-            txn_data.get("transactiontype"),
-            txn_data.get("category"),
-            txn_data.get("subject"),
-            txn_data.get("imap_server"),
-            txn_data.get("message_id"),
-            txn_data.get("currency", "INR"),
-            txn_data.get("email_timestamp"),
-            txn_data.get("card_number") or "0000"
-        ))
-        if cursor.rowcount == 0:
-            logger.warning(f"Duplicate message_id skipped: {txn_data.get('message_id')}")
-            return False
-        return True
-    except Exception as e:
-        try:
-            cursor.execute("ROLLBACK TO SAVEPOINT sp_txn")
-        except Exception:
-            pass
-        logger.error(f"Failed to insert transaction to DB: {e}", exc_info=True)
-        return False
-
-
-# --- Insert Bill to DB ---
-def insert_bill_to_db(bill_data, cursor):
-    """
-    Insert a bill record into the bills table, skipping duplicates by message_id.
-    Returns True if inserted, False otherwise.
-    """
-    required_keys = ["amount", "merchant_name", "transactiontype", "category", "subject", "message_id"]
-    for key in required_keys:
-        if key not in bill_data or bill_data[key] in [None, ""]:
-            logger.warning(f"Invalid bill data skipped (missing {key}): {bill_data}")
-            return False
-    try:
-        # Use a savepoint so a single bad row doesn't abort the whole batch
-        #pdb.Pdb(stdout=sys.__stdout__).set_trace()
-        try:
-            cursor.execute("SAVEPOINT sp_bill")
-        except Exception:
-            pass
-        cursor.execute("""
-            INSERT INTO bills (amount, merchant_name, transactiontype, category, subject, message_id, currency, email_timestamp, card_number)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (message_id) DO NOTHING
-        """, (
-            bill_data.get("amount"),
-            bill_data.get("merchant_name"),
-            bill_data.get("transactiontype"),
-            bill_data.get("category"),
-            bill_data.get("subject"),
-            bill_data.get("message_id"),
-            bill_data.get("currency", "INR"),
-            bill_data.get("email_timestamp"),
-            bill_data.get("card_number") or "0000"
-        ))
-        if cursor.rowcount == 0:
-            logger.warning(f"Duplicate bill message_id skipped: {bill_data.get('message_id')}")
-            return False
-        return True
-    except Exception as e:
-        try:
-            cursor.execute("ROLLBACK TO SAVEPOINT sp_bill")
-        except Exception:
-            pass
-        logger.error(f"Failed to insert bill to DB: {e}", exc_info=True)
-        return False
-
 @app.route('/')
 def index():
     return render_template("index.html")
@@ -293,6 +98,11 @@ def index():
 def health():
     return jsonify({"status": "ok"}), 200
 
+@app.route('/health/db', methods=['GET'])
+def db_health():
+    """Connection pool metrics: checkout waits, active/idle connections, errors."""
+    return jsonify(db.pool_stats()), 200
+
 @app.route('/test', methods=['GET'])
 def test():
     return jsonify({"result": "success"})
@@ -300,7 +110,7 @@ def test():
 @app.route('/status', methods=['GET'])
 def status_page():
     try:
-        with get_cursor() as (cursor, conn):
+        with get_cursor(readonly=True) as (cursor, conn):
             cursor.execute("SELECT COUNT(*) AS count FROM bank_emails")
             record_count = cursor.fetchone()['count']
             cursor.execute("SELECT MAX(email_date) AS newest, MIN(email_date) AS oldest FROM bank_emails")
@@ -382,6 +192,10 @@ def parse_fetch_params(request):
     else:
         keywords = default_keywords
 
+    # Server-side FROM filter on the senders in email_map; "all" fetches every sender
+    senders = params.get('senders')
+    from_criteria = None if str(senders or '').strip().lower() in ('all', '*') else sender_index.imap_from_criteria()
+
     return {
         "n_days": n_days,
         "start_date": parsed_start_date,
@@ -389,6 +203,7 @@ def parse_fetch_params(request):
         "start_index": start_index,
         "batch_size": batch_size,
         "keywords": keywords,
+        "from_criteria": from_criteria,
     }
 
 def connect_imap_with_retry(imap_server):
@@ -404,70 +219,120 @@ def connect_imap_with_retry(imap_server):
         return jsonify({"error": "Failed to connect/login to IMAP server."}), 502
 
 def assign_email_category(subject, body, sender_email):
-    # Remove debug statements and fix logic
-    sender_email_lower = (sender_email or "").strip().lower()
-    # Check sender_email against email_map for each category
-    if sender_email_lower:
-        # Banks
-        for addr in email_map.get("banks", []):
-            if sender_email_lower == addr.strip().lower():
-                return "transaction"
-        # Amazon
-        for addr in email_map.get("amazon", []):
-            if sender_email_lower == addr.strip().lower():
-                return "amazon"
-        # Dmat
-        for addr in email_map.get("dmat", []):
-            if sender_email_lower == addr.strip().lower():
-                return "dmat"
-
-    return "unknown"
+    """Category of the sender per email_map ("transaction" for banks), or "unknown"."""
+    category = sender_index.category(sender_email)
+    if category == "banks":
+        return "transaction"
+    return category or "unknown"
+
+
+def write_records(cursor, table, columns, rows):
+    """Bulk insert rows into table; logs the outcome and returns how many were inserted."""
+    if not rows:
+        return 0
+    statuses = bulk_insert(cursor, table, columns, rows)
+    counts = bulk_summarise(statuses)
+    logger.info("Wrote %d %s row(s): %s", len(rows), table, counts)
+    key_index = list(columns).index("message_id")
+    for row, status in zip(rows, statuses):
+        if status == DUPLICATE and log_sampler.allow("duplicate"):
+            logger.warning("Duplicate message_id skipped: %s", row[key_index])
+    seen_ids.add_many(row[key_index] for row, status in zip(rows, statuses) if status != FAILED)
+    return counts.get(INSERTED, 0)
+
+
+# Columns ingestion writes to email_notices for statement and dividend emails
+NOTICE_COLUMNS = ("kind", "subject", "sender_email", "message_id", "email_timestamp")
 
 
 def process_email_chunk(chunk, cursor):
     """
-    Processes a list of raw email bytes, parses each, extracts transactions,
-    normalizes fields, chooses the correct processor, and returns count processed.
+    Processes a list of raw email bytes: parses each, classifies and extracts it in a
+    single pass (transaction, bill, statement or dividend), then writes each kind to
+    its table after the whole chunk is classified, with one bulk merge per table
+    (bulk_writer); statements and dividends go to email_notices. Emails whose
+    Message-ID is already stored are dropped up front, from their headers alone.
+    Returns the count stored.
     """
-    from email.parser import BytesParser
-    from email import policy
     count = 0
 
-    mail_data = []
-    for raw_bytes in chunk:
+    # Bloom filter first: only possible hits go to the DB, in one query for the chunk.
+    # Known emails skip body decoding and extraction.
+    message_ids = [message_id_from_bytes(raw_bytes) for raw_bytes in chunk]
+    candidates = {mid for mid in message_ids if mid and seen_ids.might_contain(mid)}
+    known = db.get_known_message_ids(cursor, candidates) if candidates else set()
+    if known:
+        logger.info("Skipping %d of %d emails already stored", sum(mid in known for mid in message_ids), len(chunk))
+
+    pending = {"transaction": [], "bill": [], "statement": [], "dividend": []}
+    for raw_bytes, message_id in zip(chunk, message_ids):
+        if message_id in known:
+            continue
         try:
-            msg = BytesParser(policy=policy.default).parsebytes(raw_bytes)
-            message_id = msg.get('Message-ID')
-            logger.debug(f"Using parse_email_content from: {parse_email_content}")
             try:
                 subject, body, sender_email, email_date = parse_email_content(raw_bytes)
-                logger.warning(f"Parsed data {subject}, {sender_email}, {email_date}")
+                if log_sampler.allow("parse"):
+                    logger.debug("Parsed data %s, %s, %s", subject, sender_email, email_date)
             except Exception as e:
-                raw_headers = msg.items()
-                logger.warning(f"Failed to parse email content: {e}. Raw headers: {raw_headers}, Raw bytes length: {len(raw_bytes)}")
+                logger.warning("Failed to parse email content: %s. Raw headers: %s, Raw bytes length: %d",
+                               e, parse_headers(raw_bytes).items(), len(raw_bytes))
                 subject = ""
                 body = ""
                 sender_email = ""
+                email_date = None
             
             email_category = assign_email_category(subject, body, sender_email)
-            print(f"email_category: {email_category}")
+            if log_sampler.allow("category"):
+                logger.debug("email_category: %s", email_category)
 
             if email_category == "unknown":
                 continue
-            elif email_category == "transaction":
-                process_transaction_email(subject, body, sender_email, email_date,cursor)
-            elif email_category == "bills":
-                process_bill_email(subject, body, sender_email, email_date,cursor)
-            elif email_category == "statement":
-                process_statement_email(cursor)
-            elif email_category == "divident":
-                process_dividend_email(cursor)
-          
-            else:  
-                logger.warning(f"Failed to extract transaction data for email with Message-ID: {message_id}")
+            elif email_category not in ("transaction", "dmat"):
+                if log_sampler.allow("unhandled_sender"):
+                    logger.warning("Failed to extract transaction data for email with Message-ID: %s", message_id)
+                continue
+
+            kind, data = classify_email(body, subject)
+            if kind in ("transaction", "bill"):
+                pending[kind].append(TransactionRecord.from_extracted(
+                    data,
+                    subject=subject,
+                    email_timestamp=email_date,
+                    message_id=message_id,
+                    imap_server=IMAP_SERVER if 'IMAP_SERVER' in globals() else "",
+                ))
+            elif kind is not None:
+                data.update(kind=kind, sender_email=sender_email, email_timestamp=email_date, message_id=message_id)
+                pending[kind].append(data)
+            elif log_sampler.allow("unmatched"):
+                logger.warning("Failed to extract transaction data for email with Message-ID: %s", message_id)
         except Exception as e:
-            logger.error(f"Error processing email: {e}", exc_info=True)
+            logger.error("Error processing email: %s", e, exc_info=True)
+            quarantine("failed", raw_bytes)
             continue
+
+    # Rules, then one batched model call, for everything the patterns left uncategorised
+    categoriser.categorise_records(pending["transaction"] + pending["bill"])
+    metadata_cache.register_categories(cursor, {txn.category for txn in pending["transaction"]})
+
+    # Transactions and bills: one staged multi-row merge per table
+    inserted = write_records(cursor, "transactions", TransactionRecord.INSERT_COLUMNS,
+                             [txn.insert_params() for txn in pending.pop("transaction")])
+    if inserted:
+        metadata_cache.cache.invalidate("date_bounds")
+    count += inserted
+    bills = []
+    for bill in pending.pop("bill"):
+        if bill.amount is None:
+            logger.warning("Invalid bill data skipped (missing amount): %r", bill)
+        else:
+            bills.append(bill)
+    count += write_records(cursor, "bills", TransactionRecord.BILL_COLUMNS,
+                           [bill.bill_params() for bill in bills])
+
+    notices = [tuple(item[column] for column in NOTICE_COLUMNS)
+               for kind in ("statement", "dividend") for item in pending.pop(kind)]
+    count += write_records(cursor, "email_notices", NOTICE_COLUMNS, notices)
     return count
 
 
@@ -501,7 +366,8 @@ def fetch_emails_route():
             start_date=start_date,
             end_date=end_date,
             keywords=keywords,
-            search_fields=["SUBJECT", "BODY"]
+            search_fields=["SUBJECT", "BODY"],
+            from_criteria=params.get("from_criteria")
         )
         #pdb.Pdb(stdout=sys.__stdout__).set_trace()
 
@@ -510,13 +376,30 @@ def fetch_emails_route():
             return jsonify({"saved": 0, "message": "No emails found for the given filter.", "filter": filter_info})
         count = 0
         with get_cursor() as (cursor, conn):
+            try:
+                seen_ids.ensure_warm(conn)
+            except Exception as e:
+                # Without the filter every Message-ID is simply checked against the DB
+                logger.warning("Could not warm seen-filter: %s", e)
+                conn.rollback()
+            try:
+                db.ensure_partitions(cursor)
+            except Exception as e:
+                # Rows for a missing month land in the default partition until it exists
+                logger.warning("Could not create upcoming partitions: %s", e)
+                conn.rollback()
             for i in range(0, len(raw_emails), CHUNK_SIZE):
                 chunk = raw_emails[i:i+CHUNK_SIZE]
                 processed_count = process_email_chunk(chunk, cursor)
                 count += processed_count
             conn.commit()
         filter_info = f"last {n_days} days" if n_days else f"{start_date.isoformat()} to {end_date.isoformat()}" if start_date else "no filter"
-        logger.info(f"Saved {count} email transactions to database.")
+        log_stage_summary(logger)
+        try:
+            seen_ids.save()
+        except OSError as e:
+            logger.warning("Could not snapshot seen-filter: %s", e)
+        logger.info("Saved %d email transactions to database.", count)
         return jsonify({"saved": count, "message": "Email transactions saved to database", "filter": filter_info})
     except Exception as e:
         logger.error(f"Error fetching emails: {e}", exc_info=True)
@@ -539,10 +422,14 @@ def cleanup_emails():
     #logger.info(f"Authorized cleanup request from IP: {ip_addr}")
     try:
         with get_cursor() as (cursor, conn):
-            cursor.execute("DELETE FROM transactions;")
-            transactions_deleted = cursor.rowcount
-            cursor.execute("DELETE FROM bills;")
-            bills_deleted = cursor.rowcount
+            cursor.execute("SELECT (SELECT COUNT(*) FROM transactions) AS transactions, (SELECT COUNT(*) FROM bills) AS bills")
+            counts = cursor.fetchone()
+            transactions_deleted = counts['transactions']
+            bills_deleted = counts['bills']
+            # TRUNCATE leaves no dead tuples behind (and empties every partition); it fires
+            # no DELETE triggers, so the monthly rollup is emptied with it
+            cursor.execute("TRUNCATE transactions, bills, transaction_monthly_rollup")
+            metadata_cache.cache.invalidate("date_bounds")
             #cursor.execute("DELETE FROM loans;")
             #loans_deleted = cursor.rowcount
             conn.commit()
@@ -555,16 +442,59 @@ def cleanup_emails():
     except Exception as e:
         logger.error(f"Error cleaning up emails: {e}", exc_info=True)
         return jsonify({"error": "Failed to clean up emails"}), 500
-    
+
+@app.route('/admin/patterns/reload', methods=['POST'])
+def reload_patterns():
+    """Recompile patterns.yaml and swap it in without a restart."""
+    token = request.headers.get('X-ADMIN-TOKEN')
+    if not ADMIN_TOKEN or token != ADMIN_TOKEN:
+        logger.warning(f"Unauthorized attempt to reload patterns from IP: {request.remote_addr}")
+        return jsonify({"error": "Unauthorized"}), 401
+    try:
+        pattern_set = pattern_registry.reload()
+    except PatternRegistryError as e:
+        logger.error(f"Pattern reload rejected: {e}")
+        return jsonify({"error": "Pattern file rejected", "problems": e.problems}), 400
+    return jsonify({
+        "version": pattern_set.version,
+        "transactions": len(pattern_set.transactions),
+        "bills": len(pattern_set.bills),
+        "message": "Patterns reloaded."
+    })
+
+@app.route('/admin/quarantine', methods=['GET'])
+def quarantined_emails():
+    """Recently quarantined (unmatched/failed) emails for pattern authors. ?reason=&contains=&limit="""
+    token = request.headers.get('X-ADMIN-TOKEN')
+    if not ADMIN_TOKEN or token != ADMIN_TOKEN:
+        logger.warning(f"Unauthorized attempt to read quarantine from IP: {request.remote_addr}")
+        return jsonify({"error": "Unauthorized"}), 401
+    limit = max(1, min(request.args.get('limit', type=int) or 50, 500))
+    entries = quarantine_store.recent(limit=limit, reason=request.args.get('reason'),
+                                      contains=request.args.get('contains'))
+    return jsonify({"stats": quarantine_store.stats(), "dropped": quarantine_store.dropped, "entries": entries})
+
+# Fields of each transaction in the /transactions JSON response, in order
+TRANSACTION_JSON_COLUMNS = (
+    "date", "amount", "merchant_name", "transactiontype", "card_number", "category", "account_name", "account_type",
+)
+BILL_JSON_COLUMNS = ("date", "amount", "merchant_name", "transactiontype", "card_number", "category", "subject")
+
 @app.route('/transactions', methods=['GET'])
 def transactions_page():
-    class TransactionObj:
-        def __init__(self, data):
-            self.__dict__.update(data)
-
+    """
+    Newest transactions first, one page at a time. Pass the `next` token from the
+    previous page as ?after= to continue; pages are keyset-paginated on
+    (email_timestamp, id) so deep pages cost the same as the first. JSON responses
+    take ?shape=columns for one array per field.
+    """
     try:
-        limit = request.args.get('limit', type=int) or 100
-        offset = request.args.get('offset', type=int, default=0)
+        limit = max(1, min(request.args.get('limit', type=int) or 100, MAX_PAGE_SIZE))
+        after = request.args.get('after', '')
+        try:
+            cursor_key = decode_cursor(after, 2) if after else None
+        except InvalidCursor as e:
+            return jsonify({"error": str(e)}), 400
 
         # Detect JSON request
         accept = request.headers.get("Accept", "")
@@ -572,103 +502,216 @@ def transactions_page():
             "application/json" in part for part in accept.split(",")
         )
 
-        with get_cursor() as (cursor, conn):
-            # Fetch distinct categories
-            cursor.execute("SELECT DISTINCT category FROM transactions")
-            categories = [row['category'] for row in cursor.fetchall() if row['category']]
+        with get_cursor(readonly=True) as (cursor, conn):
+            # Filter/label metadata from the in-process cache, not a scan of transactions
+            accounts_by_number = metadata_cache.accounts(cursor)
 
             category_filter = request.args.get('category', '')
 
-            # Base query with LEFT JOIN to accounts table based on account_number
-            base_query = """
-                SELECT t.email_timestamp, t.amount, t.merchant_name, t.transactiontype,
-                       t.card_number, t.category, a.account_name, a.account_type
-                FROM transactions t
-                LEFT JOIN accounts a ON t.card_number = a.account_number
-            """
+            # Account name/type are filled in from the cached accounts below
+            if use_json:
+                # Output-ready values straight from the query; no per-row Python formatting
+                base_query = """
+                    SELECT t.id, t.email_timestamp,
+                           COALESCE(TO_CHAR(t.email_timestamp, 'MM-DD-YYYY HH24:MI:SS'), '') AS date,
+                           t.amount, COALESCE(t.merchant_name, 'unknown') AS merchant_name, t.transactiontype,
+                           t.card_number, COALESCE(t.category, 'unknown') AS category
+                    FROM transactions t
+                """
+            else:
+                base_query = """
+                    SELECT t.id, t.email_timestamp, t.amount, t.merchant_name, t.transactiontype,
+                           t.card_number, t.category
+                    FROM transactions t
+                """
+            conditions = []
             params = []
             if category_filter:
-                base_query += " WHERE t.category = %s"
+                conditions.append("t.category = %s")
                 params.append(category_filter)
+            if cursor_key:
+                conditions.append(keyset_before("t.email_timestamp", "t.id", cursor_key, params))
+            if conditions:
+                base_query += " WHERE " + " AND ".join(conditions)
 
-            base_query += " ORDER BY t.email_timestamp DESC"
-            if limit is not None:
-                base_query += " LIMIT %s"
-                params.append(limit)
-            if offset:
-                base_query += " OFFSET %s"
-                params.append(offset)
+            # NULL timestamps sort first, as ORDER BY ... DESC always did
+            base_query += " ORDER BY t.email_timestamp DESC, t.id DESC LIMIT %s"
+            params.append(limit + 1)
 
             cursor.execute(base_query, tuple(params))
-            transactions = cursor.fetchall()
-
-            # Ensure all fields have defaults if missing
-            formatted_transactions = []
-            for txn in transactions:
-                txn_data = {
-                    "email_timestamp": txn.get('email_timestamp'),
-                    "amount": txn.get('amount', 0.0),
-                    "merchant_name": txn.get('merchant_name', "unknown"),
-                    "transactiontype": txn.get('transactiontype', "debit"),
-                    "card_number": txn.get('card_number') if txn.get('card_number') else "-",
-                    "category": txn.get('category', "unknown"),
-                    "account_name": txn.get('account_name') or "-",
-                    "account_type": txn.get('account_type') or "-",
-                }
-                formatted_transactions.append(TransactionObj(txn_data))
+            rows, next_token = split_page(cursor.fetchall(), limit, key=lambda row: (row['email_timestamp'], row['id']))
 
+            no_account = {"account_name": None, "account_type": None}
             if use_json:
-                return jsonify([
-                    {
-                        "date": txn.email_timestamp.strftime("%m-%d-%Y %H:%M:%S") if txn.email_timestamp else "",
-                        "amount": txn.amount,
-                        "merchant_name": txn.merchant_name,
-                        "transactiontype": txn.transactiontype,
-                        "card_number": txn.card_number,
-                        "category": txn.category,
-                        "account_name": txn.account_name,
-                        "account_type": txn.account_type,
-                    }
-                    for txn in formatted_transactions
-                ])
+                for txn in rows:
+                    account = accounts_by_number.get(txn['card_number'], no_account)
+                    txn['account_name'] = account['account_name'] or "-"
+                    txn['account_type'] = account['account_type'] or "-"
+                    txn['card_number'] = txn['card_number'] or "-"
+                shape = request.args.get('shape', 'rows')
+                return json_fast.response({
+                    "transactions": json_fast.shape_rows(rows, TRANSACTION_JSON_COLUMNS, shape),
+                    "next": next_token,
+                })
             else:
+                formatted_transactions = [
+                    TransactionRecord.from_row(dict(txn, **accounts_by_number.get(txn['card_number'], no_account)))
+                    for txn in rows
+                ]
+                oldest, newest = metadata_cache.date_bounds(cursor)
                 return render_template(
                     "transactions.html",
                     transactions=formatted_transactions,
-                    categories=categories,
-                    applied_filter=(category_filter or 'all')
+                    categories=metadata_cache.categories(cursor),
+                    applied_filter=(category_filter or 'all'),
+                    oldest=oldest,
+                    newest=newest,
+                    next_token=next_token,
+                    limit=limit
                 )
 
     except Exception as e:
         logger.error(f"Error fetching transactions: {e}", exc_info=True)
         return jsonify({"error": "Failed to fetch transactions"}), 500
     
-@app.route('/bills', methods=['GET'])
-def bills_page():
-    class BillObj:
-        def __init__(self, data):
-            self.__dict__.update(data)
+@app.route('/export/transactions', methods=['GET'])
+def export_transactions():
+    """
+    Stream transactions as CSV (default), NDJSON or Parquet.
+    ?format=csv|ndjson|parquet&start=YYYY-MM-DD&end=YYYY-MM-DD&category=&account=
+    """
+    fmt = request.args.get('format', 'csv').lower()
+    try:
+        chunks = exporter.export(
+            fmt,
+            start=exporter.parse_bound(request.args.get('start')),
+            end=exporter.parse_bound(request.args.get('end'), end=True),
+            category=request.args.get('category') or None,
+            account=request.args.get('account') or None,
+        )
+    except exporter.ExportError as e:
+        return jsonify({"error": str(e)}), 400
+    mimetype, extension = exporter.FORMATS[fmt]
+    return Response(chunks, mimetype=mimetype, headers={
+        "Content-Disposition": f"attachment; filename=transactions.{extension}",
+        "X-Accel-Buffering": "no",  # let nginx pass chunks through as they are produced
+    })
+
+@app.route('/transactions/search', methods=['GET'])
+def search_transactions():
+    """
+    Transactions whose merchant, subject or remarks match ?q=, best match first.
+    ?mode=trigram (substring, default) or text (full-text), ?category=, ?limit=,
+    ?after=<next token>. Returns {"transactions": [...], "next": token}.
+    """
+    limit = max(1, min(request.args.get('limit', type=int) or 50, MAX_PAGE_SIZE))
+    try:
+        with get_cursor(readonly=True) as (cursor, conn):
+            rows, next_token = search.search_transactions(
+                cursor,
+                request.args.get('q', ''),
+                mode=request.args.get('mode', 'trigram'),
+                category=request.args.get('category') or None,
+                after=request.args.get('after') or None,
+                limit=limit,
+            )
+    except search.SearchError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error searching transactions: {e}", exc_info=True)
+        return jsonify({"error": "Failed to search transactions"}), 500
+    shape = request.args.get('shape', 'rows')
+    return json_fast.response({"transactions": json_fast.shape_rows(rows, search.SEARCH_COLUMNS, shape), "next": next_token})
+
+@app.route('/transactions/category', methods=['POST'])
+def correct_transaction_category():
+    """
+    Set a transaction's category by message_id and teach the categoriser from it.
+    Accepts JSON or form data: {"message_id": ..., "category": ...}.
+    """
+    data = request.get_json(silent=True) or request.form
+    message_id = (data.get("message_id") or "").strip()
+    category = (data.get("category") or "").strip().lower()
+    if not message_id or not category:
+        return jsonify({"error": "message_id and category are required"}), 400
     try:
         with get_cursor() as (cursor, conn):
             cursor.execute("""
-                SELECT email_timestamp, amount, merchant_name, transactiontype, card_number, category, subject
-                FROM bills
-                ORDER BY email_timestamp DESC
-            """)
-            bills = cursor.fetchall()
-            formatted_bills = []
+                UPDATE transactions SET category = %s
+                WHERE message_id = %s
+                RETURNING merchant_name, merchant_id, subject, transactiontype, amount, category
+            """, (category, message_id))
+            row = cursor.fetchone()
+            if row is not None:
+                metadata_cache.register_categories(cursor, [category])
+        if row is None:
+            return jsonify({"error": "Transaction not found"}), 404
+        categoriser.train_from_rows([row])
+        categoriser.model.save()
+        return jsonify({"message_id": message_id, "category": category})
+    except Exception as e:
+        logger.error(f"Error correcting category for {message_id}: {e}", exc_info=True)
+        return jsonify({"error": "Failed to update category"}), 500
+
+@app.route('/bills', methods=['GET'])
+def bills_page():
+    """
+    Newest bills first, one page at a time (?limit=, ?after=<next token>), keyset
+    paginated on (email_timestamp, message_id). HTML is rendered as a stream;
+    ?format=json returns {"bills": [...], "next": token} (?shape=columns as for /transactions).
+    """
+    try:
+        limit = max(1, min(request.args.get('limit', type=int) or 100, MAX_PAGE_SIZE))
+        after = request.args.get('after', '')
+        try:
+            cursor_key = decode_cursor(after, 2) if after else None
+        except InvalidCursor as e:
+            return jsonify({"error": str(e)}), 400
+
+        accept = request.headers.get("Accept", "")
+        use_json = request.args.get("format", "").lower() == "json" or any(
+            "application/json" in part for part in accept.split(",")
+        )
+
+        query = """
+            SELECT email_timestamp, amount, merchant_name, transactiontype, card_number, category, subject, message_id
+            FROM bills
+        """
+        params = []
+        if cursor_key:
+            query += " WHERE " + keyset_before("email_timestamp", "message_id", cursor_key, params)
+        query += " ORDER BY email_timestamp DESC, message_id DESC LIMIT %s"
+        params.append(limit + 1)
+
+        with get_cursor(readonly=True) as (cursor, conn):
+            cursor.execute(query, tuple(params))
+            rows, next_token = split_page(cursor.fetchall(), limit,
+                                          key=lambda row: (row['email_timestamp'], row['message_id']))
+
+        bills = [
+            {
+                "email_timestamp": bill['email_timestamp'],
+                "amount": bill['amount'] if bill['amount'] is not None else 0.0,
+                "merchant_name": bill['merchant_name'] or "unknown",
+                "transactiontype": bill['transactiontype'] or "debit",
+                "card_number": bill['card_number'] or "-",
+                "category": bill['category'] or "unknown",
+                "subject": bill['subject'] or "",
+            }
+            for bill in rows
+        ]
+        if use_json:
             for bill in bills:
-                bill_data = {
-                    "email_timestamp": bill.get('email_timestamp'),
-                    "amount": bill.get('amount', 0.0),
-                    "merchant_name": bill.get('merchant_name', "unknown"),
-                    "transactiontype": bill.get('transactiontype', "debit"),
-                    "card_number": bill.get('card_number') if bill.get('card_number') else "-",
-                    "category": bill.get('category', "unknown"),
-                    "subject": bill.get('subject', ""),
-                }
-                formatted_bills.append(BillObj(bill_data))
-            return render_template("bills.html", bills=formatted_bills)
+                ts = bill["email_timestamp"]
+                bill["date"] = ts.strftime("%m-%d-%Y %H:%M:%S") if ts else ""
+            shape = request.args.get('shape', 'rows')
+            return json_fast.response({"bills": json_fast.shape_rows(bills, BILL_JSON_COLUMNS, shape), "next": next_token})
+
+        # Send the page as it renders rather than building the whole body first
+        context = {"bills": bills, "next_token": next_token, "limit": limit}
+        app.update_template_context(context)
+        template = app.jinja_env.get_template("bills.html")
+        return Response(stream_with_context(template.stream(context)), mimetype="text/html")
     except Exception as e:
         logger.error(f"Error fetching bills: {e}", exc_info=True)
         return jsonify({"error": "Failed to fetch bills"}), 500
@@ -698,17 +741,20 @@ def accounts():
 def add_account():
     data = request.form
     db.add_account(data)
+    metadata_cache.cache.invalidate("accounts")
     return redirect(url_for('accounts'))
 
 @app.route('/accounts/edit/<int:account_id>', methods=['POST'])
 def edit_account(account_id):
     data = request.form
     db.update_account(account_id, data)
+    metadata_cache.cache.invalidate("accounts")
     return redirect(url_for('accounts'))
 
 @app.route('/accounts/delete/<int:account_id>', methods=['POST'])
 def delete_account(account_id):
     db.delete_account(account_id)
+    metadata_cache.cache.invalidate("accounts")
     return redirect(url_for('accounts'))
 
 if __name__ == '__main__':
@@ -0,0 +1,151 @@
+"""
+ASGI entry point serving the read-only JSON API from db_async, so one process can
+keep many dashboard requests waiting on PostgreSQL at once:
+
+    uvicorn asgi:app --port 5051
+
+    GET /api/transactions?category=&after=&limit=&shape=rows|columns
+    GET /api/transactions/search?q=&mode=trigram|text&category=&after=&limit=&shape=
+    GET /api/accounts
+    GET /api/spending/YYYY-MM
+
+Bodies match the Flask JSON endpoints (`next` tokens are interchangeable). Any other
+path is handed to the Flask app when asgiref is installed (pip install asgiref),
+so this can replace the WSGI server; otherwise it answers 404.
+"""
+
+import logging
+import re
+from urllib.parse import parse_qs
+
+import db_async
+import json_fast
+from pagination import MAX_PAGE_SIZE, InvalidCursor, decode_cursor
+from search import SEARCH_COLUMNS, SearchError
+
+try:
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError:  # optional; without it only the /api routes are served
+    WsgiToAsgi = None
+
+logger = logging.getLogger(__name__)
+
+_MONTH = re.compile(r"^\d{4}-\d{2}$")
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _args(scope):
+    return {key: values[-1] for key, values in parse_qs(scope.get("query_string", b"").decode("latin-1")).items()}
+
+
+def _limit(args, default):
+    try:
+        limit = int(args.get("limit") or default)
+    except ValueError:
+        raise BadRequest("limit must be a number") from None
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+async def transactions(args):
+    try:
+        after_key = decode_cursor(args["after"], 2) if args.get("after") else None
+    except InvalidCursor as e:
+        raise BadRequest(str(e)) from None
+    rows, next_token = await db_async.fetch_transactions(args.get("category") or None, after_key, _limit(args, 100))
+    return {
+        "transactions": json_fast.shape_rows(rows, db_async.TRANSACTION_COLUMNS, args.get("shape", "rows")),
+        "next": next_token,
+    }
+
+
+async def search(args):
+    try:
+        rows, next_token = await db_async.search_transactions(
+            args.get("q", ""), args.get("mode", "trigram"), args.get("category") or None, args.get("after") or None,
+            _limit(args, 50))
+    except SearchError as e:
+        raise BadRequest(str(e)) from None
+    return {"transactions": json_fast.shape_rows(rows, SEARCH_COLUMNS, args.get("shape", "rows")), "next": next_token}
+
+
+async def accounts(args):
+    return {"accounts": await db_async.get_all_accounts()}
+
+
+async def spending(args, year_month):
+    if not _MONTH.match(year_month):
+        raise BadRequest("month must be YYYY-MM")
+    return {"month": year_month, "categories": await db_async.monthly_spending(year_month)}
+
+
+ROUTES = {
+    "/api/transactions": transactions,
+    "/api/transactions/search": search,
+    "/api/accounts": accounts,
+}
+
+
+async def _send_json(send, status, obj):
+    body = json_fast.dumps(obj)
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            try:
+                await db_async.open_pool()
+            except Exception as e:
+                logger.error(f"Failed to open the async database pool: {e}")
+                await send({"type": "lifespan.startup.failed", "message": str(e)})
+                return
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await db_async.close_pool()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+_flask_app = None
+
+
+def _fallback():
+    global _flask_app
+    if _flask_app is None and WsgiToAsgi is not None:
+        from app import app as flask_app
+        _flask_app = WsgiToAsgi(flask_app)
+    return _flask_app
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+
+    path = scope["path"].rstrip("/") or "/"
+    handler, extra = ROUTES.get(path), ()
+    if handler is None and path.startswith("/api/spending/"):
+        handler, extra = spending, (path[len("/api/spending/"):],)
+    if handler is None:
+        fallback = _fallback()
+        if fallback is not None:
+            return await fallback(scope, receive, send)
+        return await _send_json(send, 404, {"error": "Not found"})
+    if scope["method"] not in ("GET", "HEAD"):
+        return await _send_json(send, 405, {"error": "Method not allowed"})
+
+    try:
+        result = await handler(_args(scope), *extra)
+    except BadRequest as e:
+        return await _send_json(send, 400, {"error": str(e)})
+    except Exception as e:
+        logger.error(f"Error serving {path}: {e}", exc_info=True)
+        return await _send_json(send, 500, {"error": "Internal server error"})
+    await _send_json(send, 200, result)
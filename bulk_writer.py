@@ -0,0 +1,113 @@
+"""
+Bulk writer for transactions and bills.
+
+A chunk of rows is staged into a temp table with execute_values (one round trip per
+page), then merged with a single INSERT ... SELECT ... ON CONFLICT DO NOTHING
+RETURNING <key>. The returned keys tell which rows were inserted and which were
+duplicates. If the merge fails (a constraint violation in any one row), the chunk is
+retried row by row under savepoints so one bad row only fails itself.
+"""
+
+import logging
+from psycopg2.extras import execute_values
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 1000
+
+INSERTED = "inserted"
+DUPLICATE = "duplicate"
+FAILED = "failed"
+
+
+def _staging_name(table):
+    return f"_staging_{table}"
+
+
+def _ensure_staging(cursor, table, columns):
+    # Same column types as the target, none of its constraints; ord keeps input order
+    staging = _staging_name(table)
+    cursor.execute(f"""
+        CREATE TEMP TABLE IF NOT EXISTS {staging} AS
+        SELECT NULL::integer AS ord, {", ".join(columns)} FROM {table} WITH NO DATA
+    """)
+    cursor.execute(f"TRUNCATE {staging}")
+    return staging
+
+
+def _merge(cursor, table, columns, rows, key, page_size):
+    staging = _ensure_staging(cursor, table, columns)
+    column_list = ", ".join(columns)
+    execute_values(
+        cursor,
+        f"INSERT INTO {staging} (ord, {column_list}) VALUES %s",
+        [(i,) + tuple(row) for i, row in enumerate(rows)],
+        page_size=page_size,
+    )
+    # DISTINCT ON keeps the first of any in-chunk duplicates, so "first wins" is deterministic
+    cursor.execute(f"""
+        INSERT INTO {table} ({column_list})
+        SELECT {column_list} FROM (
+            SELECT DISTINCT ON ({key}) ord, {column_list} FROM {staging} ORDER BY {key}, ord
+        ) AS s
+        ORDER BY ord
+        ON CONFLICT DO NOTHING
+        RETURNING {key}
+    """)
+    return {row[key] if isinstance(row, dict) else row[0] for row in cursor.fetchall()}
+
+
+def _insert_one(cursor, table, columns, row, key):
+    cursor.execute("SAVEPOINT sp_bulk_row")
+    try:
+        cursor.execute(f"""
+            INSERT INTO {table} ({", ".join(columns)})
+            VALUES ({", ".join(["%s"] * len(columns))})
+            ON CONFLICT DO NOTHING
+        """, tuple(row))
+        # Read before RELEASE, which resets rowcount to -1
+        inserted = cursor.rowcount
+    except Exception as e:
+        cursor.execute("ROLLBACK TO SAVEPOINT sp_bulk_row")
+        logger.error("Failed to insert %s row %s: %s", table, row[columns.index(key)], e)
+        return FAILED
+    cursor.execute("RELEASE SAVEPOINT sp_bulk_row")
+    return INSERTED if inserted > 0 else DUPLICATE
+
+
+def bulk_insert(cursor, table, columns, rows, key="message_id", page_size=PAGE_SIZE):
+    """
+    Insert rows (tuples in `columns` order) into `table`, skipping existing `key`s.
+    Returns a per-row status list (INSERTED, DUPLICATE or FAILED) aligned with rows.
+    """
+    rows = list(rows)
+    if not rows:
+        return []
+    columns = list(columns)
+    key_index = columns.index(key)
+    cursor.execute("SAVEPOINT sp_bulk")
+    try:
+        inserted_keys = _merge(cursor, table, columns, rows, key, page_size)
+    except Exception as e:
+        cursor.execute("ROLLBACK TO SAVEPOINT sp_bulk")
+        logger.warning("Bulk insert into %s failed (%s); retrying %d rows one by one", table, e, len(rows))
+        return [_insert_one(cursor, table, columns, row, key) for row in rows]
+    cursor.execute("RELEASE SAVEPOINT sp_bulk")
+
+    statuses = []
+    for row in rows:
+        row_key = row[key_index]
+        if row_key in inserted_keys:
+            inserted_keys.discard(row_key)  # later in-chunk copies of the same key are duplicates
+            statuses.append(INSERTED)
+        else:
+            statuses.append(DUPLICATE)
+    return statuses
+
+
+def summarise(statuses):
+    """Counts per status, e.g. {"inserted": 950, "duplicate": 50}."""
+    counts = {}
+    for status in statuses:
+        counts[status] = counts.get(status, 0) + 1
+    return counts
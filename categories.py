@@ -24,7 +24,9 @@ category_map = {
 }
 
 email_map = {
-    "banks": ["alerts@hdfcbank.net","credit_cards@icicibank.com","RBLAlerts@rblbank.com","bankalerts@kotak.com","onlinesbicard@sbicard.com","alerts@axisbank.com","nach.alerts@kotak.com"],
+    "banks": ["alerts@hdfcbank.net","credit_cards@icicibank.com","RBLAlerts@rblbank.com","bankalerts@kotak.com","onlinesbicard@sbicard.com","alerts@axisbank.com","nach.alerts@kotak.com",
+              # Domain ("@domain") and subdomain ("*.domain") entries, see sender_index.py
+              "@axis.bank.in","*.trans.axisbank.com"],
     "amazon": ["no-reply@amazonpay.in"],
     "dmat": [
         "donotreply.evoting@cdslindia.co.in",
@@ -35,3 +37,23 @@ email_map = {
     ]
 }
 
+# Canonical merchant id -> known spellings, consumed by merchants.MerchantIndex.
+# Spellings are matched after normalisation (case, punctuation, "pvt ltd"/"india" suffixes).
+merchant_aliases = {
+    "amazon": ["amazon", "amazon pay", "amazonpay", "amzn", "amazon seller services", "amazon retail"],
+    "flipkart": ["flipkart", "flipkart internet", "fkrt"],
+    "myntra": ["myntra", "myntra designs"],
+    "swiggy": ["swiggy", "swiggy instamart", "bundl technologies"],
+    "zomato": ["zomato", "zomato media", "blinkit"],
+    "uber": ["uber", "uber rides"],
+    "ola": ["ola", "olacabs", "ani technologies"],
+    "irctc": ["irctc", "irctc web"],
+    "makemytrip": ["makemytrip", "mmt"],
+    "goibibo": ["goibibo", "ibibo group"],
+    "jio": ["jio", "reliance jio", "jio mobile", "jio prepaid"],
+    "act_fibernet": ["act fibernet", "atria convergence"],
+    "indian_oil": ["indian oil", "iocl"],
+    "hpcl": ["hpcl", "hindustan petroleum"],
+    "smallcase": ["smallcase"],
+    "zerodha": ["zerodha", "zerodha broking"],
+}
@@ -0,0 +1,233 @@
+"""
+Transaction categoriser: category_map keyword rules first, then a learned model.
+
+The model is a multinomial naive Bayes over hashed tokens (merchant words, canonical
+merchant id, subject words, transaction type, amount magnitude), kept as NumPy count
+matrices. It is trained from already-categorised rows in `transactions`, updated
+incrementally from user corrections (partial_fit), and scores records in batches:
+one gather over the log-likelihood matrix plus a segmented sum per batch.
+"""
+
+import math
+import os
+import re
+import tempfile
+import threading
+import zlib
+import logging
+import numpy as np
+from categories import category_map
+from merchants import normalise_merchant_key
+
+logger = logging.getLogger(__name__)
+
+MODEL_FILE = os.getenv("CATEGORISER_MODEL", "categoriser_model.npz")
+N_FEATURES = 1 << 14
+# Below this posterior the model abstains and the category stays "unknown"
+MIN_CONFIDENCE = float(os.getenv("CATEGORISER_MIN_CONFIDENCE", "0.6"))
+ALPHA = 0.1  # Laplace/Lidstone smoothing
+
+UNKNOWN_CATEGORY = "unknown"
+# category_map buckets that describe kinds of email, not what money was spent on
+_NON_SPENDING_CATEGORIES = ("transactions", "promotions", "login", "otp", "dmat")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _compile_rules(mapping):
+    rules = []
+    for category, keywords in mapping.items():
+        if category in _NON_SPENDING_CATEGORIES:
+            continue
+        alternation = "|".join(re.escape(kw.lower()) for kw in sorted(keywords, key=len, reverse=True))
+        rules.append((category, re.compile(rf"\b(?:{alternation})\b")))
+    return rules
+
+
+_RULES = _compile_rules(category_map)
+
+
+def rule_category(merchant_name):
+    """Category from the category_map keyword lists, matched on whole words of the merchant name."""
+    text = (merchant_name or "").lower()
+    for category, regex in _RULES:
+        if regex.search(text):
+            return category
+    return None
+
+
+def _hash(token):
+    return zlib.crc32(token.encode("utf-8")) % N_FEATURES
+
+
+def features(merchant_name, merchant_id=None, subject=None, transactiontype=None, amount=None):
+    """Hashed feature indices for one transaction."""
+    tokens = ["m:" + word for word in normalise_merchant_key(merchant_name).split()]
+    if merchant_id:
+        tokens.append("id:" + merchant_id)
+    tokens.extend("s:" + word for word in _WORD_RE.findall((subject or "").lower()))
+    if transactiontype:
+        tokens.append("t:" + transactiontype)
+    if amount:
+        try:
+            tokens.append(f"a:{int(math.log10(float(amount)))}")
+        except (TypeError, ValueError):
+            pass
+    return [_hash(token) for token in tokens]
+
+
+def record_features(record):
+    return features(record.merchant_name, record.merchant_id, record.subject,
+                    record.transactiontype, record.amount)
+
+
+class NaiveBayesCategoriser:
+    """Multinomial naive Bayes over hashed features, trainable in increments."""
+
+    def __init__(self, classes=(), feature_counts=None):
+        self.classes = list(classes)
+        if feature_counts is None:
+            feature_counts = np.zeros((len(self.classes), N_FEATURES), dtype=np.float64)
+        self.feature_counts = feature_counts
+        self._lock = threading.Lock()
+        self._refresh()
+
+    def _refresh(self):
+        counts = self.feature_counts
+        doc_counts = counts.sum(axis=1)
+        # Class prior from token mass rather than row counts keeps the file to one matrix
+        total = doc_counts.sum()
+        # A single class would "win" every prediction with full confidence
+        if len(self.classes) < 2 or total == 0:
+            self._model = (tuple(self.classes), None, None)
+            return
+        log_prior = np.log((doc_counts + 1.0) / (total + len(self.classes)))
+        log_lik = np.log(counts + ALPHA) - np.log(doc_counts + ALPHA * N_FEATURES)[:, None]
+        # Swapped in one assignment so concurrent scorers see old or new, never a mix
+        self._model = (tuple(self.classes), log_prior, np.ascontiguousarray(log_lik))
+
+    def partial_fit(self, feature_rows, labels):
+        """Add training rows (lists of feature indices) with their category labels."""
+        with self._lock:
+            counts = self.feature_counts
+            for label in labels:
+                if label not in self.classes:
+                    self.classes.append(label)
+                    counts = np.vstack([counts, np.zeros((1, N_FEATURES), dtype=np.float64)])
+            index = {label: i for i, label in enumerate(self.classes)}
+            rows = np.fromiter((index[label] for label, row in zip(labels, feature_rows) for _ in row),
+                               dtype=np.intp)
+            cols = np.fromiter((f for row in feature_rows for f in row), dtype=np.intp)
+            np.add.at(counts, (rows, cols), 1.0)
+            self.feature_counts = counts
+            self._refresh()
+
+    def predict(self, feature_rows, min_confidence=MIN_CONFIDENCE):
+        """Return a (category or None, confidence) pair for each feature row."""
+        classes, log_prior, log_lik = self._model
+        if log_prior is None or not feature_rows:
+            return [(None, 0.0)] * len(feature_rows)
+        lengths = np.fromiter((len(row) for row in feature_rows), dtype=np.intp, count=len(feature_rows))
+        cols = np.fromiter((f for row in feature_rows for f in row), dtype=np.intp, count=int(lengths.sum()))
+        scores = np.tile(log_prior[:, None], (1, len(feature_rows)))
+        nonempty = lengths > 0
+        if cols.size:
+            starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))[nonempty]
+            scores[:, nonempty] += np.add.reduceat(log_lik[:, cols], starts, axis=1)
+        scores -= scores.max(axis=0)
+        probs = np.exp(scores)
+        probs /= probs.sum(axis=0)
+        best = probs.argmax(axis=0)
+        confidence = probs[best, np.arange(len(feature_rows))]
+        return [
+            (classes[b] if c >= min_confidence else None, float(c))
+            for b, c in zip(best.tolist(), confidence.tolist())
+        ]
+
+    def save(self, path=MODEL_FILE):
+        with self._lock:
+            # A temp file per writer: other workers may be saving the same model
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".",
+                                            prefix=os.path.basename(path) + ".", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    np.savez_compressed(f, classes=np.array(self.classes, dtype=str),
+                                        feature_counts=self.feature_counts)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+    @classmethod
+    def load(cls, path=MODEL_FILE):
+        """Load a saved model; returns an empty (abstaining) model if there is none."""
+        try:
+            with np.load(path) as saved:
+                counts = saved["feature_counts"]
+                if counts.shape[1] != N_FEATURES:
+                    raise ValueError(f"model has {counts.shape[1]} features, expected {N_FEATURES}")
+                return cls(saved["classes"].tolist(), counts.astype(np.float64))
+        except FileNotFoundError:
+            return cls()
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not load categoriser model {path}: {e}")
+            return cls()
+
+
+model = NaiveBayesCategoriser.load()
+
+
+def categorise_records(records, min_confidence=MIN_CONFIDENCE):
+    """
+    Fill in category for records that don't have one: keyword rules first, then one
+    batched model call for the rest. Returns the number of records categorised.
+    """
+    pending = []
+    assigned = 0
+    for record in records:
+        if record.category and record.category != UNKNOWN_CATEGORY:
+            continue
+        category = rule_category(record.merchant_name)
+        if category:
+            record.category = category
+            assigned += 1
+        else:
+            pending.append(record)
+    if pending:
+        predictions = model.predict([record_features(r) for r in pending], min_confidence)
+        for record, (category, _confidence) in zip(pending, predictions):
+            if category:
+                record.category = category
+                assigned += 1
+    return assigned
+
+
+def train_from_rows(rows, target=None):
+    """Train on DB rows (merchant_name, merchant_id, subject, transactiontype, amount, category)."""
+    target = target or model
+    feature_rows, labels = [], []
+    for row in rows:
+        category = row.get("category")
+        if not category or category == UNKNOWN_CATEGORY:
+            continue
+        feature_rows.append(features(row.get("merchant_name"), row.get("merchant_id"), row.get("subject"),
+                                     row.get("transactiontype"), row.get("amount")))
+        labels.append(category)
+    if feature_rows:
+        target.partial_fit(feature_rows, labels)
+    return len(labels)
+
+
+def train_from_db(cursor, batch_size=5000, target=None):
+    """Train on every categorised row in transactions. Returns the number of rows used."""
+    cursor.execute("""
+        SELECT merchant_name, merchant_id, subject, transactiontype, amount, category
+        FROM transactions
+        WHERE category IS NOT NULL AND category <> %s
+    """, (UNKNOWN_CATEGORY,))
+    trained = 0
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        trained += train_from_rows(rows, target)
+    return trained
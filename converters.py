@@ -0,0 +1,130 @@
+"""
+Typed converters for fields captured by the bank email patterns.
+
+Patterns declare converters in patterns.yaml (``amount``, ``date:%d-%b-%Y``, ...);
+pattern_registry compiles each spec once with build_converter. Amounts become exact
+Decimals and dates are parsed with a regex built from the declared format, so fuzzy
+dateutil parsing is only used when a value doesn't fit the format.
+"""
+
+import re
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+import dateutil.parser
+
+# Indian ("1,98,322.31") and western grouping both just drop the commas
+_AMOUNT_STRIP = str.maketrans("", "", ",")
+
+_DATE_TOKENS = {
+    "%d": r"(?P<day>\d{1,2})",
+    "%m": r"(?P<month>\d{1,2})",
+    "%Y": r"(?P<year>\d{4})",
+    "%y": r"(?P<year2>\d{2})",
+    "%b": r"(?P<mon>[A-Za-z]{3})",
+}
+_MONTHS = {name: idx for idx, name in enumerate(
+    ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), 1
+)}
+
+
+class ConverterError(ValueError):
+    """Raised for an unknown or malformed converter spec."""
+
+
+def parse_amount(value):
+    """Parse an amount like '1,98,322.31' or '30000' into an exact Decimal. Raises ValueError."""
+    if isinstance(value, Decimal):
+        return value
+    if isinstance(value, (int, float)):
+        return Decimal(str(value))
+    cleaned = str(value).strip().translate(_AMOUNT_STRIP)
+    # Digits with at most one decimal point; rules out '', 'NaN', '1e5' and friends
+    if not cleaned.replace(".", "", 1).isdigit():
+        raise ValueError(f"not an amount: {value!r}")
+    try:
+        return Decimal(cleaned)
+    except InvalidOperation:
+        raise ValueError(f"not an amount: {value!r}")
+
+
+def parse_date_fuzzy(value):
+    """Last-resort date parsing (day first, fuzzy) for values that don't fit their format."""
+    try:
+        return dateutil.parser.parse(str(value), dayfirst=True, fuzzy=True).date()
+    except (OverflowError, dateutil.parser.ParserError) as e:
+        raise ValueError(str(e))
+
+
+def compile_date_parser(fmt):
+    """
+    Build a fast parser for a strptime-style format using %d %m %y %Y %b.
+    Other directives fall back to datetime.strptime. The parser returns a date.
+    """
+    parts = re.split(r"(%.)", fmt)
+    if any(part.startswith("%") and part not in _DATE_TOKENS for part in parts if part):
+        return lambda value: datetime.strptime(str(value).strip(), fmt).date()
+    regex = re.compile(
+        r"\s*" + "".join(_DATE_TOKENS.get(part) or re.escape(part) for part in parts) + r"\s*"
+    )
+
+    def parse(value):
+        match = regex.fullmatch(str(value))
+        if not match:
+            raise ValueError(f"{value!r} does not match {fmt!r}")
+        groups = match.groupdict()
+        if groups.get("mon"):
+            month = _MONTHS.get(groups["mon"].lower())
+            if month is None:
+                raise ValueError(f"unknown month in {value!r}")
+        else:
+            month = int(groups["month"])
+        if groups.get("year"):
+            year = int(groups["year"])
+        else:
+            # Same pivot as strptime's %y: 69-99 -> 1900s, 00-68 -> 2000s
+            year2 = int(groups["year2"])
+            year = year2 + (1900 if year2 >= 69 else 2000)
+        return date(year, month, int(groups["day"]))
+
+    return parse
+
+
+def _with_date_fallback(parser):
+    def parse(value):
+        try:
+            return parser(value)
+        except ValueError:
+            return parse_date_fuzzy(value)
+    return parse
+
+
+def build_converter(spec):
+    """
+    Compile a converter spec from patterns.yaml into a callable:
+      amount         -> Decimal
+      date:<format>  -> date, fuzzy parsing if the value doesn't fit the format
+      date           -> date, fuzzy parsing only
+    """
+    kind, _, arg = str(spec).partition(":")
+    if kind == "amount" and not arg:
+        return parse_amount
+    if kind == "date":
+        return _with_date_fallback(compile_date_parser(arg)) if arg else parse_date_fuzzy
+    raise ConverterError(f"unknown converter {spec!r}")
+
+
+def apply_converters(data, converters):
+    """
+    Convert fields of an extracted-transaction dict in place. Values that fail to
+    convert are left as captured. Dates are stored as ISO strings, as the dicts always had.
+    """
+    for field, convert in converters.items():
+        value = data.get(field)
+        if value in (None, ""):
+            continue
+        try:
+            value = convert(value)
+        except ValueError:
+            continue
+        data[field] = value.isoformat() if isinstance(value, date) else value
+    return data
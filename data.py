@@ -7,7 +7,9 @@ import pdb
 from categories import category_map
 from categories import email_map
 #from cleaner_script import cleanup_html_content, verify_html_cleanup
-from patterns import bank_regex_patterns, select_best_pattern
+from pattern_registry import registry
+from converters import apply_converters
+from quarantine import quarantine
 import logging
 
 logger = logging.getLogger(__name__)
@@ -58,44 +60,28 @@ def is_transaction_email(email_body: str) -> bool:
 def extract_transaction_data(email_body: str) -> dict:
     """Extract transaction data from an email body using the best matching pattern."""
     # Filter out non-transactional emails
-    pdb.Pdb(stdout=sys.__stdout__).set_trace()
-
     if not is_transaction_email(email_body):
         logger.info("Email skipped as non-transactional.")
         return None
-    # Try all patterns and select the best match
-    pattern_name, match = select_best_pattern(email_body)
+    # Use one pattern snapshot for the whole extraction so a concurrent reload can't split it
+    patterns = registry.current()
+    pattern_name, match = patterns.select(email_body)
     if not match:
-        logger.warning("No pattern matched for email body. Logging for review.")
-        with open("unmatched_emails.txt", "a", encoding="utf-8") as f:
-            f.write(email_body + "\n" + "="*80 + "\n")
+        logger.warning("No pattern matched for email body. Quarantined for review.")
+        quarantine("unmatched", email_body)
         return None
     data = {}
-    fields = bank_regex_patterns[pattern_name]["fields"]
+    fields = patterns.transactions[pattern_name]["fields"]
     for idx, field in enumerate(fields):
         try:
             data[field] = match.group(idx + 1)
         except Exception:
             data[field] = ""
     # Add static fields from pattern definition
-    for k, v in bank_regex_patterns[pattern_name].items():
-        if k not in ("pattern", "fields"):
-            data[k] = v
-    # Post-process amount
-    if "amount" in data:
-        try:
-            data["amount"] = float(str(data["amount"]).replace(",", ""))
-        except Exception:
-            pass
-    # Post-process date (normalize to YYYY-MM-DD if possible)
-    if "date" in data:
-        try:
-            # Try to parse various date formats
-            import dateutil.parser
-            dt = dateutil.parser.parse(data["date"], dayfirst=True, fuzzy=True)
-            data["date"] = dt.strftime("%Y-%m-%d")
-        except Exception:
-            pass
+    data.update(patterns.statics[pattern_name])
+    # Typed conversion: Decimal amounts, dates normalized to YYYY-MM-DD using the
+    # pattern's declared format (fuzzy parsing only as a fallback)
+    apply_converters(data, patterns.converters[pattern_name])
     # Post-process transactiontype based on keywords if not set or unknown
     txn_type = data.get("transactiontype", "").lower()
     body_lower = email_body.lower()
@@ -1,10 +1,12 @@
 from contextlib import contextmanager
 from psycopg2.extras import RealDictCursor
 import psycopg2
-from psycopg2 import pool
 from config_loader import Config
+from db_pool import ConnectionPool
 import logging
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -29,15 +31,31 @@ def get_db_config():
 db_pool = None
 db_config = None
 
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', '1'))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', '20'))
+# Only connections idle longer than this are pinged before reuse
+DB_POOL_IDLE_CHECK_SECONDS = float(os.getenv('DB_POOL_IDLE_CHECK_SECONDS', '30'))
+DB_POOL_MAX_AGE_SECONDS = float(os.getenv('DB_POOL_MAX_AGE_SECONDS', '1800'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+
+_pool_lock = threading.Lock()
+
 def initialize_pool():
     """Initialize the connection pool if not already done."""
     global db_pool, db_config
     
-    if db_pool is None:
+    if db_pool is not None:
+        return
+    with _pool_lock:
+        if db_pool is not None:
+            return
         db_config = get_db_config()
         try:
-            db_pool = psycopg2.pool.SimpleConnectionPool(
-                1, 20,
+            db_pool = ConnectionPool(
+                DB_POOL_MIN, DB_POOL_MAX,
+                idle_check_seconds=DB_POOL_IDLE_CHECK_SECONDS,
+                max_age_seconds=DB_POOL_MAX_AGE_SECONDS,
+                checkout_timeout=DB_POOL_TIMEOUT,
                 host=db_config['host'],
                 port=db_config['port'],
                 dbname=db_config['dbname'],
@@ -52,65 +70,214 @@ def initialize_pool():
 def get_conn():
     # Initialize pool if not already done
     initialize_pool()
-    
-    conn = db_pool.getconn()
-    try:
-        with conn.cursor() as cur:
-            cur.execute('SELECT 1')
-    except Exception:
-        logger.warning("Database connection lost. Attempting to reconnect...")
-        # Try to reconnect if the connection is broken
-        try:
-            db_pool.putconn(conn, close=True)
-        except Exception:
-            # If putconn fails, close connection directly
-            try:
-                conn.close()
-            except Exception:
-                pass
+    # The pool validates connections that sat idle and replaces broken ones itself
+    return db_pool.getconn()
+
+def put_conn(conn, close=False):
+    """Return a connection to the pool; close=True when it may be broken."""
+    db_pool.putconn(conn, close=close)
+
+# Optional read replica: get_cursor(readonly=True) reads from it while it keeps up
+REPLICA_DSN = os.getenv('DB_REPLICA_DSN', '')
+REPLICA_MAX_LAG_SECONDS = float(os.getenv('DB_REPLICA_MAX_LAG_SECONDS', '10'))
+REPLICA_LAG_CHECK_SECONDS = float(os.getenv('DB_REPLICA_LAG_CHECK_SECONDS', '5'))
+
+replica_pool = None
+# Result of the last lag check; reads use the replica while it is healthy and it is
+# re-checked at most every REPLICA_LAG_CHECK_SECONDS
+_replica_state = {"checked_at": None, "healthy": False, "lag_seconds": None, "fallbacks": 0}
+_replica_lock = threading.Lock()
+# Until this time.monotonic() value readonly reads go to the primary (see pin_reads_to_primary)
+_primary_pinned_until = 0.0
+
+# Zero when everything received has been replayed, so a quiet primary doesn't look like lag
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM NOW() - pg_last_xact_replay_timestamp()), 0)
+    END AS lag_seconds
+"""
+
+def initialize_replica_pool():
+    """Create the replica pool if DB_REPLICA_DSN is set. Returns the pool or None."""
+    global replica_pool
+    if replica_pool is not None or not REPLICA_DSN:
+        return replica_pool
+    with _pool_lock:
+        if replica_pool is None:
+            # minconn=0: a replica that is down at startup must not stop the app
+            replica_pool = ConnectionPool(
+                0, DB_POOL_MAX,
+                idle_check_seconds=DB_POOL_IDLE_CHECK_SECONDS,
+                max_age_seconds=DB_POOL_MAX_AGE_SECONDS,
+                checkout_timeout=DB_POOL_TIMEOUT,
+                dsn=REPLICA_DSN
+            )
+            logger.info("Read-replica connection pool initialized")
+    return replica_pool
+
+def _replica_check_due():
+    checked_at = _replica_state["checked_at"]
+    return checked_at is None or time.monotonic() - checked_at >= REPLICA_LAG_CHECK_SECONDS
+
+def _record_replica_check(healthy, lag_seconds):
+    with _replica_lock:
+        was_healthy = _replica_state["healthy"]
+        _replica_state.update(checked_at=time.monotonic(), healthy=healthy, lag_seconds=lag_seconds)
+    if was_healthy and not healthy:
+        logger.warning("Read replica unavailable or behind (lag %s); reading from the primary", lag_seconds)
+    elif healthy and not was_healthy:
+        logger.info("Read replica in sync (lag %.1fs); routing reads to it", lag_seconds)
+
+def _replica_conn():
+    """A replica connection if the replica is configured and within the lag limit, else None."""
+    pool = initialize_replica_pool()
+    if pool is None:
+        return None
+    if not _replica_check_due():
+        if not _replica_state["healthy"]:
+            return None
         try:
-            conn = psycopg2.connect(**db_config)
-            logger.info("Database reconnection successful.")
+            return pool.getconn()
         except Exception as e:
-            logger.critical("Failed to reconnect to the database.", exc_info=True)
-            raise e
+            logger.warning(f"Could not get a read-replica connection: {e}")
+            _record_replica_check(False, None)
+            return None
+    conn = None
+    try:
+        conn = pool.getconn()
+        with conn.cursor() as cur:
+            cur.execute(REPLICA_LAG_SQL)
+            lag_seconds = float(cur.fetchone()[0])
+        conn.rollback()
+    except Exception as e:
+        logger.warning(f"Read-replica lag check failed: {e}")
+        if conn is not None:
+            pool.putconn(conn, close=True)
+        _record_replica_check(False, None)
+        return None
+    healthy = lag_seconds <= REPLICA_MAX_LAG_SECONDS
+    _record_replica_check(healthy, lag_seconds)
+    if not healthy:
+        pool.putconn(conn)
+        return None
     return conn
 
-def put_conn(conn):
-    db_pool.putconn(conn) 
+def pin_reads_to_primary(seconds=None):
+    """
+    Send this process's readonly reads to the primary for `seconds` (default
+    DB_REPLICA_MAX_LAG_SECONDS), so reads that follow a write see it even while
+    the replica is behind. The account writes call it: the metadata cache reloads
+    the accounts they invalidate on the next (readonly) transactions page.
+    """
+    global _primary_pinned_until
+    seconds = REPLICA_MAX_LAG_SECONDS if seconds is None else seconds
+    _primary_pinned_until = max(_primary_pinned_until, time.monotonic() + seconds)
+
+def _reads_pinned():
+    return time.monotonic() < _primary_pinned_until
+
+def pool_stats():
+    """Checkout wait times, active/idle counts and error counters of the pool(s)."""
+    if db_pool is None:
+        return {"initialized": False}
+    stats = dict(db_pool.stats(), initialized=True)
+    if replica_pool is not None:
+        stats["replica"] = dict(replica_pool.stats(), healthy=_replica_state["healthy"],
+                                lag_seconds=_replica_state["lag_seconds"],
+                                primary_fallbacks=_replica_state["fallbacks"])
+    return stats
 
 
 # Context manager for getting a cursor and ensuring cleanup
 @contextmanager
-def get_cursor():
-    conn = get_conn()
+def get_cursor(readonly=False):
+    """
+    Yields (cursor, conn) and commits on success. readonly=True reads from the replica
+    when one is configured and no more than DB_REPLICA_MAX_LAG_SECONDS behind, and
+    from the primary otherwise or while pin_reads_to_primary() is in effect;
+    readonly callers must not write.
+    """
+    use_replica = readonly and REPLICA_DSN and not _reads_pinned()
+    conn = _replica_conn() if use_replica else None
+    if conn is not None:
+        pool = replica_pool
+    else:
+        if use_replica:
+            with _replica_lock:
+                _replica_state["fallbacks"] += 1
+        conn = get_conn()
+        pool = db_pool
     cur = conn.cursor(cursor_factory=RealDictCursor)
+    broken = False
     try:
         yield cur, conn
         conn.commit()
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        # Server went away mid-request; don't hand this connection out again
+        broken = True
+        raise
     except Exception:
         conn.rollback()
         raise
     finally:
         cur.close()
-        put_conn(conn)
+        pool.putconn(conn, close=broken)
 
 def get_connection():
     return get_conn()
 
+def get_known_message_ids(cursor, message_ids):
+    """
+    Return the subset of message_ids already stored (transactions, bills, email_notices
+    or bank_emails), with one round trip.
+    """
+    message_ids = list(message_ids)
+    if not message_ids:
+        return set()
+    cursor.execute("""
+        SELECT message_id FROM transactions WHERE message_id = ANY(%(ids)s)
+        UNION ALL
+        SELECT message_id FROM bills WHERE message_id = ANY(%(ids)s)
+        UNION ALL
+        SELECT message_id FROM email_notices WHERE message_id = ANY(%(ids)s)
+        UNION ALL
+        SELECT message_id FROM bank_emails WHERE message_id = ANY(%(ids)s)
+    """, {"ids": message_ids})
+    return {row["message_id"] if isinstance(row, dict) else row[0] for row in cursor.fetchall()}
+
+# Tables migration 009 can convert to monthly partitions, with their partition keys
+PARTITIONED_TABLES = {"transactions": "email_timestamp", "bank_emails": "email_date"}
+PARTITION_MONTHS_AHEAD = int(os.getenv('PARTITION_MONTHS_AHEAD', '3'))
+
+def ensure_partitions(cursor, months_ahead=PARTITION_MONTHS_AHEAD):
+    """
+    Create the upcoming monthly partitions of every table converted by migration 009
+    (a no-op for plain tables). Returns {table: partitions created}.
+    """
+    cursor.execute(
+        "SELECT relname FROM pg_class WHERE relname = ANY(%s) AND relkind = 'p'",
+        (list(PARTITIONED_TABLES),),
+    )
+    created = {}
+    for row in cursor.fetchall():
+        table = row["relname"] if isinstance(row, dict) else row[0]
+        cursor.execute("SELECT ensure_monthly_partitions(%s, %s, %s) AS created",
+                       (table, PARTITIONED_TABLES[table], months_ahead))
+        result = cursor.fetchone()
+        created[table] = result["created"] if isinstance(result, dict) else result[0]
+    return created
+
 def get_all_accounts():
-    conn = get_connection()
+    # Primary, not the replica: the accounts page is where edits redirect to
     try:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        with get_cursor() as (cur, conn):
             cur.execute("SELECT * FROM accounts ORDER BY id DESC")
-            accounts = cur.fetchall()
-        conn.commit()
-        return accounts
+            return cur.fetchall()
     except Exception as e:
         logger.exception("Error fetching accounts")
         raise
-    finally:
-        put_conn(conn)
 
 def add_account(data):
     conn = get_connection()
@@ -128,6 +295,7 @@ def add_account(data):
                 data.get('current_balance')
             ))
         conn.commit()
+        pin_reads_to_primary()
     except Exception as e:
         logger.exception("Error adding account")
         raise
@@ -158,6 +326,7 @@ def update_account(account_id, data):
                 account_id
             ))
         conn.commit()
+        pin_reads_to_primary()
     except Exception as e:
         logger.exception("Error updating account")
         raise
@@ -170,6 +339,7 @@ def delete_account(account_id):
         with conn.cursor() as cur:
             cur.execute("DELETE FROM accounts WHERE id=%s", (account_id,))
         conn.commit()
+        pin_reads_to_primary()
     except Exception as e:
         logger.exception("Error deleting account")
         raise
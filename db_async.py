@@ -0,0 +1,221 @@
+"""
+Async counterparts of db.py's cursor helper and of the read queries behind the list
+endpoints, on psycopg 3's AsyncConnectionPool.
+
+They let one process keep many dashboard requests waiting on PostgreSQL at once
+(see asgi.py) instead of tying up a synchronous worker per slow query. Connection
+settings, pool sizes and the read-replica options are the same environment
+variables db.py reads; rows come back as dicts, like RealDictCursor's.
+
+psycopg 3 is optional (`pip install "psycopg[binary]" psycopg-pool`); the
+synchronous app does not need it.
+"""
+
+import logging
+from contextlib import asynccontextmanager
+
+import db
+import metadata_cache
+import search
+from pagination import keyset_before, split_page
+
+try:
+    import psycopg
+    from psycopg.conninfo import make_conninfo
+    from psycopg.rows import dict_row
+    from psycopg_pool import AsyncConnectionPool
+except ImportError:  # optional; only the async entry point needs it
+    psycopg = dict_row = None
+
+logger = logging.getLogger(__name__)
+
+TRANSACTION_COLUMNS = (
+    "id", "date", "amount", "merchant_name", "transactiontype", "card_number", "category",
+    "account_name", "account_type",
+)
+
+async_pool = None
+replica_pool = None
+
+
+def _require_psycopg():
+    if psycopg is None:
+        raise RuntimeError('db_async needs psycopg 3: pip install "psycopg[binary]" psycopg-pool')
+
+
+def _new_pool(conninfo, min_size):
+    return AsyncConnectionPool(
+        conninfo,
+        min_size=min_size,
+        max_size=db.DB_POOL_MAX,
+        timeout=db.DB_POOL_TIMEOUT,
+        max_lifetime=db.DB_POOL_MAX_AGE_SECONDS,
+        # Ping connections on checkout and replace dead ones, like db_pool (psycopg-pool >= 3.2)
+        check=AsyncConnectionPool.check_connection,
+        open=False,
+    )
+
+
+async def open_pool():
+    """Create and open the async pool(s); call once from the event loop at startup."""
+    global async_pool, replica_pool
+    _require_psycopg()
+    if async_pool is None:
+        async_pool = _new_pool(make_conninfo(**db.get_db_config()), db.DB_POOL_MIN)
+        await async_pool.open()
+        logger.info("Async database connection pool opened")
+    if db.REPLICA_DSN and replica_pool is None:
+        # min_size=0: a replica that is down at startup must not stop the app
+        replica_pool = _new_pool(db.REPLICA_DSN, 0)
+        await replica_pool.open()
+        logger.info("Async read-replica connection pool opened")
+    return async_pool
+
+
+async def close_pool():
+    """Close the pools opened by open_pool()."""
+    global async_pool, replica_pool
+    for pool in (replica_pool, async_pool):
+        if pool is not None:
+            await pool.close()
+    async_pool = replica_pool = None
+
+
+async def _replica_conn():
+    """
+    A replica connection while the replica is within DB_REPLICA_MAX_LAG_SECONDS,
+    else None. Shares db's lag-check state and interval.
+    """
+    if replica_pool is None:
+        return None
+    if not db._replica_check_due():
+        if not db._replica_state["healthy"]:
+            return None
+        try:
+            return await replica_pool.getconn()
+        except Exception as e:
+            logger.warning(f"Could not get a read-replica connection: {e}")
+            db._record_replica_check(False, None)
+            return None
+    conn = None
+    try:
+        conn = await replica_pool.getconn()
+        async with conn.cursor() as cur:
+            await cur.execute(db.REPLICA_LAG_SQL)
+            lag_seconds = float((await cur.fetchone())[0])
+        await conn.rollback()
+    except Exception as e:
+        logger.warning(f"Read-replica lag check failed: {e}")
+        if conn is not None:
+            await conn.close()
+            await replica_pool.putconn(conn)
+        db._record_replica_check(False, None)
+        return None
+    healthy = lag_seconds <= db.REPLICA_MAX_LAG_SECONDS
+    db._record_replica_check(healthy, lag_seconds)
+    if not healthy:
+        await replica_pool.putconn(conn)
+        return None
+    return conn
+
+
+@asynccontextmanager
+async def get_cursor(readonly=False):
+    """
+    Async version of db.get_cursor: yields (cursor, conn) with dict rows and commits
+    on success. readonly=True may read from the replica, as in db.get_cursor.
+    """
+    if async_pool is None:
+        await open_pool()
+    use_replica = readonly and replica_pool is not None and not db._reads_pinned()
+    conn = await _replica_conn() if use_replica else None
+    if conn is not None:
+        pool = replica_pool
+    else:
+        if use_replica:
+            db._replica_state["fallbacks"] += 1
+        conn = await async_pool.getconn()
+        pool = async_pool
+    try:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            yield cur, conn
+        await conn.commit()
+    except Exception:
+        # The pool discards connections that broke; rolling back a closed one would raise
+        if not conn.closed:
+            await conn.rollback()
+        raise
+    finally:
+        await pool.putconn(conn)
+
+
+async def get_all_accounts():
+    async with get_cursor(readonly=True) as (cur, conn):
+        await cur.execute("SELECT * FROM accounts ORDER BY id DESC")
+        return await cur.fetchall()
+
+
+async def _accounts_by_number(cur):
+    """The cached account labels (metadata_cache); loaded here when the cache is cold."""
+    accounts = metadata_cache.cache.fresh("accounts")
+    if accounts is None:
+        await cur.execute("SELECT account_number, account_name, account_type FROM accounts")
+        accounts = {row["account_number"]: {"account_name": row["account_name"], "account_type": row["account_type"]}
+                    for row in await cur.fetchall() if row["account_number"]}
+        metadata_cache.cache.put("accounts", accounts)
+    return accounts
+
+
+async def fetch_transactions(category=None, after_key=None, limit=100):
+    """
+    One page of transactions, newest first, as served by /transactions?format=json.
+    after_key is a decoded `next` token. Returns (rows, next_token).
+    """
+    query = """
+        SELECT t.id, t.email_timestamp,
+               COALESCE(TO_CHAR(t.email_timestamp, 'MM-DD-YYYY HH24:MI:SS'), '') AS date,
+               t.amount, COALESCE(t.merchant_name, 'unknown') AS merchant_name, t.transactiontype,
+               t.card_number, COALESCE(t.category, 'unknown') AS category
+        FROM transactions t
+    """
+    conditions = []
+    params = []
+    if category:
+        conditions.append("t.category = %s")
+        params.append(category)
+    if after_key:
+        conditions.append(keyset_before("t.email_timestamp", "t.id", after_key, params))
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY t.email_timestamp DESC, t.id DESC LIMIT %s"
+    params.append(limit + 1)
+
+    async with get_cursor(readonly=True) as (cur, conn):
+        accounts_by_number = await _accounts_by_number(cur)
+        await cur.execute(query, params)
+        rows, next_token = split_page(await cur.fetchall(), limit, key=lambda row: (row["email_timestamp"], row["id"]))
+
+    no_account = {"account_name": None, "account_type": None}
+    for txn in rows:
+        account = accounts_by_number.get(txn["card_number"], no_account)
+        txn["account_name"] = account["account_name"] or "-"
+        txn["account_type"] = account["account_type"] or "-"
+        txn["card_number"] = txn["card_number"] or "-"
+    return rows, next_token
+
+
+async def search_transactions(q, mode="trigram", category=None, after=None, limit=50):
+    """Async search.search_transactions; raises search.SearchError on bad input."""
+    sql, params = search.build_query(q, mode, category, after, limit)
+    async with get_cursor(readonly=True) as (cur, conn):
+        await cur.execute(sql, params)
+        rows = await cur.fetchall()
+    return split_page(rows, limit, key=lambda row: (row["score"], row["id"]))
+
+
+async def monthly_spending(year_month):
+    """Per-category totals for 'YYYY-MM' from the monthly rollup (get_monthly_spending)."""
+    async with get_cursor(readonly=True) as (cur, conn):
+        await cur.execute("SELECT * FROM get_monthly_spending(%s) ORDER BY total_amount DESC NULLS LAST",
+                          (year_month,))
+        return await cur.fetchall()
@@ -0,0 +1,200 @@
+"""
+Thread-safe PostgreSQL connection pool.
+
+- Checkout/return are guarded by one Condition; callers wait (up to a timeout) when
+  all connections are out instead of failing.
+- A connection is only validated (SELECT 1) when it has sat idle longer than
+  idle_check_seconds, so a busy app pays no extra round trip per checkout.
+- Connections older than max_age_seconds are closed and replaced on return/checkout.
+- Broken or foreign connections are never put back; replacements are created by the
+  pool itself, so the pool's size accounting always matches what it handed out.
+- stats() reports checkout wait time, active/idle counts and error counters.
+"""
+
+import threading
+import time
+import logging
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(PoolError):
+    """No connection became available within the checkout timeout."""
+
+
+class ConnectionPool:
+    def __init__(self, minconn, maxconn, idle_check_seconds=30.0, max_age_seconds=1800.0,
+                 checkout_timeout=30.0, connect=None, **connect_kwargs):
+        if not 0 <= minconn <= maxconn or maxconn < 1:
+            raise ValueError("need 0 <= minconn <= maxconn and maxconn >= 1")
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.idle_check_seconds = idle_check_seconds
+        self.max_age_seconds = max_age_seconds
+        self.checkout_timeout = checkout_timeout
+        self._connect_fn = connect or psycopg2.connect
+        self._connect_kwargs = connect_kwargs
+        self._cond = threading.Condition()
+        self._idle = []      # [(conn, returned_at)], used LIFO so warm connections stay warm
+        self._created = {}   # id(conn) -> created_at, for every connection the pool owns
+        self._size = 0       # owned connections plus ones being opened
+        self._active = 0
+        self._closed = False
+        self._metrics = {
+            "checkouts": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "timeouts": 0,
+            "connect_errors": 0,
+            "validation_failures": 0,
+            "recycled": 0,
+            "discarded": 0,
+        }
+        for _ in range(minconn):
+            self._size += 1
+            conn = self._new_connection()
+            self._idle.append((conn, time.monotonic()))
+
+    # --- internals ---
+
+    def _new_connection(self):
+        """Open a connection for a slot already counted in _size; frees the slot on failure."""
+        try:
+            conn = self._connect_fn(**self._connect_kwargs)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._metrics["connect_errors"] += 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._created[id(conn)] = time.monotonic()
+        return conn
+
+    def _discard(self, conn):
+        """Close a pool connection and free its slot. Caller must not hold the lock."""
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            if self._created.pop(id(conn), None) is not None:
+                self._size -= 1
+            self._cond.notify()
+
+    def _too_old(self, conn, now):
+        created = self._created.get(id(conn))
+        return created is not None and self.max_age_seconds and now - created > self.max_age_seconds
+
+    def _usable(self, conn, returned_at):
+        """Checks an idle connection outside the lock; validates only after a long idle."""
+        now = time.monotonic()
+        if conn.closed:
+            return False
+        if self._too_old(conn, now):
+            with self._cond:
+                self._metrics["recycled"] += 1
+            return False
+        if now - returned_at < self.idle_check_seconds:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            logger.warning("Pooled connection failed validation after %.0fs idle; replacing it", now - returned_at)
+            with self._cond:
+                self._metrics["validation_failures"] += 1
+            return False
+
+    # --- public API ---
+
+    def getconn(self, timeout=None):
+        """Check out a connection, waiting up to timeout (default checkout_timeout) seconds."""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolError("connection pool is closed")
+                    if self._idle:
+                        conn, returned_at = self._idle.pop()
+                        break
+                    if self._size < self.maxconn:
+                        # Take the slot now, connect outside the lock
+                        self._size += 1
+                        conn, returned_at = None, None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._metrics["timeouts"] += 1
+                        raise PoolTimeout(f"no database connection available within {timeout:.1f}s")
+                    self._cond.wait(remaining)
+
+            if conn is None:
+                conn = self._new_connection()
+            elif not self._usable(conn, returned_at):
+                self._discard(conn)
+                continue
+
+            waited = time.monotonic() - started
+            with self._cond:
+                self._active += 1
+                self._metrics["checkouts"] += 1
+                self._metrics["wait_seconds_total"] += waited
+                self._metrics["wait_seconds_max"] = max(self._metrics["wait_seconds_max"], waited)
+            return conn
+
+    def putconn(self, conn, close=False):
+        """Return a connection. Broken, aged-out or foreign connections are closed instead."""
+        with self._cond:
+            owned = id(conn) in self._created
+            if owned:
+                self._active -= 1
+        if not owned:
+            logger.warning("Connection returned to a pool that did not create it; closing it")
+            try:
+                conn.close()
+            except Exception:
+                pass
+            return
+        if not close and not conn.closed and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except Exception:
+                close = True
+        if close or conn.closed or self._closed or self._too_old(conn, time.monotonic()):
+            with self._cond:
+                self._metrics["discarded" if close or conn.closed else "recycled"] += 1
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self):
+        with self._cond:
+            checkouts = self._metrics["checkouts"]
+            stats = dict(self._metrics)
+            stats.update(
+                size=self._size,
+                active=self._active,
+                idle=len(self._idle),
+                maxconn=self.maxconn,
+                wait_seconds_avg=(stats["wait_seconds_total"] / checkouts) if checkouts else 0.0,
+            )
+        return stats
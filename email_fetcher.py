@@ -44,7 +44,7 @@ def _fetch_by_ids(imap, ids):
 # Build an IMAP SEARCH query for a single keyword with date constraints
 _DEF_FIELDS = ["SUBJECT", "BODY"]
 
-def _search_ids_for_keyword(imap, keyword, since=None, before=None, search_fields=None):
+def _search_ids_for_keyword(imap, keyword, since=None, before=None, search_fields=None, from_criteria=None):
     terms = []
     if since:
         terms += ["SINCE", since]
@@ -56,7 +56,7 @@ def _search_ids_for_keyword(imap, keyword, since=None, before=None, search_field
     for field in fields:
         field_terms += [field, f'"{keyword}"']
     # Wrap with ORs if multiple fields
-    query_parts = terms[:]
+    query_parts = terms + list(from_criteria or [])
     if len(fields) == 1:
         query_parts += field_terms
     else:
@@ -77,44 +77,50 @@ def _search_ids_for_keyword(imap, keyword, since=None, before=None, search_field
 # Fetch emails from the last n_days (default: 3) with optional keyword filtering
 from datetime import datetime, timedelta
 
-def fetch_emails_last_n_days(imap, n_days=3, keywords=None, search_fields=None):
+def fetch_emails_last_n_days(imap, n_days=3, keywords=None, search_fields=None, from_criteria=None):
     date_since = (datetime.now() - timedelta(days=n_days)).strftime("%d-%b-%Y")
     if keywords:
         all_ids = set()
         for kw in keywords:
-            ids = _search_ids_for_keyword(imap, kw, since=date_since, before=None, search_fields=search_fields)
+            ids = _search_ids_for_keyword(imap, kw, since=date_since, before=None, search_fields=search_fields,
+                                          from_criteria=from_criteria)
             for _id in ids:
                 all_ids.add(_id)
         ordered_ids = sorted(all_ids, key=lambda x: int(x))
         return _fetch_by_ids(imap, ordered_ids)
     # Fallback: no keywords, fetch all since date
-    status, data = imap.search(None, f'(SINCE "{date_since}")')
+    status, data = imap.search(None, f'(SINCE "{date_since}")', *(from_criteria or []))
     if status != "OK":
         return []
     email_ids = data[0].split()
     return _fetch_by_ids(imap, email_ids)
 
-def fetch_emails_date_range(imap, start_date, end_date, keywords=None, search_fields=None):
+def fetch_emails_date_range(imap, start_date, end_date, keywords=None, search_fields=None, from_criteria=None):
     since_str = start_date.strftime("%d-%b-%Y")
     before_str = (end_date + timedelta(days=1)).strftime("%d-%b-%Y")
     if keywords:
         all_ids = set()
         for kw in keywords:
-            ids = _search_ids_for_keyword(imap, kw, since=since_str, before=before_str, search_fields=search_fields)
+            ids = _search_ids_for_keyword(imap, kw, since=since_str, before=before_str, search_fields=search_fields,
+                                          from_criteria=from_criteria)
             for _id in ids:
                 all_ids.add(_id)
         ordered_ids = sorted(all_ids, key=lambda x: int(x))
         return _fetch_by_ids(imap, ordered_ids)
-    status, data = imap.search(None, f'(SINCE "{since_str}" BEFORE "{before_str}")')
+    status, data = imap.search(None, f'(SINCE "{since_str}" BEFORE "{before_str}")', *(from_criteria or []))
     if status != "OK":
         return []
     email_ids = data[0].split()
     return _fetch_by_ids(imap, email_ids)
 
-def fetch_emails(imap, n_days=None, start_date=None, end_date=None, keywords=None, search_fields=None):
+def fetch_emails(imap, n_days=None, start_date=None, end_date=None, keywords=None, search_fields=None,
+                 from_criteria=None):
+    """from_criteria: optional IMAP FROM criteria (sender_index.imap_from_criteria()) ANDed into every search."""
     if n_days is not None:
-        return fetch_emails_last_n_days(imap, n_days, keywords=keywords, search_fields=search_fields)
+        return fetch_emails_last_n_days(imap, n_days, keywords=keywords, search_fields=search_fields,
+                                        from_criteria=from_criteria)
     elif start_date is not None and end_date is not None:
-        return fetch_emails_date_range(imap, start_date, end_date, keywords=keywords, search_fields=search_fields)
+        return fetch_emails_date_range(imap, start_date, end_date, keywords=keywords, search_fields=search_fields,
+                                       from_criteria=from_criteria)
     else:
         raise ValueError("Provide either n_days or start_date & end_date")
\ No newline at end of file
@@ -0,0 +1,189 @@
+"""
+Fast decoding of the envelope headers we need per email: subject, sender and timestamp.
+
+Only the header block is parsed (compat32 policy, no body), the address regex and
+timezones are built once, and the RFC 2822 date shapes banks send are parsed with a
+single regex. Anything unusual falls back to the stdlib parsers, memoised per value.
+"""
+
+import re
+from datetime import datetime, timedelta, timezone
+from email.header import decode_header, make_header
+from email.parser import BytesHeaderParser
+from email.policy import Compat32
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+import logging
+import pytz
+
+logger = logging.getLogger(__name__)
+
+LOCAL_TZ_NAME = "Asia/Kolkata"
+
+
+class _Utf8HeaderPolicy(Compat32):
+    """compat32, except raw 8-bit header bytes are read as UTF-8 (as the default policy does)."""
+
+    def header_fetch_parse(self, name, value):
+        if not value.isascii():
+            try:
+                value = value.encode("ascii", "surrogateescape").decode("utf-8", "replace")
+            except UnicodeEncodeError:
+                pass  # already real text, not escaped bytes
+        return value
+
+
+_header_parser = BytesHeaderParser(policy=_Utf8HeaderPolicy())
+_ADDRESS_RE = re.compile(r'[\w\.-]+@[\w\.-]+')
+_FOLDING_RE = re.compile(r'\r?\n(?=[ \t])')
+# Message-ID value, possibly folded onto the next line; matched on raw header bytes
+_MESSAGE_ID_RE = re.compile(rb'^message-id:[ \t]*(?:\r?\n[ \t]+)?(<[^>\r\n]*>|\S+)', re.IGNORECASE | re.MULTILINE)
+
+# "Tue, 9 Sep 2025 09:28:13 +0530 (IST)" and friends: optional weekday, optional
+# seconds, numeric offset or GMT/UT/UTC/Z, optional trailing comment
+_RFC2822_DATE_RE = re.compile(
+    r'\s*(?:[A-Za-z]{3},\s*)?(\d{1,2})\s+([A-Za-z]{3})\s+(\d{4})\s+'
+    r'(\d{1,2}):(\d{2})(?::(\d{2}))?\s+'
+    r'(?:([+-])(\d{2})(\d{2})|(GMT|UTC?|Z))\s*(?:\(.*\))?\s*$'
+)
+_MONTHS = {name: idx for idx, name in enumerate(
+    ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), 1
+)}
+
+
+@lru_cache(maxsize=None)
+def get_timezone(name=LOCAL_TZ_NAME):
+    """Return a cached pytz timezone object."""
+    return pytz.timezone(name)
+
+
+@lru_cache(maxsize=None)
+def _fixed_offset(sign, hours, minutes):
+    delta = timedelta(hours=hours, minutes=minutes)
+    return timezone(-delta if sign == "-" else delta)
+
+
+def _unfold(value):
+    if not value:
+        return ""
+    if not isinstance(value, str):
+        value = str(value)
+    return _FOLDING_RE.sub("", value)
+
+
+def decode_subject(value):
+    """Decode an RFC 2047 encoded Subject header; plain ASCII subjects are returned as-is."""
+    value = _unfold(value)
+    if "=?" not in value:
+        return value
+    try:
+        return str(make_header(decode_header(value)))
+    except (LookupError, UnicodeError, ValueError):
+        parts = []
+        for part, enc in decode_header(value):
+            if isinstance(part, bytes):
+                try:
+                    part = part.decode(enc or "utf-8", errors="replace")
+                except LookupError:
+                    part = part.decode("utf-8", errors="replace")
+            parts.append(part)
+        return "".join(parts)
+
+
+def extract_sender(value):
+    """Return the email address from a From header, or the decoded header if none is found."""
+    value = _unfold(value)
+    if not value:
+        return ""
+    match = _ADDRESS_RE.search(value)
+    if match:
+        return match.group(0)
+    return decode_subject(value).strip()
+
+
+def _fast_parse_date(value):
+    match = _RFC2822_DATE_RE.match(value)
+    if not match:
+        return None
+    day, mon, year, hour, minute, second, sign, off_h, off_m, _zone = match.groups()
+    month = _MONTHS.get(mon.lower())
+    if month is None:
+        return None
+    tzinfo = _fixed_offset(sign, int(off_h), int(off_m)) if sign else timezone.utc
+    try:
+        return datetime(int(year), month, int(day), int(hour), int(minute), int(second or 0), tzinfo=tzinfo)
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=2048)
+def _slow_parse_date(value):
+    dt = parsedate_to_datetime(value)
+    if dt is not None and dt.tzinfo is None:
+        dt = dt.replace(tzinfo=pytz.UTC)
+    return dt
+
+
+def parse_header_date(value, tz_name=LOCAL_TZ_NAME):
+    """
+    Parse an RFC 2822 date into an aware datetime in tz_name.
+    Raises ValueError/TypeError (like parsedate_to_datetime) when the value can't be parsed.
+    """
+    value = _unfold(value)
+    dt = _fast_parse_date(value)
+    if dt is None:
+        dt = _slow_parse_date(value)
+        if dt is None:
+            raise ValueError(f"unparsable date {value!r}")
+    return dt.astimezone(get_timezone(tz_name))
+
+
+def parse_email_timestamp(date_value, received_values=(), tz_name=LOCAL_TZ_NAME):
+    """Timestamp from the Date header, falling back to the last Received header's date."""
+    if date_value:
+        try:
+            return parse_header_date(date_value, tz_name)
+        except (TypeError, ValueError, IndexError) as e:
+            logger.warning("Failed to parse Date header: %s - %s", date_value, e)
+    if received_values:
+        last_part = _unfold(received_values[-1]).rsplit(";", 1)[-1].strip()
+        try:
+            timestamp = parse_header_date(last_part, tz_name)
+            logger.info("Using Received header fallback for timestamp.")
+            return timestamp
+        except (TypeError, ValueError, IndexError) as e:
+            logger.warning("Failed to parse Received header fallback: %s - %s", last_part, e)
+    return None
+
+
+def parse_headers(raw_email_bytes):
+    """Parse only the header block of a raw email (the body is not decoded)."""
+    if isinstance(raw_email_bytes, str):
+        raw_email_bytes = raw_email_bytes.encode("utf-8", errors="replace")
+    return _header_parser.parsebytes(raw_email_bytes)
+
+
+def message_id_from_bytes(raw_email_bytes):
+    """
+    Message-ID of a raw email, read from the header block with one bytes regex (no parsing
+    or decoding of the message). Returns None if the header is missing.
+    """
+    if isinstance(raw_email_bytes, str):
+        raw_email_bytes = raw_email_bytes.encode("utf-8", errors="replace")
+    end = raw_email_bytes.find(b"\r\n\r\n")
+    if end < 0:
+        end = raw_email_bytes.find(b"\n\n")
+    head = raw_email_bytes if end < 0 else raw_email_bytes[:end]
+    match = _MESSAGE_ID_RE.search(head)
+    if not match:
+        return None
+    return match.group(1).decode("ascii", errors="replace").strip() or None
+
+
+def decode_envelope(raw_email_bytes):
+    """Return (subject, sender_email, email_timestamp) from the headers of a raw email."""
+    headers = parse_headers(raw_email_bytes)
+    subject = decode_subject(headers.get("Subject", ""))
+    sender_email = extract_sender(headers.get("From", ""))
+    email_timestamp = parse_email_timestamp(headers.get("Date"), headers.get_all("Received", []))
+    return subject, sender_email, email_timestamp
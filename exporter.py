@@ -0,0 +1,222 @@
+"""
+Streaming export of transactions as CSV, NDJSON or Parquet.
+
+Rows are read through a named (server-side) cursor BATCH_SIZE at a time and each
+batch is encoded and handed on before the next is fetched, so memory stays flat
+however many rows match. export() returns a generator of byte chunks that the
+/export/transactions endpoint streams as the response body and
+scripts/export_transactions.py writes to a file.
+
+Parquet needs pyarrow (optional); each batch becomes one row group.
+"""
+
+import csv
+import io
+import json
+import os
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import logging
+
+from db import get_cursor
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+
+COLUMNS = (
+    "id", "email_timestamp", "amount", "currency", "merchant_name", "merchant_id",
+    "transactiontype", "category", "card_number", "message_id",
+)
+
+FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+class ExportError(ValueError):
+    """Bad export parameters, or a format whose optional dependency is missing."""
+
+
+def parse_bound(value, end=False):
+    """
+    ISO date or datetime from a query/CLI argument. A bare end date includes that
+    whole day, so --start 2024-01-01 --end 2024-01-31 covers January.
+    """
+    if not value:
+        return None
+    try:
+        if len(value) == 10:
+            day = date.fromisoformat(value)
+            return datetime.combine(day + timedelta(days=1) if end else day, datetime.min.time())
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ExportError(f"invalid date: {value!r} (expected YYYY-MM-DD or ISO datetime)") from None
+
+
+def build_query(start=None, end=None, category=None, account=None):
+    """SELECT for the export; `account` matches a card number or an account name."""
+    conditions = []
+    params = {}
+    if start is not None:
+        conditions.append("t.email_timestamp >= %(start)s")
+        params["start"] = start
+    if end is not None:
+        conditions.append("t.email_timestamp < %(end)s")
+        params["end"] = end
+    if category:
+        conditions.append("t.category = %(category)s")
+        params["category"] = category
+    if account:
+        conditions.append("""(t.card_number = %(account)s
+            OR t.card_number IN (SELECT account_number FROM accounts WHERE account_name = %(account)s))""")
+        params["account"] = account
+    sql = f"SELECT {', '.join('t.' + c for c in COLUMNS)} FROM transactions t"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    # Oldest first along the (email_timestamp, id) index, so re-runs produce the same file
+    sql += " ORDER BY t.email_timestamp, t.id"
+    return sql, params
+
+
+def iter_batches(conn, sql, params, batch_size=BATCH_SIZE):
+    """Lists of row tuples from a server-side cursor, batch_size rows at a time."""
+    with conn.cursor(name="transactions_export") as cur:
+        cur.itersize = batch_size
+        cur.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                return
+            yield rows
+
+
+def _text(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_csv(batches):
+    yield (",".join(COLUMNS) + "\r\n").encode("utf-8")
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for rows in batches:
+        writer.writerows([_text(v) for v in row] for row in rows)
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+
+
+def _json_default(value):
+    # Decimal as a string keeps paise exact, the same as the JSON API
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def encode_ndjson(batches):
+    for rows in batches:
+        yield "".join(
+            json.dumps(dict(zip(COLUMNS, row)), default=_json_default, ensure_ascii=False) + "\n"
+            for row in rows
+        ).encode("utf-8")
+
+
+class _ChunkSink:
+    """Write-only file object that collects what pyarrow writes until drained."""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def encode_parquet(batches):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportError("Parquet export needs pyarrow (pip install pyarrow)") from None
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("email_timestamp", pa.timestamp("us", tz="UTC")),
+        ("amount", pa.decimal128(12, 2)),
+        ("currency", pa.string()),
+        ("merchant_name", pa.string()),
+        ("merchant_id", pa.string()),
+        ("transactiontype", pa.string()),
+        ("category", pa.string()),
+        ("card_number", pa.string()),
+        ("message_id", pa.string()),
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for rows in batches:
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+ENCODERS = {"csv": encode_csv, "ndjson": encode_ndjson, "parquet": encode_parquet}
+
+
+def export(fmt, start=None, end=None, category=None, account=None, batch_size=BATCH_SIZE):
+    """
+    Generator of encoded byte chunks for the matching transactions. The database
+    connection is held only while the generator runs and is returned when it is
+    exhausted or closed.
+    """
+    if fmt not in ENCODERS:
+        raise ExportError(f"unknown format {fmt!r}; use one of {', '.join(ENCODERS)}")
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401  (fail before the response starts, not mid-stream)
+        except ImportError:
+            raise ExportError("Parquet export needs pyarrow (pip install pyarrow)") from None
+    sql, params = build_query(start, end, category, account)
+    return _stream(fmt, sql, params, batch_size)
+
+
+def _stream(fmt, sql, params, batch_size):
+    rows_out = 0
+    with get_cursor(readonly=True) as (_, conn):
+        def counted(batches):
+            nonlocal rows_out
+            for rows in batches:
+                rows_out += len(rows)
+                yield rows
+        for chunk in ENCODERS[fmt](counted(iter_batches(conn, sql, params, batch_size))):
+            if chunk:
+                yield chunk
+    logger.info("Exported %d transactions as %s", rows_out, fmt)
@@ -3,14 +3,15 @@ from email import message_from_bytes
 from email.policy import default
 from categories import category_map
 from categories import email_map
-from patterns import bank_regex_patterns, select_best_pattern
+from pattern_registry import registry
+from converters import apply_converters, parse_amount
 import logging
+from itertools import repeat
 from bs4 import BeautifulSoup
 import pdb
 import sys
-from email.utils import parsedate_to_datetime
-from datetime import datetime
-import pytz
+from email_headers import decode_envelope
+from quarantine import quarantine
 
 logger = logging.getLogger(__name__)
 
@@ -56,126 +57,261 @@ def decode_email_body(raw_email_bytes):
 
     return body or ""
 
-def is_transaction_email(email_body: str) -> bool:
+# Keyword prefilters compiled once; substring semantics match the old any(kw in text) loops
+_TRANSACTION_KEYWORDS = [
+    "transaction", "debited", "credited", "payment", "spent", "withdrawn", "IMPS", "NEFT", "UPI", "Credit Card", "debit card", "amount", "Rs.", "INR", "₹", "amount debited"
+]
+_TRANSACTION_KEYWORDS_RE = re.compile("|".join(re.escape(kw.lower()) for kw in _TRANSACTION_KEYWORDS))
+
+# Skip stock market related emails
+_STOCK_KEYWORDS = [
+    "trades executed", "nse", "bse", "stock exchange", "equity", "portfolio update",
+    "contract note", "securities", "dividend", "board meeting", "annual report",
+    "quarterly results", "shareholder", "ipo", "fpo", "rights issue"
+]
+# Skip promotional/marketing emails (but allow transaction emails with offers)
+_PROMO_KEYWORDS = [
+    "limited time offer", "special offer", "campaign",
+    "promotion", "deal", "discount", "cashback", "reward", "bonus", "gift"
+    # Removed "exclusive offer" as it appears in legitimate transaction emails
+]
+# Skip system notifications (but allow transaction notifications)
+_SYSTEM_KEYWORDS = [
+    "login", "verification", "security", "maintenance",
+    "server", "update", "alert", "reminder"
+    # Removed "password" and "otp" as they appear in legitimate transaction emails
+]
+# Skip dividend and corporate action emails
+_CORPORATE_KEYWORDS = [
+    "dividend", "bonus", "split", "merger", "acquisition", "delisting",
+    "corporate action", "board meeting", "agm", "egm"
+]
+_SKIP_KEYWORDS_RE = re.compile("|".join(
+    re.escape(kw) for kw in _STOCK_KEYWORDS + _PROMO_KEYWORDS + _SYSTEM_KEYWORDS + _CORPORATE_KEYWORDS
+))
+_CURRENCY_TOKENS = ("INR", "Rs", "₹")
+
+def is_transaction_email(email_body: str, body_lower: str = None) -> bool:
     """Return True if the email body looks like a transaction, False otherwise."""
-    keywords = [
-        "transaction", "debited", "credited", "payment", "spent", "withdrawn", "IMPS", "NEFT", "UPI", "Credit Card", "debit card", "amount", "Rs.", "INR", "₹", "amount debited"
-    ]
-    return any(kw.lower() in email_body.lower() for kw in keywords)
+    if body_lower is None:
+        body_lower = email_body.lower()
+    return _TRANSACTION_KEYWORDS_RE.search(body_lower) is not None
 
-def should_skip_email(subject: str, body: str) -> bool:
-    """Return True if email should be skipped (non-transactional notifications)."""
-    text = f"{subject} {body}".lower()
-    
-    # Skip stock market related emails
-    stock_keywords = [
-        "trades executed", "nse", "bse", "stock exchange", "equity", "portfolio update",
-        "contract note", "securities", "dividend", "board meeting", "annual report",
-        "quarterly results", "shareholder", "ipo", "fpo", "rights issue"
-    ]
-    
-    # Skip promotional/marketing emails (but allow transaction emails with offers)
-    promo_keywords = [
-        "limited time offer", "special offer", "campaign", 
-        "promotion", "deal", "discount", "cashback", "reward", "bonus", "gift"
-        # Removed "exclusive offer" as it appears in legitimate transaction emails
-    ]
-    
-    # Skip system notifications (but allow transaction notifications)
-    system_keywords = [
-        "login", "verification", "security", "maintenance",
-        "server", "update", "alert", "reminder"
-        # Removed "password" and "otp" as they appear in legitimate transaction emails
-    ]
-    
-    # Skip dividend and corporate action emails
-    corporate_keywords = [
-        "dividend", "bonus", "split", "merger", "acquisition", "delisting",
-        "corporate action", "board meeting", "agm", "egm"
-    ]
-    
-    skip_keywords = stock_keywords + promo_keywords + system_keywords + corporate_keywords
-    
+def _should_skip_lower(subject_lower: str, body_lower: str) -> bool:
     # Whitelist: if it's clearly a transaction, don't skip
-    if "credit card" in text and "transaction" in text:
+    if (("credit card" in subject_lower or "credit card" in body_lower)
+            and ("transaction" in subject_lower or "transaction" in body_lower)):
         return False
-    
-    return any(keyword in text for keyword in skip_keywords)
+    return bool(_SKIP_KEYWORDS_RE.search(subject_lower) or _SKIP_KEYWORDS_RE.search(body_lower))
 
-def extract_transaction_data(email_body: str, subject: str = "") -> dict:
-    """Extract transaction data from an email body using the best matching pattern."""
-    # Filter out non-transactional emails
-    #if "ICICI" in subject.upper():
-    #pdb.Pdb(stdout=sys.stdout).set_trace()
+def should_skip_email(subject: str, body: str) -> bool:
+    """Return True if email should be skipped (non-transactional notifications)."""
+    return _should_skip_lower((subject or "").lower(), body.lower())
 
-    if not is_transaction_email(email_body):
-        logger.info("Email skipped as non-transactional.")
-        return None
-    
-    # Skip specific types of non-transactional emails
-    if should_skip_email(subject, email_body):
-        logger.info(f"Email skipped as non-transactional notification: {subject}")
-        return None
-    # Try all patterns and select the best match
-    pattern_name, match = select_best_pattern(email_body)
-    if not match:
-        logger.debug("No pattern matched for email body. Logging for review.")
-        with open("unmatched_emails.txt", "a", encoding="utf-8") as f:
-            f.write(email_body + "\n" + "="*80 + "\n")
-        return None
+def normalize_extracted_type(raw_type, body_lower: str):
+    """
+    Map a pattern's transactiontype to debit/credit/upi, falling back to body keywords
+    when the pattern doesn't say. Returns None if there is nothing to go on.
+    """
+    txn_type = (raw_type or "").lower()
+    if txn_type in ("", "unknown"):
+        if "spent" in body_lower or "debited" in body_lower:
+            txn_type = "debit"
+        elif "credited" in body_lower:
+            txn_type = "credit"
+        elif raw_type is None:
+            return None
+    if "upi" in txn_type:
+        return "upi"
+    elif "credit card" in txn_type or "creditcard" in txn_type:
+        return "debit"  # Credit card transactions are typically debits (spending)
+    elif "debit" in txn_type:
+        return "debit"
+    elif "credit" in txn_type and "card" not in txn_type:
+        return "credit"
+    # Default to debit for spending transactions
+    return "debit"
+
+def _detect_currency(captured, email_body: str):
+    """Return 'INR' if any INR/Rs/₹ token is present in the captured currency or the body."""
+    captured = str(captured or "")
+    if any(token in captured or token in email_body for token in _CURRENCY_TOKENS):
+        return "INR"
+    return captured or None
+
+# Statements and dividends are told apart by subject; bodies of bank credit alerts
+# routinely mention dividends (NACH credits) without being dividend notices
+_STATEMENT_SUBJECT_RE = re.compile(r"\bstatement\b")
+_DIVIDEND_SUBJECT_RE = re.compile(r"\bdividend\b")
+
+def _log_unmatched(email_body: str, subject: str = ""):
+    logger.debug("No pattern matched for email body. Quarantined for review.")
+    quarantine("unmatched", email_body, subject)
+
+def _build_data(patterns, kind: str, pattern_name: str, match, email_body: str, body_lower: str) -> dict:
     data = {}
-    fields = bank_regex_patterns[pattern_name]["fields"]
+    fields = getattr(patterns, kind)[pattern_name]["fields"]
     for idx, field in enumerate(fields):
         try:
             data[field] = match.group(idx + 1)
         except Exception:
             data[field] = ""
     # Add static fields from pattern definition
-    for k, v in bank_regex_patterns[pattern_name].items():
-        if k not in ("pattern", "fields"):
-            data[k] = v
-    # Post-process amount
-    if "amount" in data:
-        try:
-            data["amount"] = float(str(data["amount"]).replace(",", ""))
-        except Exception:
-            pass
-    # Post-process transactiontype based on keywords if not set or unknown
-    txn_type = data.get("transactiontype", "").lower()
+    data.update(patterns.statics[pattern_name])
+    # Typed conversion of captured fields (Decimal amounts, dates per the pattern's format)
+    apply_converters(data, patterns.converters[pattern_name])
+
+    if kind == "transactions":
+        # Normalize transaction types to our standard format, then set direction from it
+        txn_type = normalize_extracted_type(data.get("transactiontype"), body_lower)
+        if txn_type is not None:
+            data["transactiontype"] = txn_type
+            data["direction"] = "credit" if txn_type == "credit" else "debit"
+    # Post-process currency: set to 'INR' if any INR/Rs/₹ present
+    currency = _detect_currency(data.get("currency"), email_body)
+    if currency == "INR":
+        data["currency"] = currency
+    data["pattern_name"] = pattern_name
+    return data
+
+def extract_transaction_data(email_body: str, subject: str = "") -> dict:
+    """Extract transaction data from an email body using the best matching pattern."""
     body_lower = email_body.lower()
-    if txn_type in ("", "unknown"):
-        if "spent" in body_lower or "debited" in body_lower:
-            data["transactiontype"] = "debit"
-        elif "credited" in body_lower:
-            data["transactiontype"] = "credit"
+    if not is_transaction_email(email_body, body_lower):
+        logger.debug("Email skipped as non-transactional.")
+        return None
     
-    # Normalize transaction types to our standard format
-    if "transactiontype" in data:
-        txn_type = data["transactiontype"].lower()
-        if "upi" in txn_type:
-            data["transactiontype"] = "upi"
-        elif "credit card" in txn_type or "creditcard" in txn_type:
-            data["transactiontype"] = "debit"  # Credit card transactions are typically debits (spending)
-        elif "debit" in txn_type:
-            data["transactiontype"] = "debit"
-        elif "credit" in txn_type and "card" not in txn_type:
-            data["transactiontype"] = "credit"
+    # Skip specific types of non-transactional emails
+    if _should_skip_lower((subject or "").lower(), body_lower):
+        logger.debug("Email skipped as non-transactional notification: %s", subject)
+        return None
+    # Use one pattern snapshot for the whole extraction so a concurrent reload can't split it
+    patterns = registry.current()
+    pattern_name, match = patterns.select(email_body, body_lower=body_lower)
+    if not match:
+        _log_unmatched(email_body, subject)
+        return None
+    return _build_data(patterns, "transactions", pattern_name, match, email_body, body_lower)
+
+def classify_email(email_body: str, subject: str = ""):
+    """
+    Classify an email and extract its data in a single pass.
+
+    Returns (kind, data) with kind one of "transaction", "bill", "statement", "dividend",
+    or (None, None) when there is nothing to store. The body is lowercased and scanned
+    for route keywords once; bill and transaction patterns share that scan, and bill
+    patterns (all routed) only run when one of their keywords is present.
+    The subject is only used to spot statements and dividends; the skip filter looks at
+    the body, as the transaction path always has.
+    """
+    subject_lower = (subject or "").lower()
+    if _DIVIDEND_SUBJECT_RE.search(subject_lower):
+        return "dividend", {"subject": subject}
+    if _STATEMENT_SUBJECT_RE.search(subject_lower):
+        return "statement", {"subject": subject}
+
+    body_lower = email_body.lower()
+    if not is_transaction_email(email_body, body_lower) or _should_skip_lower("", body_lower):
+        logger.debug("Email skipped as non-transactional: %s", subject)
+        return None, None
+
+    patterns = registry.current()
+    hits = patterns.route_hits(body_lower)
+    for kind, label in (("bills", "bill"), ("transactions", "transaction")):
+        pattern_name, match = patterns.select(email_body, kind=kind, body_lower=body_lower, hits=hits)
+        if match:
+            return label, _build_data(patterns, kind, pattern_name, match, email_body, body_lower)
+    _log_unmatched(email_body, subject)
+    return None, None
+
+def parse_amounts(values, converters=None):
+    """
+    Parse a batch of captured amounts ('1,98,322.31') to Decimals; None where missing or
+    unparsable. converters optionally gives each value's pattern-specific converter.
+    """
+    parsed = []
+    for value, convert in zip(values, converters or repeat(parse_amount)):
+        try:
+            parsed.append(convert(value) if value not in (None, "") else None)
+        except ValueError:
+            parsed.append(None)
+    return parsed
+
+class ExtractionBatch:
+    """
+    Columnar result of extract_many: one list per column, aligned by row.
+    ``index`` is the position of each row's email in the input, so rows can be joined
+    back to subjects, timestamps or Message-IDs without building per-row dicts.
+    """
+    COLUMNS = ("index", "amount", "currency", "card_number", "merchant_name", "transactiontype", "pattern_name")
+    __slots__ = COLUMNS + ("skipped", "unmatched", "pattern_set_version")
+
+    def __init__(self, pattern_set_version=None):
+        for column in self.COLUMNS:
+            setattr(self, column, [])
+        self.skipped = []    # input indices filtered out as non-transactional
+        self.unmatched = []  # input indices no pattern matched
+        self.pattern_set_version = pattern_set_version
+
+    def __len__(self):
+        return len(self.index)
+
+    def rows(self, *columns):
+        """Iterate row tuples over the given columns (all by default), e.g. for execute_values."""
+        return zip(*(getattr(self, column) for column in (columns or self.COLUMNS)))
+
+def _column(match, groups, static, field):
+    # Captured group if the pattern has one for this field, else the static attribute
+    group = groups.get(field)
+    return match.group(group) if group else static.get(field)
+
+def extract_many(bodies, subjects=None) -> ExtractionBatch:
+    """
+    Extract transactions from many email bodies in one pass and return columnar results.
+    Uses a single pattern snapshot, the compiled keyword prefilters and one route-keyword
+    scan per body; amounts are parsed together at the end.
+    """
+    patterns = registry.current()
+    batch = ExtractionBatch(patterns.version)
+    if subjects is None:
+        subjects = repeat("")
+    field_groups = patterns.field_groups
+    statics = patterns.statics
+    raw_amounts = []
+    amount_converters = []
+    type_by_pattern = {}
+
+    for i, (body, subject) in enumerate(zip(bodies, subjects)):
+        body = body or ""
+        body_lower = body.lower()
+        if not _TRANSACTION_KEYWORDS_RE.search(body_lower) or _should_skip_lower((subject or "").lower(), body_lower):
+            batch.skipped.append(i)
+            continue
+        pattern_name, match = patterns.select(body, body_lower=body_lower)
+        if not match:
+            batch.unmatched.append(i)
+            continue
+
+        groups = field_groups[pattern_name]
+        static = statics[pattern_name]
+        batch.index.append(i)
+        batch.pattern_name.append(pattern_name)
+        raw_amounts.append(_column(match, groups, static, "amount"))
+        amount_converters.append(patterns.converters[pattern_name].get("amount", parse_amount))
+        batch.currency.append(_detect_currency(_column(match, groups, static, "currency"), body))
+        batch.card_number.append(_column(match, groups, static, "card_number"))
+        batch.merchant_name.append(_column(match, groups, static, "merchant_name"))
+        # A pattern's static type normalises the same way every time unless the body decides it
+        raw_type = static.get("transactiontype")
+        if (raw_type or "").lower() in ("", "unknown"):
+            batch.transactiontype.append(normalize_extracted_type(raw_type, body_lower))
         else:
-            # Default to debit for spending transactions
-            data["transactiontype"] = "debit"
-    
-    # Set direction based on normalized transactiontype
-    if "transactiontype" in data:
-        if data["transactiontype"] in ["debit", "upi"]:
-            data["direction"] = "debit"
-        elif data["transactiontype"] == "credit":
-            data["direction"] = "credit"
-    # Post-process currency: set to 'INR' if any INR/Rs/₹ present
-    currency_candidates = [str(data.get('currency', '')), email_body]
-    if any(token in candidate for candidate in currency_candidates for token in ['INR', 'Rs', '₹']):
-        data['currency'] = 'INR'
-    #pdb.Pdb(stdout=sys.stdout).set_trace()
-    return data
+            if pattern_name not in type_by_pattern:
+                type_by_pattern[pattern_name] = normalize_extracted_type(raw_type, body_lower)
+            batch.transactiontype.append(type_by_pattern[pattern_name])
+
+    batch.amount = parse_amounts(raw_amounts, amount_converters)
+    return batch
 
 def clean_email_body(body):
     """Clean up email body text (stub for extensibility)."""
@@ -187,86 +323,16 @@ def clean_email_body(body):
 
 
 # --- New function: parse_email_content ---
-from email.header import decode_header
-
 def parse_email_content(raw_email_bytes):
     """
     Parse an email from raw bytes and extract (subject, body, sender_email, email_timestamp).
-    Decodes subject if encoded, extracts plain text body, sender email, and timestamp.
+    Headers go through the fast path in email_headers; the body via decode_email_body.
     """
-    #pdb.Pdb(stdout=sys.__stdout__).set_trace()
-    # Parse email using the standard library
-    msg = message_from_bytes(raw_email_bytes, policy=default)
-
-    # Extract and decode subject
-    subject_header = msg.get("Subject", "")
-    decoded_subject = ""
-    if subject_header:
-        dh = decode_header(subject_header)
-        parts = []
-        for part, enc in dh:
-            if isinstance(part, bytes):
-                try:
-                    part_decoded = part.decode(enc or "utf-8", errors="replace")
-                except Exception:
-                    part_decoded = part.decode("utf-8", errors="replace")
-                parts.append(part_decoded)
-            else:
-                parts.append(part)
-        decoded_subject = ''.join(parts)
-    else:
-        decoded_subject = ""
-
-    # Extract sender email from "From" header
-    from_header = msg.get("From", "")
-    sender_email = ""
-    import re as _re
-    if from_header:
-        # Try to extract email address from the header
-        match = _re.search(r'[\w\.-]+@[\w\.-]+', from_header)
-        if match:
-            sender_email = match.group(0)
-        else:
-            sender_email = from_header.strip()
-    else:
-        sender_email = ""
-
-    # Extract email timestamp with fallback to Received header
-    ist = pytz.timezone('Asia/Kolkata')
-    email_timestamp = None
-
-    # First try Date header
-    date_str = msg.get("Date")
-    if date_str:
-        try:
-            dt = parsedate_to_datetime(date_str)
-            if dt is not None:
-                if dt.tzinfo is None:
-                    dt = dt.replace(tzinfo=pytz.UTC)
-                email_timestamp = dt.astimezone(ist)
-        except Exception as e:
-            logger.warning(f"Failed to parse Date header: {date_str} - {e}")
-
-    # Fallback to last Received header if Date header is missing or unparsable
-    if email_timestamp is None:
-        received_headers = msg.get_all("Received", [])
-        if received_headers:
-            try:
-                last_part = received_headers[-1].rsplit(";", 1)[-1].strip()
-                dt = parsedate_to_datetime(last_part)
-                if dt.tzinfo is None:
-                    dt = dt.replace(tzinfo=pytz.UTC)
-                email_timestamp = dt.astimezone(ist)
-                logger.info("Using Received header fallback for timestamp.")
-            except Exception as e:
-                logger.warning(f"Failed to parse Received header fallback: {last_part} - {e}")
-
-    #pdb.Pdb(stdout=sys.__stdout__).set_trace()
-
+    decoded_subject, sender_email, email_timestamp = decode_envelope(raw_email_bytes)
 
     # Extract body using decode_email_body  
     body = decode_email_body(raw_email_bytes)
-    logger.info(f"Date: {email_timestamp}")
+    logger.debug("Date: %s", email_timestamp)
 
 
-    return (decoded_subject, body, sender_email, email_timestamp)
\ No newline at end of file
+    return (decoded_subject, body, sender_email, email_timestamp)
@@ -1,23 +1,25 @@
 import re
-from datetime import datetime
 import logging
+from converters import compile_date_parser, parse_amount
+from quarantine import quarantine
 
 logger = logging.getLogger(__name__)
 
+_UPI_AMOUNT_RE = re.compile(r"Rs\.?([\d,]+\.\d{2})")
+_UPI_DATE_RE = re.compile(r"on (\d{2}-\d{2}-\d{2})")
+_parse_upi_date = compile_date_parser("%d-%m-%y")
+
 def handle_upi_email(subject: str, body: str, email_data: dict) -> dict:
     """Parse UPI email for transaction details and update email_data dict."""
     try:
-        # Write the email body content to body.txt for later analysis
-        with open("body.txt", "a", encoding="utf-8") as f:
-           f.write(f"Subject: {subject}\n")
-           f.write(f"Body: {body}\n\n")
-
         # Extract amount
-        amount_match = re.search(r"Rs\.?([\d,]+\.\d{2})", body)
+        amount_match = _UPI_AMOUNT_RE.search(body)
         if amount_match:
-            email_data["amount"] = amount_match.group(1).replace(",", "")
+            email_data["amount"] = parse_amount(amount_match.group(1))
         else:
             logger.warning("No amount found in email: %s", subject)
+            # Keep the body for pattern authors (replaces dumping every UPI body to body.txt)
+            quarantine("upi_unparsed", body, subject)
 
         # Extract card info
         card_match = re.search(r"Card\s+(?:Number\s+)?(?:XX)?(\d{4})", body)
@@ -43,11 +45,10 @@ def handle_upi_email(subject: str, body: str, email_data: dict) -> dict:
             logger.warning("No reference number found in email: %s", subject)
 
         # Extract date in DD-MM-YY format and convert to ISO format
-        date_match = re.search(r"on (\d{2}-\d{2}-\d{2})", body)
+        date_match = _UPI_DATE_RE.search(body)
         if date_match:
             try:
-                parsed_date = datetime.strptime(date_match.group(1), "%d-%m-%y")
-                email_data["txn_date"] = parsed_date.date().isoformat()
+                email_data["txn_date"] = _parse_upi_date(date_match.group(1)).isoformat()
             except ValueError:
                 logger.warning("Failed to parse date: %s", date_match.group(1))
         else:
@@ -57,6 +58,7 @@ def handle_upi_email(subject: str, body: str, email_data: dict) -> dict:
 
     except Exception as e:
         logger.error("Error processing UPI email for subject '%s': %s", subject, e)
+        quarantine("upi_failed", body, subject)
         email_data["error"] = f"Failed to process UPI email: {str(e)}"
 
     return email_data
\ No newline at end of file
@@ -0,0 +1,57 @@
+"""
+JSON encoding for the list endpoints.
+
+Rows go straight from the cursor's dicts to JSON bytes: dates are already formatted
+by the query (to_char), and encoding uses orjson when it is installed, falling back
+to the standard library otherwise. Both encoders emit Decimal as a string, the same
+as Flask's jsonify, so the two paths produce the same values.
+
+Endpoints that return rows accept ?shape=columns for a column-oriented body
+({"amount": [...], "merchant_name": [...]}), which charting clients consume directly
+and which repeats no keys.
+"""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import Response
+
+try:
+    import orjson
+except ImportError:  # optional; the standard library encoder is used instead
+    orjson = None
+
+SHAPES = ("rows", "columns")
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    def dumps(obj):
+        """obj as UTF-8 JSON bytes."""
+        return orjson.dumps(obj, default=_default)
+else:
+    _encoder = json.JSONEncoder(default=_default, ensure_ascii=False, separators=(",", ":"))
+
+    def dumps(obj):
+        """obj as UTF-8 JSON bytes."""
+        return _encoder.encode(obj).encode("utf-8")
+
+
+def shape_rows(rows, columns, shape="rows"):
+    """Project rows (dicts) onto columns, as a list of objects or an object of lists."""
+    if shape == "columns":
+        return {column: [row[column] for row in rows] for column in columns}
+    return [{column: row[column] for column in columns} for row in rows]
+
+
+def response(obj, status=200):
+    """A Flask response with obj encoded by dumps()."""
+    return Response(dumps(obj), status=status, mimetype="application/json")
@@ -0,0 +1,96 @@
+"""
+Logging for the app: a QueueHandler on the root logger feeding a QueueListener thread
+that owns the (rotating) file and console handlers, so request threads never format
+records or touch the disk.
+
+Per-message logs in the ingestion path go through a StageSampler: the first few
+messages of each stage are logged, then one in every N, and the stage totals are
+logged once per run with log_stage_summary().
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_DIR = os.getenv("LOG_DIR", "logs")
+LOG_FILE = os.getenv("LOG_FILE", "app.log")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+_listener = None
+_setup_lock = threading.Lock()
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves %-formatting to the listener thread.
+    The stock prepare() formats every record on the calling thread; within one process
+    the record can be queued as-is. Exception text is rendered eagerly because the
+    traceback's frames may change once the caller moves on.
+    """
+
+    def prepare(self, record):
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging(level=LOG_LEVEL, log_dir=LOG_DIR, log_file=LOG_FILE,
+                      max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT):
+    """Install the queue-based handlers on the root logger (idempotent). Returns the listener."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return _listener
+        os.makedirs(log_dir, exist_ok=True)
+        formatter = logging.Formatter(LOG_FORMAT)
+        file_handler = RotatingFileHandler(os.path.join(log_dir, log_file), maxBytes=max_bytes,
+                                           backupCount=backup_count, encoding="utf-8")
+        file_handler.setFormatter(formatter)
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
+        console_handler.setLevel(logging.WARNING)
+
+        log_queue = queue.SimpleQueue()  # unbounded: put never blocks the caller
+        root = logging.getLogger()
+        root.addHandler(DeferredQueueHandler(log_queue))
+        root.setLevel(level)
+        _listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+        return _listener
+
+
+class StageSampler:
+    """Decides which per-message log lines to emit: the first `first` per stage, then every `every`-th."""
+
+    def __init__(self, first=20, every=1000):
+        self.first = first
+        self.every = every
+        self.counts = {}
+
+    def allow(self, stage):
+        n = self.counts.get(stage, 0) + 1
+        self.counts[stage] = n
+        return n <= self.first or n % self.every == 0
+
+    def reset(self):
+        counts, self.counts = self.counts, {}
+        return counts
+
+
+sampler = StageSampler(first=int(os.getenv("LOG_SAMPLE_FIRST", "20")),
+                       every=int(os.getenv("LOG_SAMPLE_EVERY", "1000")))
+
+
+def log_stage_summary(logger, counts=None):
+    """Log one line with how many messages each sampled stage saw, then reset the counters."""
+    counts = sampler.reset() if counts is None else counts
+    if counts:
+        logger.info("Ingestion stages: %s", ", ".join(f"{stage}={n}" for stage, n in sorted(counts.items())))
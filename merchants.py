@@ -0,0 +1,113 @@
+"""
+Merchant canonicalisation.
+
+Bank alerts spell the same merchant many ways: 'IND*Amazon', 'AMAZON PAY INDIA',
+'amazonpay@apl', or an SBI capture cut short at a word boundary. resolve_merchant()
+maps those to one canonical id (e.g. 'amazon') using, in order:
+
+  1. the alias table in categories.merchant_aliases (after normalisation)
+  2. payment-gateway prefix rules (IND*, PAYU*, POS ...) and UPI VPA rules
+  3. the longest alias that the name starts with ('amazon pay india' -> 'amazon')
+  4. a difflib fuzzy match against the aliases
+
+Names that resolve to nothing get a slug of their normalised form as their id.
+Results are kept in an LRU cache, so repeat merchants resolve with one dict lookup.
+"""
+
+import difflib
+import re
+from functools import lru_cache
+from categories import merchant_aliases
+
+UNKNOWN_MERCHANT = "unknown"
+
+# Payment gateway / acquirer prefixes put in front of the merchant name
+_PREFIX_RE = re.compile(
+    r"^\s*(?:(?:ind|amz|payu|pyu|raz|rzp|ccavenue|paytm|bd|sq|pp)\s*\*\s*|pos\s+(?:\d+\s+)?|ecom\s+|upi\s*[-/]\s*)+",
+    re.IGNORECASE,
+)
+_VPA_RE = re.compile(r"^\s*([a-z0-9][a-z0-9._\-]*)@([a-z][a-z0-9]*)\s*$", re.IGNORECASE)
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+# Legal-entity and country suffixes that don't tell merchants apart
+_SUFFIX_TOKENS = frozenset(("pvt", "private", "ltd", "limited", "llp", "inc", "india", "in", "com", "co", "www"))
+_MIN_PREFIX_LEN = 4
+_FUZZY_CUTOFF = 0.85
+CACHE_SIZE = 8192
+
+
+def normalise_merchant_key(name):
+    """Lowercase, drop gateway prefixes, punctuation, reference numbers and legal/country suffixes."""
+    text = _PREFIX_RE.sub("", str(name or ""))
+    tokens = _NON_ALNUM_RE.sub(" ", text.lower()).split()
+    # Trailing reference numbers ('... LIMITED-37405928') go too
+    while tokens and (tokens[-1] in _SUFFIX_TOKENS or tokens[-1].isdigit()):
+        tokens.pop()
+    while tokens and tokens[0] == "www":
+        tokens.pop(0)
+    return " ".join(tokens)
+
+
+def _slug(key):
+    return key.replace(" ", "_")
+
+
+class MerchantIndex:
+    """Alias index over a {canonical_id: [spellings]} table with a per-index LRU cache."""
+
+    def __init__(self, aliases, cache_size=CACHE_SIZE):
+        self.by_key = {}
+        for canonical_id, spellings in aliases.items():
+            for spelling in [canonical_id.replace("_", " ")] + list(spellings):
+                key = normalise_merchant_key(spelling)
+                if key:
+                    self.by_key.setdefault(key, canonical_id)
+        # Longest first, so 'amazon pay' wins over 'amazon' for prefix matches
+        self.keys_by_length = sorted(self.by_key, key=len, reverse=True)
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    def _lookup(self, key):
+        canonical_id = self.by_key.get(key)
+        if canonical_id:
+            return canonical_id
+        # Longer name that starts with a known alias: 'amazon pay india retail'
+        for alias_key in self.keys_by_length:
+            if key.startswith(alias_key + " "):
+                return self.by_key[alias_key]
+        # Truncated capture that is the start of exactly one alias: 'flipk'
+        if len(key) >= _MIN_PREFIX_LEN:
+            candidates = {self.by_key[k] for k in self.keys_by_length if k.startswith(key)}
+            if len(candidates) == 1:
+                return candidates.pop()
+        close = difflib.get_close_matches(key, self.keys_by_length, n=1, cutoff=_FUZZY_CUTOFF)
+        return self.by_key[close[0]] if close else None
+
+    def _resolve_vpa(self, local, handle):
+        # 'amazonpay@apl', 'swiggy.stores@axb', 'paytmqr2810050501@paytm'
+        for token in re.split(r"[._\-\d]+", local.lower()):
+            if len(token) >= 3:
+                canonical_id = self._lookup(token)
+                if canonical_id:
+                    return canonical_id
+        return f"upi:{local.lower()}@{handle.lower()}"
+
+    def _resolve(self, name, payment_id=None):
+        name = (name or "").strip()
+        if not name or name.lower() == UNKNOWN_MERCHANT:
+            name = (payment_id or "").strip()
+        if not name:
+            return UNKNOWN_MERCHANT
+        vpa = _VPA_RE.match(name)
+        if vpa:
+            return self._resolve_vpa(*vpa.groups())
+        key = normalise_merchant_key(name)
+        if not key:
+            return UNKNOWN_MERCHANT
+        return self._lookup(key) or _slug(key)
+
+
+_default_index = MerchantIndex(merchant_aliases)
+
+
+def resolve_merchant(name, payment_id=None):
+    """Return the canonical merchant id for a raw merchant name (or UPI VPA)."""
+    return _default_index.resolve(name, payment_id)
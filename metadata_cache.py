@@ -0,0 +1,120 @@
+"""
+In-process cache of the small, slow-changing metadata the transactions page needs
+on every request: the category list, the accounts (to label card numbers) and the
+oldest/newest transaction timestamps.
+
+Categories come from the `categories` table, which ingestion keeps complete through
+register_categories(); none of the loaders scan `transactions`. Entries expire after
+METADATA_CACHE_TTL seconds and are dropped early when ingestion or the account
+routes change what they summarise. Each worker process has its own cache, so
+another worker's change shows up here within one TTL.
+"""
+
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+CACHE_TTL = float(os.getenv("METADATA_CACHE_TTL", "300"))
+
+
+class MetadataCache:
+    """name -> (value, loaded_at), loaded on demand with a caller-supplied loader."""
+
+    def __init__(self, ttl=CACHE_TTL, clock=time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def get(self, name, loader):
+        entry = self._values.get(name)
+        if entry is not None and self._clock() - entry[1] < self.ttl:
+            return entry[0]
+        value = loader()
+        with self._lock:
+            self._values[name] = (value, self._clock())
+        return value
+
+    def fresh(self, name):
+        """Cached value if it has not expired, else None; never loads."""
+        entry = self._values.get(name)
+        if entry is not None and self._clock() - entry[1] < self.ttl:
+            return entry[0]
+        return None
+
+    def put(self, name, value):
+        """Store a value loaded elsewhere (e.g. by an async query)."""
+        with self._lock:
+            self._values[name] = (value, self._clock())
+
+    def peek(self, name):
+        """Cached value even if expired, or None; never loads."""
+        entry = self._values.get(name)
+        return entry[0] if entry is not None else None
+
+    def invalidate(self, *names):
+        """Drop the named entries (all of them when none are given)."""
+        with self._lock:
+            if names:
+                for name in names:
+                    self._values.pop(name, None)
+            else:
+                self._values.clear()
+
+
+cache = MetadataCache()
+
+
+def _column(row, key):
+    return row[key] if isinstance(row, dict) else row[0]
+
+
+def categories(cursor):
+    """Active category names, sorted."""
+    def load():
+        cursor.execute("SELECT name FROM categories WHERE is_active ORDER BY name")
+        return [_column(row, "name") for row in cursor.fetchall()]
+    return cache.get("categories", load)
+
+
+def accounts(cursor):
+    """account_number -> {"account_name", "account_type"} for labelling transactions."""
+    def load():
+        cursor.execute("SELECT account_number, account_name, account_type FROM accounts")
+        return {row["account_number"]: {"account_name": row["account_name"], "account_type": row["account_type"]}
+                for row in cursor.fetchall() if row["account_number"]}
+    return cache.get("accounts", load)
+
+
+def date_bounds(cursor):
+    """(oldest, newest) email_timestamp of stored transactions; two index probes."""
+    def load():
+        cursor.execute("SELECT MIN(email_timestamp) AS oldest, MAX(email_timestamp) AS newest FROM transactions")
+        row = cursor.fetchone()
+        return (row["oldest"], row["newest"]) if row else (None, None)
+    return cache.get("date_bounds", load)
+
+
+def register_categories(cursor, names):
+    """
+    Make sure every category used by new rows exists in `categories`, so the cached
+    list stays complete. Only names missing from the cached list cost a query.
+    """
+    names = {name for name in names if name}
+    known = cache.peek("categories")
+    missing = names - set(known) if known is not None else names
+    if not missing:
+        return 0
+    cursor.execute("""
+        INSERT INTO categories (name)
+        SELECT unnest(%s::text[])
+        ON CONFLICT (name) DO NOTHING
+    """, (sorted(missing),))
+    cache.invalidate("categories")
+    if cursor.rowcount:
+        logger.info("Registered %d new categor%s: %s", cursor.rowcount,
+                    "y" if cursor.rowcount == 1 else "ies", ", ".join(sorted(missing)))
+    return cursor.rowcount
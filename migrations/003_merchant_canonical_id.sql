@@ -0,0 +1,7 @@
+-- Migration: 003_merchant_canonical_id.sql
+-- Description: Canonical merchant id on transactions (see merchants.py)
+-- Existing rows are filled in by scripts/backfill_merchant_ids.py
+
+ALTER TABLE transactions ADD COLUMN IF NOT EXISTS merchant_id TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_transactions_merchant_id ON transactions(merchant_id);
@@ -0,0 +1,8 @@
+-- Migration: 004_transactions_keyset_indexes.sql
+-- Description: Indexes for keyset pagination of /transactions on (email_timestamp, id)
+
+ALTER TABLE transactions ADD COLUMN IF NOT EXISTS email_timestamp TIMESTAMPTZ;
+
+-- Newest-first listing, optionally filtered by category; id breaks timestamp ties
+CREATE INDEX IF NOT EXISTS idx_transactions_ts_id ON transactions(email_timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_transactions_category_ts_id ON transactions(category, email_timestamp DESC, id DESC);
@@ -0,0 +1,9 @@
+-- Migration: 005_categories_from_transactions.sql
+-- Description: One-time copy of every category used by transactions into categories.
+-- From here on ingestion registers new categories itself (metadata_cache.register_categories),
+-- so the transactions page reads its category list from this small table.
+
+INSERT INTO categories (name)
+SELECT DISTINCT category FROM transactions
+WHERE category IS NOT NULL AND category <> ''
+ON CONFLICT (name) DO NOTHING;
@@ -0,0 +1,128 @@
+-- Migration: 006_transaction_monthly_rollup.sql
+-- Description: Monthly rollup of transactions maintained by statement-level triggers.
+-- transaction_summary and get_monthly_spending() now read the rollup instead of
+-- re-aggregating transactions. Repair drift with scripts/rebuild_rollup.py.
+--
+-- A transaction's month is that of email_timestamp (what ingestion writes), falling
+-- back to date for older rows, truncated in the database's TimeZone as before.
+-- NULL category/card_number are stored as '' because they are part of the key.
+
+CREATE TABLE IF NOT EXISTS transaction_monthly_rollup (
+    month TIMESTAMPTZ NOT NULL,
+    transactiontype VARCHAR(20) NOT NULL,
+    category VARCHAR(50) NOT NULL DEFAULT '',
+    card_number TEXT NOT NULL DEFAULT '',
+    transaction_count BIGINT NOT NULL DEFAULT 0,
+    total_amount NUMERIC(16,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (month, transactiontype, category, card_number)
+);
+
+-- Adds the per-group deltas of one statement's old (sign -1) and new (sign +1) rows
+CREATE OR REPLACE FUNCTION transaction_rollup_apply()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO transaction_monthly_rollup AS r
+            (month, transactiontype, category, card_number, transaction_count, total_amount)
+        SELECT DATE_TRUNC('month', COALESCE(email_timestamp, date)), transactiontype,
+               COALESCE(category, ''), COALESCE(card_number, ''), -COUNT(*), -SUM(amount)
+        FROM old_rows
+        WHERE COALESCE(email_timestamp, date) IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+        ORDER BY 1, 2, 3, 4  -- same lock order in every session
+        ON CONFLICT (month, transactiontype, category, card_number) DO UPDATE
+        SET transaction_count = r.transaction_count + EXCLUDED.transaction_count,
+            total_amount = r.total_amount + EXCLUDED.total_amount;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO transaction_monthly_rollup AS r
+            (month, transactiontype, category, card_number, transaction_count, total_amount)
+        SELECT DATE_TRUNC('month', COALESCE(email_timestamp, date)), transactiontype,
+               COALESCE(category, ''), COALESCE(card_number, ''), COUNT(*), SUM(amount)
+        FROM new_rows
+        WHERE COALESCE(email_timestamp, date) IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+        ORDER BY 1, 2, 3, 4
+        ON CONFLICT (month, transactiontype, category, card_number) DO UPDATE
+        SET transaction_count = r.transaction_count + EXCLUDED.transaction_count,
+            total_amount = r.total_amount + EXCLUDED.total_amount;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM transaction_monthly_rollup WHERE transaction_count = 0;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- One trigger per event: transition tables can't be shared by multi-event triggers
+DROP TRIGGER IF EXISTS transactions_rollup_insert ON transactions;
+DROP TRIGGER IF EXISTS transactions_rollup_update ON transactions;
+DROP TRIGGER IF EXISTS transactions_rollup_delete ON transactions;
+
+CREATE TRIGGER transactions_rollup_insert
+    AFTER INSERT ON transactions
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION transaction_rollup_apply();
+
+CREATE TRIGGER transactions_rollup_update
+    AFTER UPDATE ON transactions
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION transaction_rollup_apply();
+
+CREATE TRIGGER transactions_rollup_delete
+    AFTER DELETE ON transactions
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION transaction_rollup_apply();
+
+-- Recompute the rollup from transactions; writers wait while it runs
+CREATE OR REPLACE FUNCTION rebuild_transaction_rollup()
+RETURNS BIGINT AS $$
+DECLARE
+    groups BIGINT;
+BEGIN
+    LOCK TABLE transactions IN SHARE MODE;
+    DELETE FROM transaction_monthly_rollup;
+    INSERT INTO transaction_monthly_rollup
+        (month, transactiontype, category, card_number, transaction_count, total_amount)
+    SELECT DATE_TRUNC('month', COALESCE(email_timestamp, date)), transactiontype,
+           COALESCE(category, ''), COALESCE(card_number, ''), COUNT(*), SUM(amount)
+    FROM transactions
+    WHERE COALESCE(email_timestamp, date) IS NOT NULL
+    GROUP BY 1, 2, 3, 4;
+    GET DIAGNOSTICS groups = ROW_COUNT;
+    RETURN groups;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT rebuild_transaction_rollup();
+
+-- Same columns as before, now a few hundred rollup rows instead of every transaction
+DROP VIEW IF EXISTS transaction_summary;
+CREATE VIEW transaction_summary AS
+SELECT
+    month,
+    transactiontype,
+    NULLIF(category, '')::VARCHAR(50) AS category,
+    SUM(transaction_count)::BIGINT AS transaction_count,
+    SUM(total_amount) AS total_amount,
+    SUM(total_amount) / SUM(transaction_count) AS avg_amount
+FROM transaction_monthly_rollup
+GROUP BY month, transactiontype, category
+ORDER BY month DESC, total_amount DESC;
+
+-- year_month is 'YYYY-MM'; the month is an equality match on the rollup's primary key
+CREATE OR REPLACE FUNCTION get_monthly_spending(year_month TEXT)
+RETURNS TABLE (
+    category_name VARCHAR(50),
+    total_amount NUMERIC(12,2),
+    transaction_count BIGINT
+) AS $$
+    SELECT
+        NULLIF(r.category, '')::VARCHAR(50),
+        SUM(r.total_amount)::NUMERIC(12,2),
+        SUM(r.transaction_count)::BIGINT
+    FROM transaction_monthly_rollup r
+    WHERE r.month = TO_TIMESTAMP(year_month, 'YYYY-MM')
+    GROUP BY r.category
+    ORDER BY 2 DESC;
+$$ LANGUAGE sql STABLE;
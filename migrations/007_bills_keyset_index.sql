@@ -0,0 +1,19 @@
+-- Migration: 007_bills_keyset_index.sql
+-- Description: bills table (created outside the migrations until now) and the index
+-- behind /bills keyset pagination on (email_timestamp, message_id)
+
+CREATE TABLE IF NOT EXISTS bills (
+    id SERIAL PRIMARY KEY,
+    amount NUMERIC(12,2),
+    merchant_name TEXT,
+    transactiontype VARCHAR(20),
+    category VARCHAR(50) DEFAULT 'unknown',
+    subject TEXT,
+    message_id TEXT NOT NULL UNIQUE,
+    currency VARCHAR(3) DEFAULT 'INR',
+    email_timestamp TIMESTAMPTZ,
+    card_number TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_bills_ts_message_id ON bills(email_timestamp DESC, message_id DESC);
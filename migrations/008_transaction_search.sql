@@ -0,0 +1,19 @@
+-- Migration: 008_transaction_search.sql
+-- Description: Indexes behind /transactions/search (see search.py)
+-- pg_trgm GIN indexes serve ILIKE '%q%' and word_similarity() on merchant_name,
+-- subject and remarks; search_tsv backs the full-text mode.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_transactions_merchant_trgm ON transactions USING gin (merchant_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_transactions_subject_trgm ON transactions USING gin (subject gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_transactions_remarks_trgm ON transactions USING gin (remarks gin_trgm_ops);
+
+-- 'simple' configuration: merchant names and bank wording don't stem usefully.
+-- Adding a stored generated column rewrites the table once.
+ALTER TABLE transactions ADD COLUMN IF NOT EXISTS search_tsv tsvector
+    GENERATED ALWAYS AS (
+        to_tsvector('simple', COALESCE(merchant_name, '') || ' ' || COALESCE(subject, '') || ' ' || COALESCE(remarks, ''))
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_transactions_search_tsv ON transactions USING gin (search_tsv);
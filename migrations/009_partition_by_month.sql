@@ -0,0 +1,194 @@
+-- Migration: 009_partition_by_month.sql  (OPTIONAL, PostgreSQL 13+)
+-- Description: Convert transactions and bank_emails into monthly range-partitioned
+-- tables on email_timestamp / email_date. Run it with PARTITION_TABLES=true
+-- python setup_database.py, or by hand with psql; it is a no-op on tables that are
+-- already partitioned.
+--
+-- * One partition per month (<table>_pYYYY_MM) plus <table>_default, which takes
+--   rows with a NULL or not-yet-partitioned timestamp.
+-- * Unique keys on a partitioned table must include the partition key, so
+--   message_id is unique per (message_id, timestamp). A redelivered email has the
+--   same Date header and therefore the same key; ingestion also checks Message-IDs
+--   against all months before inserting (db.get_known_message_ids).
+-- * id keeps its sequence but is no longer a primary key (a primary key would have
+--   to include the nullable email_timestamp); it stays indexed.
+-- * ensure_monthly_partitions() creates upcoming months (the app calls it before each
+--   fetch; scripts/partition_maintenance.py runs it from cron), and
+--   drop_partitions_before() implements retention as a partition drop.
+
+-- Creates <parent>_pYYYY_MM for the month starting at month_start. Rows already in
+-- the default partition for that month are moved into it (through the parent, so
+-- statement triggers such as the monthly rollup see a delete and an insert).
+CREATE OR REPLACE FUNCTION create_month_partition(parent TEXT, key_column TEXT, month_start DATE)
+RETURNS BOOLEAN AS $$
+DECLARE
+    part TEXT := format('%s_p%s', parent, to_char(month_start, 'YYYY_MM'));
+    lo TIMESTAMPTZ := date_trunc('month', month_start);
+    hi TIMESTAMPTZ := date_trunc('month', month_start) + INTERVAL '1 month';
+    cols TEXT;
+    stray BIGINT := 0;
+BEGIN
+    IF to_regclass(part) IS NOT NULL THEN
+        RETURN FALSE;
+    END IF;
+    IF to_regclass(parent || '_default') IS NOT NULL THEN
+        EXECUTE format('SELECT COUNT(*) FROM %I WHERE %I >= $1 AND %I < $2', parent || '_default', key_column, key_column)
+            INTO stray USING lo, hi;
+    END IF;
+    IF stray > 0 THEN
+        -- Every column except generated ones, which can't be inserted
+        SELECT string_agg(quote_ident(attname), ', ' ORDER BY attnum) INTO cols
+        FROM pg_attribute
+        WHERE attrelid = parent::regclass AND attnum > 0 AND NOT attisdropped AND attgenerated = '';
+        EXECUTE format('CREATE TEMP TABLE _partition_moved_rows ON COMMIT DROP AS SELECT %s FROM %I WITH NO DATA', cols, parent);
+        EXECUTE format('WITH d AS (DELETE FROM %I WHERE %I >= $1 AND %I < $2 RETURNING %s) INSERT INTO _partition_moved_rows SELECT * FROM d',
+                       parent, key_column, key_column, cols) USING lo, hi;
+    END IF;
+    EXECUTE format('CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)', part, parent, lo, hi);
+    IF stray > 0 THEN
+        EXECUTE format('INSERT INTO %I (%s) SELECT %s FROM _partition_moved_rows', parent, cols, cols);
+        DROP TABLE _partition_moved_rows;
+        RAISE NOTICE 'Moved % row(s) from %_default into %', stray, parent, part;
+    END IF;
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Makes sure the default partition and the current plus months_ahead months exist
+CREATE OR REPLACE FUNCTION ensure_monthly_partitions(parent TEXT, key_column TEXT, months_ahead INT DEFAULT 3)
+RETURNS INT AS $$
+DECLARE
+    created INT := 0;
+    m DATE;
+BEGIN
+    IF to_regclass(parent || '_default') IS NULL THEN
+        EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', parent || '_default', parent);
+    END IF;
+    FOR m IN SELECT generate_series(date_trunc('month', NOW()), date_trunc('month', NOW()) + months_ahead * INTERVAL '1 month', INTERVAL '1 month')::DATE
+    LOOP
+        IF create_month_partition(parent, key_column, m) THEN
+            created := created + 1;
+        END IF;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Retention: drops every monthly partition that ends on or before cutoff's month.
+-- For transactions the matching months are removed from the rollup too (a DROP fires
+-- no DELETE triggers); rows of those months outside the dropped partitions, if any,
+-- are repaired by scripts/rebuild_rollup.py.
+CREATE OR REPLACE FUNCTION drop_partitions_before(parent TEXT, cutoff DATE)
+RETURNS INT AS $$
+DECLARE
+    part RECORD;
+    dropped INT := 0;
+    boundary DATE := date_trunc('month', cutoff);
+BEGIN
+    FOR part IN
+        SELECT c.relname, to_date(right(c.relname, 7), 'YYYY_MM') AS month
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = parent::regclass AND c.relname ~ ('^' || parent || '_p[0-9]{4}_[0-9]{2}$')
+        ORDER BY 2
+    LOOP
+        EXIT WHEN part.month >= boundary;
+        EXECUTE format('DROP TABLE %I', part.relname);
+        dropped := dropped + 1;
+    END LOOP;
+    IF dropped > 0 AND parent = 'transactions' AND to_regclass('transaction_monthly_rollup') IS NOT NULL THEN
+        DELETE FROM transaction_monthly_rollup WHERE month < boundary;
+    END IF;
+    RETURN dropped;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Swaps a plain table for a partitioned copy with the same columns and data.
+-- Indexes, unique keys and triggers are recreated per table below.
+CREATE OR REPLACE FUNCTION partition_table_by_month(parent TEXT, key_column TEXT, months_ahead INT DEFAULT 3)
+RETURNS BOOLEAN AS $$
+DECLARE
+    old_name TEXT := parent || '_unpartitioned';
+    seq TEXT;
+    cols TEXT;
+    first_month DATE;
+    m DATE;
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = parent::regclass) = 'p' THEN
+        RAISE NOTICE '% is already partitioned', parent;
+        RETURN FALSE;
+    END IF;
+    seq := pg_get_serial_sequence(parent, 'id');
+    EXECUTE format('ALTER TABLE %I RENAME TO %I', parent, old_name);
+    EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED INCLUDING STORAGE)
+                    PARTITION BY RANGE (%I)', parent, old_name, key_column);
+    IF seq IS NOT NULL THEN
+        -- The copied id default keeps using the sequence; move its ownership before the old table goes
+        EXECUTE format('ALTER SEQUENCE %s OWNED BY %I.id', seq, parent);
+    END IF;
+
+    EXECUTE format('SELECT date_trunc(''month'', MIN(%I))::DATE FROM %I', key_column, old_name) INTO first_month;
+    EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', parent || '_default', parent);
+    FOR m IN SELECT generate_series(COALESCE(first_month, date_trunc('month', NOW())::DATE),
+                                    date_trunc('month', NOW()) + months_ahead * INTERVAL '1 month', INTERVAL '1 month')::DATE
+    LOOP
+        PERFORM create_month_partition(parent, key_column, m);
+    END LOOP;
+
+    SELECT string_agg(quote_ident(attname), ', ' ORDER BY attnum) INTO cols
+    FROM pg_attribute
+    WHERE attrelid = parent::regclass AND attnum > 0 AND NOT attisdropped AND attgenerated = '';
+    EXECUTE format('INSERT INTO %I (%s) SELECT %s FROM %I', parent, cols, cols, old_name);
+    EXECUTE format('DROP TABLE %I', old_name);
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+-- The old tables' indexes and constraints went with them, so their names are reused
+DO $$
+BEGIN
+    IF partition_table_by_month('transactions', 'email_timestamp') THEN
+        ALTER TABLE transactions ADD CONSTRAINT transactions_message_id_email_timestamp_key UNIQUE (message_id, email_timestamp);
+        ALTER TABLE transactions ADD CONSTRAINT transactions_category_id_fkey FOREIGN KEY (category_id) REFERENCES categories(id);
+        CREATE INDEX idx_transactions_id ON transactions(id);
+        CREATE INDEX idx_transactions_date ON transactions(date);
+        CREATE INDEX idx_transactions_amount ON transactions(amount);
+        CREATE INDEX idx_transactions_merchant ON transactions(merchant_name);
+        CREATE INDEX idx_transactions_category ON transactions(category);
+        CREATE INDEX idx_transactions_type ON transactions(transactiontype);
+        CREATE INDEX idx_transactions_category_id ON transactions(category_id);
+        CREATE INDEX idx_transactions_merchant_id ON transactions(merchant_id);
+        CREATE INDEX idx_transactions_ts_id ON transactions(email_timestamp DESC, id DESC);
+        CREATE INDEX idx_transactions_category_ts_id ON transactions(category, email_timestamp DESC, id DESC);
+        CREATE INDEX idx_transactions_merchant_trgm ON transactions USING gin (merchant_name gin_trgm_ops);
+        CREATE INDEX idx_transactions_subject_trgm ON transactions USING gin (subject gin_trgm_ops);
+        CREATE INDEX idx_transactions_remarks_trgm ON transactions USING gin (remarks gin_trgm_ops);
+        CREATE INDEX idx_transactions_search_tsv ON transactions USING gin (search_tsv);
+
+        CREATE TRIGGER update_transactions_updated_at
+            BEFORE UPDATE ON transactions
+            FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+        CREATE TRIGGER transactions_rollup_insert
+            AFTER INSERT ON transactions
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION transaction_rollup_apply();
+        CREATE TRIGGER transactions_rollup_update
+            AFTER UPDATE ON transactions
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION transaction_rollup_apply();
+        CREATE TRIGGER transactions_rollup_delete
+            AFTER DELETE ON transactions
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION transaction_rollup_apply();
+    END IF;
+
+    IF partition_table_by_month('bank_emails', 'email_date') THEN
+        ALTER TABLE bank_emails ADD CONSTRAINT bank_emails_message_id_email_date_key UNIQUE (message_id, email_date);
+        CREATE INDEX idx_bank_emails_id ON bank_emails(id);
+        CREATE INDEX idx_bank_emails_date ON bank_emails(email_date);
+        CREATE INDEX idx_bank_emails_sender ON bank_emails(sender_email);
+
+        CREATE TRIGGER update_bank_emails_updated_at
+            BEFORE UPDATE ON bank_emails
+            FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+    END IF;
+END $$;
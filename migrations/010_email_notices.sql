@@ -0,0 +1,16 @@
+-- Migration: 010_email_notices.sql
+-- Description: Statement and dividend emails. They carry no amount the patterns can
+-- extract, so each is kept as a notice (kind, subject, sender, timestamp) keyed by
+-- Message-ID, which also stops them being re-read on every fetch.
+
+CREATE TABLE IF NOT EXISTS email_notices (
+    id SERIAL PRIMARY KEY,
+    kind VARCHAR(20) NOT NULL CHECK (kind IN ('statement', 'dividend')),
+    subject TEXT,
+    sender_email TEXT,
+    message_id TEXT NOT NULL UNIQUE,
+    email_timestamp TIMESTAMPTZ,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_email_notices_kind_ts ON email_notices(kind, email_timestamp DESC);
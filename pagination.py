@@ -0,0 +1,64 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A page query orders by a unique key such as (email_timestamp, id), fetches limit + 1
+rows, and continues from the last row it returned instead of an OFFSET, so every
+page costs the same index range scan however deep the user goes. The position is
+handed to clients as an opaque URL-safe `next` token.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    """A `next`/`after` token that we did not produce (or that was truncated)."""
+
+
+def encode_cursor(*values):
+    """Opaque token for a key tuple; datetimes are kept as ISO strings with a marker."""
+    payload = [{"ts": v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(token, size):
+    """Key tuple from encode_cursor(); raises InvalidCursor unless it has `size` values."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        values = [datetime.fromisoformat(v["ts"]) if isinstance(v, dict) else v for v in payload]
+    except (ValueError, TypeError, KeyError, UnicodeDecodeError) as e:
+        raise InvalidCursor(f"invalid page token: {e}") from None
+    if not isinstance(payload, list) or len(values) != size:
+        raise InvalidCursor("invalid page token")
+    return tuple(values)
+
+
+def split_page(rows, limit, key):
+    """
+    Trim rows fetched with LIMIT limit + 1 to one page.
+    Returns (page, next_token); next_token is None on the last page.
+    """
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(*key(page[-1]))
+
+
+def keyset_before(sort_column, id_column, key, params):
+    """
+    WHERE fragment selecting the rows after `key` in ORDER BY sort_column DESC,
+    id_column DESC (PostgreSQL puts NULLs first in DESC order). Appends its
+    parameters to params.
+    """
+    value, row_id = key
+    if value is None:
+        params.append(row_id)
+        return f"(({sort_column} IS NULL AND {id_column} < %s) OR {sort_column} IS NOT NULL)"
+    params.extend([value, row_id])
+    return f"({sort_column}, {id_column}) < (%s, %s)"
@@ -0,0 +1,304 @@
+"""
+Registry of compiled email extraction patterns loaded from patterns.yaml.
+
+Patterns are compiled and validated once per load into an immutable PatternSet.
+Callers grab the current set with ``registry.current()`` and use that snapshot
+for the whole extraction, so a reload (on file change or via the admin
+endpoint) swaps in a new set without disturbing extractions already running.
+"""
+
+import os
+import re
+import threading
+import time
+import logging
+import yaml
+from converters import build_converter
+
+logger = logging.getLogger(__name__)
+
+PATTERNS_FILE = os.getenv(
+    "PATTERNS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "patterns.yaml"),
+)
+# How often (seconds) current() looks at the file's mtime for hot reload
+RELOAD_CHECK_INTERVAL = float(os.getenv("PATTERNS_RELOAD_INTERVAL", 5))
+# A single probe search slower than this (ms) rejects the pattern
+BACKTRACK_BUDGET_MS = float(os.getenv("PATTERN_BACKTRACK_BUDGET_MS", 25))
+
+# Keys that describe the pattern itself; everything else is a static field
+RESERVED_KEYS = ("pattern", "flags", "fields", "route", "converters", "examples")
+# Converters applied to these fields when a pattern doesn't declare its own
+DEFAULT_CONVERTERS = {"amount": "amount", "date": "date"}
+PATTERN_KINDS = ("transactions", "bills")
+
+_ALLOWED_FLAGS = {
+    "IGNORECASE": re.IGNORECASE,
+    "DOTALL": re.DOTALL,
+    "MULTILINE": re.MULTILINE,
+    "VERBOSE": re.VERBOSE,
+    "ASCII": re.ASCII,
+}
+
+# Filler text used to provoke catastrophic backtracking in the benchmark
+_PROBE_FILLERS = ("a", " ", "0", "1,", "Rs. ", "INR 1.00 ", ". ", "XX1234 ", "to a@b ")
+_PROBE_MAX_LENGTH = 4096
+
+
+class PatternRegistryError(Exception):
+    """Raised when a pattern file cannot be loaded or fails validation."""
+
+    def __init__(self, problems):
+        self.problems = list(problems)
+        super().__init__("; ".join(self.problems))
+
+
+def _probe_lengths():
+    # Fine steps while short (exponential blowups show up early), then geometric
+    length = 4
+    while length <= _PROBE_MAX_LENGTH:
+        yield length
+        length = length + 2 if length < 64 else int(length * 1.25)
+
+
+def benchmark_pattern(regex, budget_ms=BACKTRACK_BUDGET_MS):
+    """
+    Run a compiled pattern against growing adversarial inputs.
+    Returns (worst_ms, probe_description); stops early once a probe exceeds the budget.
+    """
+    worst_ms, worst_probe = 0.0, None
+    for filler in _PROBE_FILLERS:
+        for length in _probe_lengths():
+            # Trailing '!' forces a failed match so the engine explores every path
+            probe = (filler * (length // len(filler) + 1))[:length] + "!"
+            started = time.perf_counter()
+            regex.search(probe)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if elapsed_ms > worst_ms:
+                worst_ms, worst_probe = elapsed_ms, f"{filler!r} x {length} chars"
+            if elapsed_ms > budget_ms:
+                return worst_ms, worst_probe
+    return worst_ms, worst_probe
+
+
+# Compiled-pattern cache: (source, flags) -> compiled regex that passed the benchmark.
+# Reloads only pay compile + benchmark cost for patterns that actually changed.
+_compiled_cache = {}
+_compiled_cache_lock = threading.Lock()
+
+
+def compile_pattern(source, flags=0, budget_ms=BACKTRACK_BUDGET_MS):
+    """Compile and benchmark a pattern, reusing the cached regex when unchanged."""
+    key = (source, flags)
+    with _compiled_cache_lock:
+        cached = _compiled_cache.get(key)
+    if cached is not None:
+        return cached
+    regex = re.compile(source, flags)
+    worst_ms, worst_probe = benchmark_pattern(regex, budget_ms)
+    if worst_ms > budget_ms:
+        raise ValueError(
+            f"backtracking benchmark took {worst_ms:.1f} ms on {worst_probe} (budget {budget_ms} ms)"
+        )
+    with _compiled_cache_lock:
+        _compiled_cache[key] = regex
+    return regex
+
+
+def _parse_flags(flag_names):
+    flags = 0
+    for name in flag_names or []:
+        try:
+            flags |= _ALLOWED_FLAGS[str(name).upper()]
+        except KeyError:
+            raise ValueError(f"unknown regex flag {name!r}")
+    return flags
+
+
+def _build_spec(name, entry):
+    """
+    Turn one YAML entry into the legacy spec dict (pattern, fields and static attributes).
+    Returns (spec, route, converters); route is a frozenset of lowercase keywords or None,
+    converters maps captured field names to compiled converter callables.
+    """
+    if not isinstance(entry, dict) or "pattern" not in entry:
+        raise ValueError("entry must be a mapping with a 'pattern' key")
+    fields = list(entry.get("fields") or [])
+    regex = compile_pattern(str(entry["pattern"]), _parse_flags(entry.get("flags")))
+    if regex.groups < len(fields):
+        raise ValueError(f"{len(fields)} fields but only {regex.groups} capture groups")
+    declared = entry.get("converters") or {}
+    unknown_fields = set(declared) - set(fields)
+    if unknown_fields:
+        raise ValueError(f"converters for fields it doesn't capture: {sorted(unknown_fields)}")
+    converters = {
+        field: build_converter(declared.get(field, DEFAULT_CONVERTERS.get(field)))
+        for field in fields
+        if field in declared or field in DEFAULT_CONVERTERS
+    }
+    route = entry.get("route")
+    if route is not None:
+        route = frozenset(str(keyword).lower() for keyword in route)
+    for example in entry.get("examples") or []:
+        if not regex.search(example):
+            raise ValueError(f"does not match its example: {example[:60]!r}...")
+        if route and route.isdisjoint(_route_hits(route, example.lower())):
+            raise ValueError(f"route {sorted(route)} misses its example: {example[:60]!r}...")
+    spec = {"pattern": regex, "fields": fields}
+    for key, value in entry.items():
+        if key not in RESERVED_KEYS:
+            spec[key] = value
+    return spec, route or None, converters
+
+
+def _route_hits(keywords, body_lower):
+    return {keyword for keyword in keywords if keyword in body_lower}
+
+
+class PatternSet:
+    """Immutable snapshot of compiled patterns; safe to share across threads."""
+
+    def __init__(self, transactions, bills, routes=None, converters=None, source=None, version=0):
+        self.transactions = transactions
+        self.bills = bills
+        self.routes = routes or {}
+        # pattern name -> {field: converter callable}
+        self.converters = converters or {}
+        self.source = source
+        self.version = version
+        self.loaded_at = time.time()
+        # Static attributes precomputed per pattern so extraction just copies them
+        self.statics = {
+            name: {k: v for k, v in spec.items() if k not in ("pattern", "fields")}
+            for patterns in (transactions, bills)
+            for name, spec in patterns.items()
+        }
+        # field name -> capture group number, for reading single columns off a match
+        self.field_groups = {
+            name: {field: idx + 1 for idx, field in enumerate(spec["fields"])}
+            for patterns in (transactions, bills)
+            for name, spec in patterns.items()
+        }
+        self.route_keywords = frozenset(
+            keyword for route in self.routes.values() for keyword in route
+        )
+
+    def route_hits(self, body_lower):
+        """Return the route keywords present in an already-lowercased body."""
+        return _route_hits(self.route_keywords, body_lower)
+
+    def select(self, email_body, kind="transactions", body_lower=None, hits=None):
+        """
+        Return (name, match) for the first pattern of the given kind that matches.
+        Patterns with a route are skipped unless one of their keywords is in the body;
+        pass body_lower or precomputed hits to avoid lowercasing the body again.
+        """
+        routes = self.routes
+        for name, spec in getattr(self, kind).items():
+            route = routes.get(name)
+            if route:
+                if hits is None:
+                    hits = self.route_hits(body_lower if body_lower is not None else email_body.lower())
+                if route.isdisjoint(hits):
+                    continue
+            match = spec["pattern"].search(email_body)
+            if match:
+                return name, match
+        return None, None
+
+
+def load_pattern_set(path=PATTERNS_FILE, version=0):
+    """Load, compile and validate a pattern file. Raises PatternRegistryError on any problem."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            raw = yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError) as e:
+        raise PatternRegistryError([f"cannot read {path}: {e}"])
+
+    if not isinstance(raw, dict):
+        raise PatternRegistryError([f"{path}: top level must be a mapping of pattern kinds, not {type(raw).__name__}"])
+
+    problems = []
+    compiled = {}
+    routes = {}
+    converters = {}
+    for kind in PATTERN_KINDS:
+        compiled[kind] = {}
+        entries = raw.get(kind) or {}
+        if not isinstance(entries, dict):
+            problems.append(f"{kind}: must be a mapping of pattern names to entries, not {type(entries).__name__}")
+            continue
+        for name, entry in entries.items():
+            name = str(name)
+            if any(name in patterns for patterns in compiled.values()):
+                problems.append(f"{kind}.{name}: duplicate pattern name")
+                continue
+            try:
+                compiled[kind][name], route, converters[name] = _build_spec(name, entry)
+            except (re.error, ValueError, TypeError, AttributeError) as e:
+                problems.append(f"{kind}.{name}: {e}")
+                continue
+            if route:
+                routes[name] = route
+    if problems:
+        raise PatternRegistryError(problems)
+    return PatternSet(
+        compiled["transactions"], compiled["bills"],
+        routes=routes, converters=converters, source=path, version=version,
+    )
+
+
+class PatternRegistry:
+    """Holds the active PatternSet and swaps it atomically on reload."""
+
+    def __init__(self, path=PATTERNS_FILE, check_interval=RELOAD_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._current = None
+        self._mtime = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def current(self):
+        """Return the active PatternSet, loading it on first use and picking up file edits."""
+        if self._current is None:
+            return self.reload()
+        if self.check_interval and time.monotonic() - self._last_check >= self.check_interval:
+            self._reload_if_changed()
+        return self._current
+
+    def reload(self):
+        """Load the pattern file now. On failure the previous set stays active and the error is raised."""
+        with self._lock:
+            mtime = self._file_mtime()
+            version = self._current.version + 1 if self._current else 1
+            pattern_set = load_pattern_set(self.path, version=version)
+            # Plain attribute assignment: readers see either the old or the new set
+            self._current = pattern_set
+            self._mtime = mtime
+            self._last_check = time.monotonic()
+        logger.info(
+            "Loaded pattern set v%s from %s (%d transaction, %d bill patterns)",
+            pattern_set.version, self.path, len(pattern_set.transactions), len(pattern_set.bills),
+        )
+        return pattern_set
+
+    def _reload_if_changed(self):
+        self._last_check = time.monotonic()
+        if self._file_mtime() == self._mtime:
+            return
+        try:
+            self.reload()
+        except PatternRegistryError as e:
+            # Remember the bad mtime so we don't retry the same broken file every check
+            self._mtime = self._file_mtime()
+            logger.error("Rejected edited pattern file %s, keeping v%s: %s", self.path, self._current.version, e)
+
+    def _file_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+
+registry = PatternRegistry()
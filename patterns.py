@@ -1,327 +1,44 @@
 """
 Regex patterns for extracting transaction data from various bank email formats.
+The patterns themselves are defined in patterns.yaml and compiled by pattern_registry.
 """
 
-import re
+from collections.abc import Mapping
+from pattern_registry import registry
 
-bank_regex_patterns = {
-    # SBI Cashback Credit Card
-    "SBI_CASHBACK_CREDIT_CARD": {
-        "pattern": re.compile(
-            r"(?i)(Rs|₹|INR)\.?\s*([\d,]+\.\d{2})\s+spent on your SBI Credit Card ending\s+(\d{4})\s+at\s+(.+?)\b",
-            re.IGNORECASE | re.DOTALL
-        ),
-        "fields": [
-            "currency",
-            "amount",
-            "card_number",
-            "merchant_name"
-        ],
-        "card": "SBI Credit Card",
-        "transactiontype": "Debit"
-    },
-    
-    # SBI Credit Card Transaction (standard format)
-    "SBI_CREDIT_CARD": {
-        "pattern": re.compile(
-            r"(?i)Rs\.?([\d,]+\.\d{2})\s+spent on your SBI Credit Card ending\s+(\d{4})\s+at\s+(.+?)\b",
-            re.IGNORECASE | re.DOTALL
-        ),
-        "fields": [
-            "amount",
-            "card_number",
-            "merchant_name"
-        ],
-        "card": "SBI Credit Card",
-        "transactiontype": "Credit Card Debit"
-    },
-    
-    # SBI UPI Transaction
-    "SBI_UPI": {
-        "pattern": re.compile(
-            r"(?i)(Rs|₹|INR)\.?\s*([\d,]+\.\d{2})\s+has been debited from your SBI account\s+(XX\d{4})\s+via UPI.*?to\s+([\w@.]+)\s+(.+?)\s+UPI Reference No:\s+(\d+)",
-            re.IGNORECASE | re.DOTALL
-        ),
-        "fields": [
-            "currency",
-            "amount",
-            "account_number",
-            "merchant_paymentid",
-            "merchant_name",
-            "transactionid"
-        ],
-        "transactiontype": "UPI Debit"
-    },
-    # HDFC UPI Credit Card
-    "HDFC_CC_UPI": {
-    "pattern": re.compile(
-        r"(?i)(Rs|₹|INR)\.?\s*([\d,]+\.\d{2})\s+has been debited from your HDFC Bank RuPay Credit Card\s+XX(\d{4})\s+to\s+([\w@.]+)\s+(.*?)\.\s*Your UPI transaction reference number is\s+(\d+)",
-        re.IGNORECASE | re.DOTALL
-        ),
-        "fields": [
-            "currency",
-            "amount",
-            "card_number",
-            "merchant_paymentid",
-            "merchant_name",
-            "transactionid"
-    ],
-    "card": "HDFC Bank RuPay Credit Card",
-    "transactiontype": "UPI Debit"
-    },
-    
-    "HDFC Credit card": {
-        "pattern": re.compile(
-            r"(?i)Rs\.?\s*([\d,]+\.\d{2}).*?HDFC Bank RuPay Credit Card\s+(XX\d{4}).*?to\s+([\w@.]+)\s+(.*?)\s+UPI transaction reference number is\s+(\d+)",
-            re.IGNORECASE | re.DOTALL
-        ),
-        "fields": [
-            "amount",
-            "card_number",
-            "merchant_paymentid",
-            "merchant_name",
-            "transactionid"
-        ],
-        "card": "HDFC Bank RuPay Credit Card",
-        "transactiontype": "Credit Card Debit"
-    },
-    # ICICI Credit Card (matches date with or without time, flexible merchant info)
-    "APAY ICICI Credit Card": {
-        "pattern": re.compile(
-            r"ICICI Bank Credit Card\s+XX(\d{4}).*?transaction of\s+(INR|Rs\.?|₹)\s*([\d,]+\.\d{2}).*?Info:\s*([^.\n]+)",
-            re.IGNORECASE | re.DOTALL
-        ),
-        "fields": [
-            "card_number",
-            "currency",
-            "amount",
-            "merchant_name"
-        ],
-        "transactionid": "",
-        "merchant_paymentid": "",
-        "card": "ICICI Bank Credit Card",
-        "transactiontype": "Credit Card Debit"
-    },
-    # Kotak IMPS Debit (accepts both 09-May-2025 and 09-05-2025)
-    "KOTAK_IMPS_DEBIT": {
-        "pattern": re.compile(r"account\s+xx\d+\s+is debited for\s+(INR|Rs\.?|₹)\s*([\d,]+(?:\.\d{2})?)\s*on\s+(\d{1,2}-[A-Za-z]{3}-\d{4}).*?Beneficiary Name:\s+(.*?)\s+Beneficiary Account No:\s+(.*?)\s+Beneficiary IFSC:\s+(.*?)\s+IMPS Reference No:\s+(\d+).*?Remarks:\s*(.{1,100}?)(?:\.|\n|$)", re.IGNORECASE | re.DOTALL),
-        "fields": [
-            "currency",
-            "amount",
-            "date",
-            "beneficiary_name",
-            "beneficiary_account",
-            "beneficiary_ifsc",
-            "transactionid",
-            "remarks"
-        ],
-        "transactiontype": "IMPS Debit"
-    },
-    # Kotak IMPS Credit
-    "KOTAK_IMPS_CREDIT": {
-        "pattern": re.compile(
-            r"account\s+xx\d+\s+is credited by (INR|Rs\.?|₹)\s*([\d,]+\.\d{2}).*?Sender Name:\s+(.*?)\s+Sender Mobile No:\s+(.*?)\s+IMPS Reference No:\s+(\d+).*?Remarks ?:(.*?) ",
-            re.IGNORECASE | re.DOTALL
-        ),
-        "fields": [
-            "currency",
-            "amount",
-            "sender_name",
-            "sender_mobile",
-            "transactionid",
-            "remarks"
-        ],
-        "transactiontype": "IMPS Credit"
-    },
-    # Kotak NACH Credit
-    "KOTAK_NACH_CREDIT": {
-    "pattern": re.compile(
-        r"Your account\s+(?:XXXX+)?(\d{4})\s+has been credited with payment received via\s+(?:NACH|ECS).*?"
-        r"Remitter\s*:\s*(.*?)\s+Amount:\s*(?:Rs\.?|INR|₹)\s*([\d,]+\.?\d*)\s+Transaction date\s*:\s*(\d{1,2}/\d{1,2}/\d{4})",
-        re.IGNORECASE | re.DOTALL
-        ),
-        "fields": [
-            "card_number",
-            "merchant_name",
-            "amount",
-            "date"
-        ],
-        "transactiontype": "NACH Credit"
-    },
-    # Kotak NACH/ECS Debit
-    "KOTAK_NACH_DEBIT": {
-        "pattern": re.compile(
-        r"Your account\s+(?:XXXX+)?(\d{4})\s+has been debited towards\s+(?:NACH|ECS).*?"
-        r"Beneficiary\s*:\s*(.*?)\s+UMRN Number\s*:\s*(.*?)\s+Amount:\s*(?:Rs\.?|INR|₹)\s*([\d,]+\.?\d*)\s+Transaction date\s*:\s*(\d{1,2}/\d{1,2}/\d{4})",
-        re.IGNORECASE | re.DOTALL
-        ),
-        "fields": [
-            "card_number",
-            "merchant_name",
-            "umrn_number",
-            "amount",
-            "date"
-        ],
-        "transactiontype": "NACH Debit"
-    },
-    # Axis Bank EMI Debit
-    "AXIS_EMI_DEBIT": {
-        "pattern": re.compile(
-            r"A/c no\. (XX\d+).*?debited with (INR|Rs\.?|₹) ([\d,]+\.\d{2}) by ([\w\d_\-]+)",
-            re.IGNORECASE | re.DOTALL
-        ),
-        "fields": [
-            "account_number",
-            "currency",
-            "amount",
-            "reference"
-        ],
-        "transactiontype": "EMI Debit"
-    },
-    # Axis NEFT
-    "AXIS_NEFT": {
-        "pattern": re.compile(
-            r"NEFT for your A/c no\. (XX\d+) for an amount of (INR|Rs\.?|₹) ([\d,]+\.\d{2}) has been initiated with transaction reference no\. (\w+)",
-            re.IGNORECASE | re.DOTALL
-        ),
-        "fields": [
-            "account_number",
-            "currency",
-            "amount",
-            "transactionid"
-        ],
-        "transactiontype": "NEFT"
-    },
-    # AXIS Bank UPI Debit
-    "AXIS_UPI_DEBIT": {
-        "pattern": re.compile(
-            r"Amount Debited:\s+(INR|Rs|₹)\s*([\d,]+\.\d{2})\s+Account Number:\s+(XX\d{4})\s+Transaction Info:\s+(UPI/[^/]+/\d+/[^.\n]+)",
-            re.IGNORECASE | re.DOTALL
-        ),
-        "fields": [
-            "currency",
-            "amount",
-            "account_number",
-            "transaction_info"
-        ],
-        "card": "AXIS Bank UPI",
-        "transactiontype": "UPI Debit"
-    },
-    # AXIS Bank Credit Card
-    "AXIS_CREDIT_CARD": {
-        "pattern": re.compile(
-            r"Transaction Amount:\s*(INR|Rs|₹)\s*([\d,\.]+)\s*"
-            r"Merchant Name:\s*([^\n]+)\s*"
-            r"Axis Bank Credit Card No\.\s*XX(\d{4})\s*"
-            r"Date & Time:\s*([^\n]+)\s*"
-            r"Available Limit\*:\s*(INR|Rs|₹)\s*([\d,\.]+)\s*"
-            r"Total Credit Limit\*:\s*(INR|Rs|₹)\s*([\d,\.]+)",
-            re.IGNORECASE
-        ),
-        "fields": [
-            "currency",
-            "amount",
-            "merchant_name",
-            "card_number",
-            "datetime",
-            "currency_limit",
-            "available_limit",
-            "currency_total",
-            "total_limit"
-        ],
-        "card": "Axis Bank Credit Card",
-        "transactiontype": "Credit Card Debit"
-    },
-    # Generic fallback for INR/Rs/₹ transactions
-    "GENERIC": {
-        "pattern": re.compile(
-            r"(?:INR|Rs\\.?|₹)\\s*([\d,]+\\.\d{2})", re.IGNORECASE),
-        "fields": ["amount"],
-        "transactiontype": "Unknown"
-    },
-    # Razorpay Card Payment
-    "RAZORPAY_CARD_PAYMENT": {
-        "pattern": re.compile(
-            r"(?:₹|INR)\s*([\d,]+\.\d{2})Paid Successfully.*?Payment Id\s*(pay_\w+).*?Method\s*card\s+.*?(\d{4}).*?Email\s*(.*?)\s+Mobile Number\s*(\+\d+)",
-            re.IGNORECASE | re.DOTALL
-        ),
-        "fields": [
-            "amount",
-            "payment_id",
-            "card_last4",
-            "email",
-            "mobile"
-        ],
-        "transactiontype": "Card Payment"
-    },
-    "RAZORPAY_MERCHANT_PAYMENT": {
-        "pattern": re.compile(
-            r"(?:₹|INR)\s*([\d,]+\.\d{2})Paid Successfully.*?Payment Id\s*(pay_\w+).*?Method\s*card\s+.*?(\d{4}).*?Email\s*(.*?)\s+Mobile Number\s*(\+\d+)",
-            re.IGNORECASE | re.DOTALL
-        ),
-        "fields": [
-            "amount",
-            "payment_id",
-            "card_last4",
-            "email",
-            "mobile"
-        ],
-        "transactiontype": "Card Payment"
-    },
-    # RBL Bank Credit Card
-    "RBL_CREDIT_CARD": {
-        "pattern": re.compile(
-            r"(INR|Rs|₹)\.?\s*([\d,]+\.\d{2})\s+spent at\s+(.+?)\s+.*?RBL Bank credit card\s+\((\d{4})\)",
-            re.IGNORECASE | re.DOTALL
-        ),
-        "fields": [
-            "currency",
-            "amount",
-            "merchant_name",
-            "card_number"
-        ],
-        "card": "RBL Bank Credit Card",
-        "transactiontype": "Credit Card Debit"
-    },
-    # Generic UPI txn fallback
-    "GENERIC_UPI_TXN": {
-        "pattern": re.compile(r"UPI txn", re.IGNORECASE),
-        "fields": [],
-        "transactiontype": "UPI",
-        "category": "UPI"
-    }
-}
 
-# Billing regex patterns for extracting utility bill payment transactions
-billing_regex_patterns = {
-    "POWER_BILL_PAYMENT": {
-        "pattern": re.compile(
-            r"bill payment of Electricity.*?Paid to\s+(.+?)\s+.*?Amount\s+₹?([\d,]+\.?\d*)",
-            re.IGNORECASE | re.DOTALL
-        ),
-        "fields": ["merchant_name", "amount"],
-        "transactiontype": "bill_payment",
-        "category": "utilities"
-    }
-}
+class _LivePatternView(Mapping):
+    """Read-only dict view over the registry's current patterns of one kind."""
+
+    def __init__(self, kind):
+        self._kind = kind
+
+    def _patterns(self):
+        return getattr(registry.current(), self._kind)
+
+    def __getitem__(self, name):
+        return self._patterns()[name]
+
+    def __iter__(self):
+        return iter(self._patterns())
+
+    def __len__(self):
+        return len(self._patterns())
+
+
+# Patterns now live in patterns.yaml; these views keep the old dict-style access working
+bank_regex_patterns = _LivePatternView("transactions")
+billing_regex_patterns = _LivePatternView("bills")
 
 def select_best_pattern(email_body):
     """Return the best matching pattern and match object for a given email body."""
-    for name, data in bank_regex_patterns.items():
-        match = data["pattern"].search(email_body)
-        if match:
-            return name, match
-    return None, None
+    return registry.current().select(email_body)
 
 
 # Helper function for billing patterns
 def select_best_billing_pattern(email_body):
     """Return the best matching billing pattern and match object for a given email body."""
-    for name, data in billing_regex_patterns.items():
-        match = data["pattern"].search(email_body)
-        if match:
-            return name, match
-    return None, None
+    return registry.current().select(email_body, kind="bills")
 
 REQUIRED_FIELDS = [
     "email_address",
@@ -0,0 +1,212 @@
+"""
+Quarantine for emails we could not use: bodies no pattern matched, UPI alerts that
+didn't parse, and messages that failed during processing.
+
+Callers hand messages to quarantine() which only does a non-blocking queue put; a
+background thread hashes, compresses and writes them to a small SQLite store
+(QUARANTINE_DB). Messages are deduplicated by SHA-256 of their content, and the
+store is capped at QUARANTINE_MAX_BYTES of compressed bodies by evicting the entries
+seen least recently. Pattern authors read it back with recent()/get() or
+scripts/quarantine.py.
+"""
+
+import hashlib
+import os
+import queue
+import sqlite3
+import threading
+import time
+import zlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+QUARANTINE_DB = os.getenv("QUARANTINE_DB", "quarantine.db")
+MAX_BYTES = int(os.getenv("QUARANTINE_MAX_BYTES", str(50 * 1024 * 1024)))
+QUEUE_SIZE = 1000
+_BATCH = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS quarantine (
+    hash TEXT PRIMARY KEY,
+    reason TEXT NOT NULL,
+    subject TEXT,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_quarantine_last_seen ON quarantine(last_seen);
+CREATE INDEX IF NOT EXISTS idx_quarantine_reason ON quarantine(reason, last_seen);
+"""
+
+
+def _to_bytes(body):
+    if isinstance(body, bytes):
+        return body
+    return str(body or "").encode("utf-8", errors="replace")
+
+
+class QuarantineStore:
+    """Deduplicated, compressed, size-capped SQLite store with a background writer."""
+
+    def __init__(self, path=QUARANTINE_DB, max_bytes=MAX_BYTES, queue_size=QUEUE_SIZE):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.dropped = 0  # messages lost because the queue was full
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._writer = None
+        self._start_lock = threading.Lock()
+
+    # --- write side ---
+
+    def submit(self, reason, body, subject=""):
+        """Queue a message for the store. Never blocks; drops (and counts) when the queue is full."""
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait((reason, subject or "", body, time.time()))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def flush(self):
+        """Block until everything queued so far is written (tests, shutdown)."""
+        if self._writer is not None:
+            self._queue.join()
+
+    def _ensure_writer(self):
+        if self._writer is not None:
+            return
+        with self._start_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run, name="quarantine-writer", daemon=True)
+                self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def _run(self):
+        conn = None
+        while True:
+            items = [self._queue.get()]
+            while len(items) < _BATCH:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                if conn is None:
+                    conn = self._connect()
+                self._write(conn, items)
+            except Exception as e:
+                logger.error(f"Quarantine write failed ({len(items)} messages lost): {e}", exc_info=True)
+                conn = None
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+
+    def _write(self, conn, items):
+        rows = []
+        for reason, subject, body, seen in items:
+            raw = _to_bytes(body)
+            digest = hashlib.sha256(raw).hexdigest()
+            blob = zlib.compress(raw, 6)
+            rows.append((digest, reason, subject, blob, len(blob), seen, seen))
+        with conn:
+            conn.executemany("""
+                INSERT INTO quarantine (hash, reason, subject, body, size, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(hash) DO UPDATE SET hits = hits + 1, last_seen = excluded.last_seen
+            """, rows)
+            self._evict(conn)
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM quarantine").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        stale = []
+        for digest, size in conn.execute("SELECT hash, size FROM quarantine ORDER BY last_seen"):
+            stale.append((digest,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM quarantine WHERE hash = ?", stale)
+        logger.info(f"Quarantine over {self.max_bytes} bytes; evicted {len(stale)} oldest entries")
+
+    # --- query side ---
+
+    def _rows(self, sql, params):
+        if not os.path.exists(self.path):
+            return []
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            conn.row_factory = sqlite3.Row
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _entry(row, with_body=True):
+        entry = {
+            "hash": row["hash"],
+            "reason": row["reason"],
+            "subject": row["subject"],
+            "size": row["size"],
+            "first_seen": row["first_seen"],
+            "last_seen": row["last_seen"],
+            "hits": row["hits"],
+        }
+        if with_body:
+            entry["body"] = zlib.decompress(row["body"]).decode("utf-8", errors="replace")
+        return entry
+
+    def recent(self, limit=50, reason=None, contains=None):
+        """
+        Most recently seen entries, newest first, optionally filtered by reason and by a
+        case-insensitive substring of the decompressed body.
+        """
+        sql = "SELECT * FROM quarantine"
+        params = []
+        if reason:
+            sql += " WHERE reason = ?"
+            params.append(reason)
+        sql += " ORDER BY last_seen DESC"
+        if not contains:
+            return [self._entry(row) for row in self._rows(sql + " LIMIT ?", params + [limit])]
+        needle = contains.lower()
+        matches = []
+        for row in self._rows(sql, params):
+            entry = self._entry(row)
+            if needle in entry["body"].lower():
+                matches.append(entry)
+                if len(matches) >= limit:
+                    break
+        return matches
+
+    def get(self, digest):
+        """One entry by content hash, or None."""
+        rows = self._rows("SELECT * FROM quarantine WHERE hash = ?", (digest,))
+        return self._entry(rows[0]) if rows else None
+
+    def stats(self):
+        """Entry count, hits and compressed bytes per reason."""
+        rows = self._rows("""
+            SELECT reason, COUNT(*) AS entries, SUM(hits) AS hits, SUM(size) AS bytes
+            FROM quarantine GROUP BY reason ORDER BY reason
+        """, ())
+        return {row["reason"]: {"entries": row["entries"], "hits": row["hits"], "bytes": row["bytes"]}
+                for row in rows}
+
+
+store = QuarantineStore()
+
+
+def quarantine(reason, body, subject=""):
+    """Hand a message to the background quarantine writer (non-blocking)."""
+    return store.submit(reason, body, subject)
@@ -0,0 +1,129 @@
+"""
+Compact record type for a transaction as it moves through the app:
+extraction -> normalisation -> insertion into `transactions` -> rendering.
+
+All defaulting and normalisation happens once, in the constructor, instead of
+being repeated as dict .get() fallbacks at every step.
+"""
+
+import hashlib
+from decimal import Decimal
+from converters import parse_amount
+from merchants import resolve_merchant
+
+
+def normalize_transaction_type(transaction_type_value):
+    """Map various transaction type strings to one of: debit, credit, upi."""
+    if not transaction_type_value:
+        return "debit"
+    t = str(transaction_type_value).lower()
+    if "credit" in t:
+        return "credit"
+    if "upi" in t:
+        return "upi"
+    return "debit"
+
+
+class TransactionRecord:
+    """A single transaction with typed, normalised fields. Uses __slots__ to stay small."""
+
+    __slots__ = (
+        "amount", "currency", "merchant_name", "merchant_id", "transactiontype", "category",
+        "card_number", "subject", "imap_server", "message_id", "email_timestamp",
+        "pattern_name", "account_name", "account_type", "extras",
+    )
+
+    # Columns ingestion writes to transactions (write_records/bulk_insert), in row order
+    INSERT_COLUMNS = (
+        "amount", "merchant_name", "transactiontype", "category", "subject",
+        "imap_server", "message_id", "currency", "email_timestamp", "card_number", "merchant_id",
+    )
+    # Columns ingestion writes to bills (write_records/bulk_insert), in row order
+    BILL_COLUMNS = (
+        "amount", "merchant_name", "transactiontype", "category", "subject",
+        "message_id", "currency", "email_timestamp", "card_number",
+    )
+
+    def __init__(self, amount=None, merchant_name=None, merchant_id=None, transactiontype=None, category=None,
+                 card_number=None, currency=None, subject=None, imap_server=None, message_id=None,
+                 email_timestamp=None, pattern_name=None, account_name=None, account_type=None,
+                 extras=None):
+        if amount is not None and not isinstance(amount, Decimal):
+            try:
+                amount = parse_amount(amount)
+            except ValueError:
+                amount = None
+        self.amount = amount
+        self.currency = currency or "INR"
+        self.merchant_name = (merchant_name or "").strip() or "unknown"
+        # Canonical merchant id; falls back to the UPI VPA when the name is missing
+        self.merchant_id = merchant_id or resolve_merchant(
+            self.merchant_name, (extras or {}).get("merchant_paymentid")
+        )
+        self.transactiontype = normalize_transaction_type(transactiontype)
+        self.category = category or "unknown"
+        self.card_number = card_number or None
+        self.subject = subject or ""
+        self.imap_server = imap_server or ""
+        self.email_timestamp = email_timestamp
+        self.pattern_name = pattern_name
+        self.account_name = account_name
+        self.account_type = account_type
+        # Pattern-specific captures (date, remarks, beneficiary_name, ...); None when there are none
+        self.extras = extras or None
+        self.message_id = message_id or self._fallback_message_id()
+
+    def _fallback_message_id(self):
+        # Stable id for emails without a Message-ID, so re-fetching them stays idempotent
+        unique_str = f"{self.subject}{self.email_timestamp or ''}{self.merchant_name}"
+        return hashlib.sha256(unique_str.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def from_extracted(cls, data, **context):
+        """
+        Build a record from an extract_transaction_data() dict plus email context
+        (subject, email_timestamp, imap_server, message_id, ...), which wins over the dict.
+        """
+        values = {name: data.get(name) for name in cls.__slots__ if name != "extras" and name in data}
+        values.update({k: v for k, v in context.items() if v not in (None, "")})
+        extras = {k: v for k, v in data.items() if k not in cls.__slots__}
+        return cls(extras=extras, **values)
+
+    @classmethod
+    def from_row(cls, row):
+        """
+        Build a record from a DB row (RealDictCursor) for rendering. Stored rows were
+        normalised on insert, so values are taken as-is; missing columns become None.
+        """
+        record = cls.__new__(cls)
+        for name in cls.__slots__:
+            setattr(record, name, row.get(name))
+        if record.merchant_name is None:
+            record.merchant_name = "unknown"
+        if record.category is None:
+            record.category = "unknown"
+        return record
+
+    def insert_params(self):
+        """Parameters for INSERT INTO transactions, in INSERT_COLUMNS order."""
+        return (
+            self.amount, self.merchant_name, self.transactiontype, self.category, self.subject,
+            self.imap_server, self.message_id, self.currency, self.email_timestamp,
+            self.card_number or "0000", self.merchant_id,
+        )
+
+    def bill_params(self):
+        """Parameters for INSERT INTO bills, in BILL_COLUMNS order."""
+        return (
+            self.amount, self.merchant_name, self.transactiontype, self.category, self.subject,
+            self.message_id, self.currency, self.email_timestamp, self.card_number or "0000",
+        )
+
+    def get(self, name, default=None):
+        """Dict-style access for callers that still treat transactions as dicts."""
+        value = getattr(self, name, None) if name in self.__slots__ else (self.extras or {}).get(name)
+        return default if value is None else value
+
+    def __repr__(self):
+        return (f"TransactionRecord(message_id={self.message_id!r}, amount={self.amount!r}, "
+                f"merchant_name={self.merchant_name!r}, transactiontype={self.transactiontype!r})")
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Fill transactions.merchant_id for rows stored before merchant canonicalisation
+(migration 003). Each distinct merchant_name is resolved once.
+
+Usage:
+    python scripts/backfill_merchant_ids.py            # only rows without a merchant_id
+    python scripts/backfill_merchant_ids.py --all      # re-resolve every row, e.g. after editing aliases
+"""
+
+import os
+import sys
+
+from psycopg2.extras import execute_batch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from db import get_cursor  # noqa: E402
+from merchants import resolve_merchant  # noqa: E402
+
+
+def main(argv):
+    only_missing = "--all" not in argv
+    select_sql = "SELECT DISTINCT merchant_name FROM transactions"
+    update_sql = "UPDATE transactions SET merchant_id = %s WHERE merchant_name IS NOT DISTINCT FROM %s"
+    if only_missing:
+        select_sql += " WHERE merchant_id IS NULL"
+        update_sql += " AND merchant_id IS NULL"
+    with get_cursor() as (cursor, conn):
+        cursor.execute(select_sql)
+        names = [row["merchant_name"] for row in cursor.fetchall()]
+        updates = [(resolve_merchant(name), name) for name in names]
+        execute_batch(cursor, update_sql, updates)
+    print(f"Resolved {len(names)} merchant names to {len({u[0] for u in updates})} merchants.")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
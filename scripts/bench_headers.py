@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for per-message header decoding (subject, sender, timestamp).
+
+Compares the previous parse_email_content header path (full message parse,
+decode_header, inline regex, pytz lookup, parsedate_to_datetime) with
+email_headers.decode_envelope.
+
+Usage:
+    python scripts/bench_headers.py                 # sample corpus built from emails_dump.txt
+    python scripts/bench_headers.py mail/*.eml      # your own raw messages
+    python scripts/bench_headers.py inbox.mbox
+"""
+
+import mailbox
+import os
+import re
+import sys
+import time
+from email import message_from_bytes
+from email.header import decode_header
+from email.policy import default
+from email.utils import parsedate_to_datetime
+
+import pytz
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from categories import email_map  # noqa: E402
+from email_headers import decode_envelope  # noqa: E402
+
+# Date header shapes seen from the banks in email_map
+_DATE_SHAPES = [
+    "Tue, 09 Sep 2025 09:28:13 +0530",
+    "9 Sep 2025 03:58:13 +0000",
+    "Tue, 9 Sep 2025 09:28:13 +0530 (IST)",
+    "Tue, 09 Sep 2025 03:58:13 GMT",
+    "Tue, 09 Sep 25 09:28:13 +0530",
+]
+
+
+def legacy_decode_headers(raw_email_bytes):
+    """The header half of parse_email_content before email_headers existed."""
+    msg = message_from_bytes(raw_email_bytes, policy=default)
+    subject_header = msg.get("Subject", "")
+    parts = []
+    if subject_header:
+        for part, enc in decode_header(subject_header):
+            if isinstance(part, bytes):
+                part = part.decode(enc or "utf-8", errors="replace")
+            parts.append(part)
+    decoded_subject = "".join(parts)
+
+    from_header = msg.get("From", "")
+    sender_email = ""
+    import re as _re
+    if from_header:
+        match = _re.search(r'[\w\.-]+@[\w\.-]+', from_header)
+        sender_email = match.group(0) if match else from_header.strip()
+
+    ist = pytz.timezone('Asia/Kolkata')
+    email_timestamp = None
+    date_str = msg.get("Date")
+    if date_str:
+        try:
+            dt = parsedate_to_datetime(date_str)
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=pytz.UTC)
+            email_timestamp = dt.astimezone(ist)
+        except Exception:
+            pass
+    if email_timestamp is None:
+        received_headers = msg.get_all("Received", [])
+        if received_headers:
+            try:
+                dt = parsedate_to_datetime(received_headers[-1].rsplit(";", 1)[-1].strip())
+                if dt.tzinfo is None:
+                    dt = dt.replace(tzinfo=pytz.UTC)
+                email_timestamp = dt.astimezone(ist)
+            except Exception:
+                pass
+    return decoded_subject, sender_email, email_timestamp
+
+
+def sample_corpus():
+    """Synthesise bank-alert messages from the subjects in emails_dump.txt."""
+    with open(os.path.join(ROOT, "emails_dump.txt"), encoding="utf-8") as f:
+        subjects = re.findall(r"^Subject: (.*)$", f.read(), re.MULTILINE)
+    senders = [addr for addrs in email_map.values() for addr in addrs]
+    messages = []
+    for idx, subject in enumerate(subjects * 20):
+        if idx % 4 == 0:
+            # Roughly a quarter of bank alerts arrive with RFC 2047 encoded subjects
+            subject = "=?UTF-8?B?" + __import__("base64").b64encode(subject.encode()).decode() + "?="
+        headers = [
+            f"Received: from mx.example.net by mx.yahoo.com; {_DATE_SHAPES[idx % len(_DATE_SHAPES)]}",
+            f"From: Bank Alerts <{senders[idx % len(senders)]}>",
+            f"Subject: {subject}",
+            f"Date: {_DATE_SHAPES[idx % len(_DATE_SHAPES)]}",
+            f"Message-ID: <{idx}@bank.example>",
+            "Content-Type: text/plain; charset=utf-8",
+        ]
+        messages.append(("\r\n".join(headers) + "\r\n\r\nDear Customer, ...\r\n").encode("utf-8"))
+    return messages
+
+
+def load_corpus(paths):
+    messages = []
+    for path in paths:
+        if path.endswith(".mbox"):
+            messages.extend(m.as_bytes() for m in mailbox.mbox(path))
+        else:
+            with open(path, "rb") as f:
+                messages.append(f.read())
+    return messages
+
+
+def bench(fn, messages, rounds=5):
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for raw in messages:
+            fn(raw)
+        best = min(best, time.perf_counter() - started)
+    return best / len(messages) * 1e6
+
+
+def main(paths):
+    messages = load_corpus(paths) if paths else sample_corpus()
+    if not messages:
+        print("No messages to benchmark.")
+        return
+    mismatches = sum(1 for raw in messages if legacy_decode_headers(raw) != decode_envelope(raw))
+    legacy_us = bench(legacy_decode_headers, messages)
+    fast_us = bench(decode_envelope, messages)
+    print(f"messages:          {len(messages)}")
+    print(f"legacy header path: {legacy_us:8.1f} us/message")
+    print(f"email_headers:      {fast_us:8.1f} us/message  ({legacy_us / fast_us:.1f}x)")
+    print(f"result mismatches:  {mismatches}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the /transactions JSON body.
+
+Compares the previous path (row -> TransactionRecord -> dict with strftime -> jsonify)
+with json_fast (dates preformatted by the query, rows projected and encoded directly),
+in both row and column shapes.
+
+Usage:
+    python scripts/bench_json.py            # 10,000 synthetic rows
+    python scripts/bench_json.py 50000
+"""
+
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from flask import Flask, jsonify  # noqa: E402
+
+import json_fast  # noqa: E402
+from records import TransactionRecord  # noqa: E402
+
+COLUMNS = ("date", "amount", "merchant_name", "transactiontype", "card_number", "category", "account_name", "account_type")
+
+
+def sample_rows(n):
+    start = datetime(2024, 1, 1, tzinfo=timezone(timedelta(hours=5, minutes=30)))
+    rows = []
+    for i in range(n):
+        ts = start + timedelta(minutes=37 * i)
+        rows.append({
+            "id": i, "email_timestamp": ts, "date": ts.strftime("%m-%d-%Y %H:%M:%S"),
+            "amount": Decimal(f"{(i * 7919) % 100000 / 100:.2f}"), "merchant_name": f"Merchant {i % 500}",
+            "transactiontype": "debit", "card_number": "1234" if i % 3 else None, "category": "food",
+            "account_name": "HDFC Regalia" if i % 3 else None, "account_type": "credit_card" if i % 3 else None,
+        })
+    return rows
+
+
+def legacy(rows):
+    records = [TransactionRecord.from_row(dict(row)) for row in rows]
+    return jsonify({"transactions": [
+        {
+            "date": txn.email_timestamp.strftime("%m-%d-%Y %H:%M:%S") if txn.email_timestamp else "",
+            "amount": txn.amount,
+            "merchant_name": txn.merchant_name,
+            "transactiontype": txn.transactiontype,
+            "card_number": txn.card_number or "-",
+            "category": txn.category,
+            "account_name": txn.account_name or "-",
+            "account_type": txn.account_type or "-",
+        }
+        for txn in records
+    ]}).get_data()
+
+
+def fast(rows, shape="rows"):
+    return json_fast.response({"transactions": json_fast.shape_rows(rows, COLUMNS, shape)}).get_data()
+
+
+def bench(fn, rows, rounds=5):
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn(rows)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(argv):
+    n = int(argv[0]) if argv else 10000
+    rows = sample_rows(n)
+    app = Flask(__name__)
+    with app.app_context():
+        results = [
+            ("previous (records + jsonify)", bench(legacy, rows)),
+            (f"json_fast rows ({'orjson' if json_fast.orjson else 'stdlib json'})", bench(fast, rows)),
+            ("json_fast columns", bench(lambda r: fast(r, "columns"), rows)),
+        ]
+    baseline = results[0][1]
+    for name, seconds in results:
+        print(f"{name:40s} {seconds * 1000:8.1f} ms / {n} rows   x{baseline / seconds:.1f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Export transactions to CSV, NDJSON or Parquet without loading them into memory.
+
+Usage:
+    python scripts/export_transactions.py --format csv --output transactions.csv
+    python scripts/export_transactions.py --format parquet --start 2024-01-01 --end 2024-12-31 -o 2024.parquet
+    python scripts/export_transactions.py --format ndjson --category food --account "HDFC Regalia"
+"""
+
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import exporter  # noqa: E402
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", choices=sorted(exporter.ENCODERS), default="csv")
+    parser.add_argument("--start", help="first day (YYYY-MM-DD) or ISO datetime, inclusive")
+    parser.add_argument("--end", help="last day (YYYY-MM-DD, inclusive) or ISO datetime (exclusive)")
+    parser.add_argument("--category")
+    parser.add_argument("--account", help="card/account number or account name")
+    parser.add_argument("--batch-size", type=int, default=exporter.BATCH_SIZE)
+    parser.add_argument("-o", "--output", help="file to write (default: stdout)")
+    args = parser.parse_args(argv)
+
+    try:
+        chunks = exporter.export(
+            args.format,
+            start=exporter.parse_bound(args.start),
+            end=exporter.parse_bound(args.end, end=True),
+            category=args.category,
+            account=args.account,
+            batch_size=args.batch_size,
+        )
+    except exporter.ExportError as e:
+        parser.error(str(e))
+
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Monthly partition upkeep for tables converted by migrations/009_partition_by_month.sql.
+Run it from cron (e.g. daily); the app also creates upcoming months before each fetch.
+
+Usage:
+    python scripts/partition_maintenance.py                      # create the next months' partitions
+    python scripts/partition_maintenance.py --ahead 6
+    python scripts/partition_maintenance.py --retain-months 36   # also drop partitions older than 36 months
+"""
+
+import argparse
+import os
+import sys
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import db  # noqa: E402
+from db import get_cursor  # noqa: E402
+
+
+def retention_cutoff(months, today=None):
+    """First day of the month `months` months before today's month."""
+    today = today or date.today()
+    index = today.year * 12 + today.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ahead", type=int, default=db.PARTITION_MONTHS_AHEAD, help="months to create beyond this one")
+    parser.add_argument("--retain-months", type=int, help="drop monthly partitions older than this many months")
+    args = parser.parse_args(argv)
+
+    with get_cursor() as (cursor, conn):
+        created = db.ensure_partitions(cursor, months_ahead=args.ahead)
+        if not created:
+            print("No partitioned tables found; run migrations/009_partition_by_month.sql first.")
+            return 1
+        for table, count in created.items():
+            print(f"{table}: {count} partition(s) created")
+        if args.retain_months is not None:
+            cutoff = retention_cutoff(args.retain_months)
+            for table in created:
+                cursor.execute("SELECT drop_partitions_before(%s, %s) AS dropped", (table, cutoff))
+                print(f"{table}: {cursor.fetchone()['dropped']} partition(s) before {cutoff:%Y-%m} dropped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
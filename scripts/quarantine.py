@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Browse the quarantine store (emails no pattern matched, or that failed to process).
+
+Usage:
+    python scripts/quarantine.py stats
+    python scripts/quarantine.py list [--reason unmatched] [--contains "Axis Bank"] [--limit 20]
+    python scripts/quarantine.py show <hash>
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from quarantine import store  # noqa: E402
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats")
+    list_cmd = sub.add_parser("list")
+    list_cmd.add_argument("--reason")
+    list_cmd.add_argument("--contains")
+    list_cmd.add_argument("--limit", type=int, default=20)
+    show_cmd = sub.add_parser("show")
+    show_cmd.add_argument("hash")
+    args = parser.parse_args(argv)
+
+    if args.command == "stats":
+        for reason, stats in store.stats().items():
+            print(f"{reason:15} {stats['entries']:6} entries {stats['hits']:7} hits {stats['bytes']:10} bytes")
+    elif args.command == "list":
+        for entry in store.recent(limit=args.limit, reason=args.reason, contains=args.contains):
+            seen = datetime.fromtimestamp(entry["last_seen"]).strftime("%Y-%m-%d %H:%M")
+            preview = " ".join(entry["body"].split())[:80]
+            print(f"{entry['hash'][:12]} {seen} {entry['reason']:12} x{entry['hits']:<3} {preview}")
+    else:
+        matches = [e for e in store.recent(limit=10 ** 6) if e["hash"].startswith(args.hash)]
+        if len(matches) != 1:
+            print(f"{len(matches)} entries match {args.hash!r}")
+            return 1
+        entry = matches[0]
+        print(f"Hash:    {entry['hash']}\nReason:  {entry['reason']}\nSubject: {entry['subject']}\nHits:    {entry['hits']}\n")
+        print(entry["body"])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Check or rebuild transaction_monthly_rollup (migration 006) against transactions.
+
+Usage:
+    python scripts/rebuild_rollup.py            # report drift, then rebuild if there is any
+    python scripts/rebuild_rollup.py --check    # only report drift
+    python scripts/rebuild_rollup.py --force    # rebuild unconditionally
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from db import get_cursor  # noqa: E402
+
+# Groups whose count or total differ between a fresh aggregate and the rollup
+DRIFT_SQL = """
+    WITH fresh AS (
+        SELECT DATE_TRUNC('month', COALESCE(email_timestamp, date)) AS month, transactiontype,
+               COALESCE(category, '') AS category, COALESCE(card_number, '') AS card_number,
+               COUNT(*) AS transaction_count, SUM(amount) AS total_amount
+        FROM transactions
+        WHERE COALESCE(email_timestamp, date) IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+    )
+    SELECT COALESCE(f.month, r.month) AS month, COALESCE(f.transactiontype, r.transactiontype) AS transactiontype,
+           COALESCE(f.category, r.category) AS category, COALESCE(f.card_number, r.card_number) AS card_number,
+           f.transaction_count AS expected_count, r.transaction_count AS rollup_count,
+           f.total_amount AS expected_total, r.total_amount AS rollup_total
+    FROM fresh f
+    FULL JOIN transaction_monthly_rollup r USING (month, transactiontype, category, card_number)
+    WHERE f.transaction_count IS DISTINCT FROM r.transaction_count
+       OR f.total_amount IS DISTINCT FROM r.total_amount
+    ORDER BY 1, 2, 3, 4
+"""
+
+
+def main(argv):
+    with get_cursor() as (cursor, conn):
+        drift = []
+        if "--force" not in argv:
+            cursor.execute(DRIFT_SQL)
+            drift = cursor.fetchall()
+            for row in drift[:20]:
+                print(f"{row['month']:%Y-%m} {row['transactiontype']} {row['category'] or '-'} {row['card_number'] or '-'}: "
+                      f"count {row['rollup_count']} -> {row['expected_count']}, total {row['rollup_total']} -> {row['expected_total']}")
+            if len(drift) > 20:
+                print(f"... and {len(drift) - 20} more")
+            print(f"{len(drift)} rollup group(s) out of date.")
+            if "--check" in argv or not drift:
+                return 1 if drift else 0
+        cursor.execute("SELECT rebuild_transaction_rollup() AS groups")
+        print(f"Rebuilt rollup: {cursor.fetchone()['groups']} group(s).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
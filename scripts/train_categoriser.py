@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+(Re)train the transaction categoriser from already-categorised rows in `transactions`
+and save it to CATEGORISER_MODEL (default categoriser_model.npz).
+
+Usage:
+    python scripts/train_categoriser.py
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import categoriser  # noqa: E402
+from db import get_cursor  # noqa: E402
+
+
+def main():
+    fresh = categoriser.NaiveBayesCategoriser()
+    with get_cursor() as (cursor, conn):
+        trained = categoriser.train_from_db(cursor, target=fresh)
+    fresh.save(categoriser.MODEL_FILE)
+    print(f"Trained on {trained} transactions across {len(fresh.classes)} categories -> {categoriser.MODEL_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Search over transactions' merchant_name, subject and remarks (migration 008).
+
+Two modes:
+- "trigram" (default): case-insensitive substring match (ILIKE '%q%') served by the
+  pg_trgm GIN indexes, ranked by word_similarity against the best-matching field.
+- "text": full-text match of websearch-style queries ("swiggy -refund", "\"amazon pay\"")
+  against the search_tsv column, ranked by ts_rank.
+
+Results are ordered by (score DESC, id DESC) and keyset-paginated on that pair with
+the same `next` tokens as /transactions.
+"""
+
+import logging
+
+from pagination import InvalidCursor, decode_cursor, split_page
+
+logger = logging.getLogger(__name__)
+
+MODES = ("trigram", "text")
+# Shorter patterns have no trigram to look up, so the index can't help
+MIN_TRIGRAM_QUERY = 3
+
+SEARCH_COLUMNS = (
+    "date", "amount", "merchant_name", "transactiontype", "card_number", "category", "subject", "message_id", "score",
+)
+
+_TRIGRAM_MATCH = """
+    (t.merchant_name ILIKE %(pattern)s OR t.subject ILIKE %(pattern)s OR t.remarks ILIKE %(pattern)s)
+"""
+_TRIGRAM_SCORE = """
+    GREATEST(word_similarity(%(q)s, t.merchant_name),
+             word_similarity(%(q)s, COALESCE(t.subject, '')),
+             word_similarity(%(q)s, COALESCE(t.remarks, '')))::real
+"""
+_TEXT_MATCH = "t.search_tsv @@ websearch_to_tsquery('simple', %(q)s)"
+_TEXT_SCORE = "ts_rank(t.search_tsv, websearch_to_tsquery('simple', %(q)s))::real"
+
+
+class SearchError(ValueError):
+    """Query too short, unknown mode, or a bad page token."""
+
+
+def _like_pattern(q):
+    escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def build_query(q, mode="trigram", category=None, after=None, limit=50):
+    """SQL and params for one page (limit + 1 rows, for split_page)."""
+    q = (q or "").strip()
+    if mode not in MODES:
+        raise SearchError(f"unknown search mode {mode!r}; use one of {', '.join(MODES)}")
+    if mode == "trigram" and len(q) < MIN_TRIGRAM_QUERY:
+        raise SearchError(f"search text must be at least {MIN_TRIGRAM_QUERY} characters")
+    if not q:
+        raise SearchError("search text is required")
+
+    params = {"q": q, "limit": limit + 1}
+    if mode == "trigram":
+        match, score = _TRIGRAM_MATCH, _TRIGRAM_SCORE
+        params["pattern"] = _like_pattern(q)
+    else:
+        match, score = _TEXT_MATCH, _TEXT_SCORE
+    conditions = [match]
+    if category:
+        conditions.append("t.category = %(category)s")
+        params["category"] = category
+
+    outer = ""
+    if after:
+        try:
+            params["after_score"], params["after_id"] = decode_cursor(after, 2)
+        except InvalidCursor as e:
+            raise SearchError(str(e)) from None
+        outer = "WHERE (s.score, s.id) < (%(after_score)s::real, %(after_id)s)"
+
+    sql = f"""
+        SELECT * FROM (
+            SELECT t.id, COALESCE(TO_CHAR(t.email_timestamp, 'MM-DD-YYYY HH24:MI:SS'), '') AS date,
+                   t.amount, t.merchant_name, t.transactiontype, COALESCE(t.card_number, '-') AS card_number,
+                   COALESCE(t.category, 'unknown') AS category, t.subject, t.message_id,
+                   {score} AS score
+            FROM transactions t
+            WHERE {" AND ".join(conditions)}
+        ) AS s
+        {outer}
+        ORDER BY s.score DESC, s.id DESC
+        LIMIT %(limit)s
+    """
+    return sql, params
+
+
+def search_transactions(cursor, q, mode="trigram", category=None, after=None, limit=50):
+    """One page of matches, best first. Returns (rows, next_token)."""
+    sql, params = build_query(q, mode, category, after, limit)
+    cursor.execute(sql, params)
+    return split_page(cursor.fetchall(), limit, key=lambda row: (row["score"], row["id"]))
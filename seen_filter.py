@@ -0,0 +1,209 @@
+"""
+In-process Bloom filter of Message-IDs we have already stored.
+
+process_email_chunk asks the filter first: a miss means the email is definitely new
+and needs no database check; only possible hits go to the `= ANY()` query. The filter
+is warmed from every table get_known_message_ids checks on first use, snapshotted to
+SEEN_FILTER_FILE after each fetch run, and on restart only rows created since the
+snapshot are read.
+
+At the default 2M capacity and 1% false-positive rate it takes about 2.4 MB. Each
+worker keeps its own filter, so a message another worker stored after this one
+warmed up is parsed again and skipped by ON CONFLICT. Saving ORs the worker's
+filter into the snapshot on disk and dates the result by the latest warm-up whose
+ids it contains, never by the save time, so the catch-up after a restart still
+reads rows that other workers stored later.
+"""
+
+import hashlib
+import math
+import os
+import struct
+import tempfile
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+SEEN_FILTER_FILE = os.getenv("SEEN_FILTER_FILE", "seen_message_ids.bloom")
+CAPACITY = int(os.getenv("SEEN_FILTER_CAPACITY", "2000000"))
+ERROR_RATE = float(os.getenv("SEEN_FILTER_ERROR_RATE", "0.01"))
+# Rows created shortly before a snapshot may have committed after it was taken
+_SNAPSHOT_OVERLAP_SECONDS = 3600
+
+_MAGIC = b"SEENBF1\0"
+_HEADER = struct.Struct("<8sQQQQd")  # magic, bits, hashes, capacity, count, snapshot time
+
+
+class BloomFilter:
+    """Bloom filter over a bytearray, k positions by double hashing one blake2b digest."""
+
+    __slots__ = ("capacity", "num_bits", "num_hashes", "count", "bits")
+
+    def __init__(self, capacity=CAPACITY, error_rate=ERROR_RATE, num_bits=None, num_hashes=None, bits=None, count=0):
+        self.capacity = capacity
+        self.num_bits = num_bits or max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.num_hashes = num_hashes or max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.bits = bits if bits is not None else bytearray((self.num_bits + 7) // 8)
+        self.count = count
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode("utf-8", errors="replace"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        m = self.num_bits
+        return [(h1 + i * h2) % m for i in range(self.num_hashes)]
+
+    def add(self, key):
+        bits = self.bits
+        for pos in self._positions(key):
+            bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def to_bytes(self, snapshot_at):
+        return _HEADER.pack(_MAGIC, self.num_bits, self.num_hashes, self.capacity, self.count, snapshot_at) + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Returns (filter, snapshot_at). Raises ValueError for anything that isn't a snapshot."""
+        if len(data) < _HEADER.size:
+            raise ValueError("truncated snapshot")
+        magic, num_bits, num_hashes, capacity, count, snapshot_at = _HEADER.unpack_from(data)
+        bits = bytearray(data[_HEADER.size:])
+        if magic != _MAGIC or len(bits) != (num_bits + 7) // 8:
+            raise ValueError("not a seen-filter snapshot")
+        return cls(capacity, num_bits=num_bits, num_hashes=num_hashes, bits=bits, count=count), snapshot_at
+
+
+class SeenFilter:
+    """Bloom filter of stored Message-IDs with DB warm-up and disk snapshots."""
+
+    def __init__(self, path=SEEN_FILTER_FILE, capacity=CAPACITY, error_rate=ERROR_RATE):
+        self.path = path
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bloom = None
+        self.warm = False
+        self.dirty = False
+        # Every id stored before this time.time() is in the filter (when warm-up began)
+        self.complete_until = None
+        self._lock = threading.Lock()
+
+    def might_contain(self, message_id):
+        """False means definitely not stored. Until warmed, every id is a possible hit."""
+        if not self.warm:
+            return True
+        return message_id in self.bloom
+
+    def add_many(self, message_ids):
+        if self.bloom is None:
+            return
+        with self._lock:
+            for message_id in message_ids:
+                if message_id:
+                    self.bloom.add(message_id)
+                    self.dirty = True
+
+    def _load_snapshot(self):
+        try:
+            with open(self.path, "rb") as f:
+                bloom, snapshot_at = BloomFilter.from_bytes(f.read())
+        except FileNotFoundError:
+            return None, None
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning("Ignoring seen-filter snapshot %s: %s", self.path, e)
+            return None, None
+        if bloom.count > bloom.capacity:
+            logger.info("Seen-filter snapshot is over capacity (%d ids); rebuilding", bloom.count)
+            return None, None
+        return bloom, snapshot_at
+
+    def ensure_warm(self, conn):
+        """Load the snapshot and read ids stored since then (or all ids without one)."""
+        if self.warm:
+            return
+        with self._lock:
+            if self.warm:
+                return
+            started = time.time()
+            bloom, snapshot_at = self._load_snapshot()
+            since = None
+            if bloom is None:
+                bloom = BloomFilter(self.capacity, self.error_rate)
+            else:
+                since = snapshot_at - _SNAPSHOT_OVERLAP_SECONDS
+            added = self._warm_from_db(conn, bloom, since)
+            if bloom.count > bloom.capacity:
+                logger.warning("Seen-filter holds %d ids, over its capacity of %d; raise SEEN_FILTER_CAPACITY",
+                               bloom.count, bloom.capacity)
+            self.bloom = bloom
+            self.complete_until = started
+            self.warm = True
+            self.dirty = added > 0
+            logger.info("Seen-filter warmed with %d ids from the database in %.2fs (snapshot: %s)",
+                        added, time.time() - started, "yes" if since is not None else "no")
+
+    @staticmethod
+    def _warm_from_db(conn, bloom, since):
+        where = ""
+        params = {}
+        if since is not None:
+            where = " WHERE created_at >= to_timestamp(%(since)s)"
+            params["since"] = since
+        added = 0
+        # Server-side cursor so millions of ids stream instead of landing in memory at once
+        with conn.cursor(name="seen_filter_warm") as cur:
+            cur.itersize = 20000
+            cur.execute(f"""
+                SELECT message_id FROM transactions{where}
+                UNION ALL
+                SELECT message_id FROM bills{where}
+                UNION ALL
+                SELECT message_id FROM email_notices{where}
+                UNION ALL
+                SELECT message_id FROM bank_emails{where}
+            """, params)
+            for row in cur:
+                message_id = row["message_id"] if isinstance(row, dict) else row[0]
+                if message_id:
+                    bloom.add(message_id)
+                    added += 1
+        return added
+
+    def save(self):
+        """Merge the filter into the snapshot on disk if anything changed since the last save."""
+        if not self.dirty or self.bloom is None:
+            return False
+        with self._lock:
+            bloom = BloomFilter(self.bloom.capacity, num_bits=self.bloom.num_bits, num_hashes=self.bloom.num_hashes,
+                                bits=bytearray(self.bloom.bits), count=self.bloom.count)
+            self.dirty = False
+        # Never warmed from the database: claim nothing, so a restart reads every row
+        snapshot_at = self.complete_until or 0.0
+        on_disk, on_disk_at = self._load_snapshot()
+        if on_disk is not None and (on_disk.num_bits, on_disk.num_hashes) == (bloom.num_bits, bloom.num_hashes):
+            # The union holds every id stored before either filter's warm-up
+            merged = int.from_bytes(bloom.bits, "little") | int.from_bytes(on_disk.bits, "little")
+            bloom.bits = bytearray(merged.to_bytes(len(bloom.bits), "little"))
+            bloom.count = max(bloom.count, on_disk.count)  # a lower bound; the two overlap
+            snapshot_at = max(snapshot_at, on_disk_at)
+
+        # A temp file per writer: every worker saves to the same path
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".",
+                                        prefix=os.path.basename(self.path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(bloom.to_bytes(snapshot_at))
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return True
+
+
+seen_ids = SeenFilter()
@@ -0,0 +1,83 @@
+"""
+Sender lookup for email_map, built once.
+
+Entries in email_map can be:
+  alerts@hdfcbank.net       exact address
+  @axis.bank.in             any address at exactly that domain (also: axis.bank.in)
+  *.trans.axisbank.com      any address at that domain or one of its subdomains
+
+category() resolves a sender with one dict lookup for the address, one for its
+domain, and one per parent domain for wildcard entries. The same entries give the
+IMAP FROM criteria used to filter on the server.
+"""
+
+from categories import email_map
+
+
+def _normalise_address(sender):
+    return (sender or "").strip().strip("<>").lower()
+
+
+class SenderIndex:
+    """Exact-address, domain and wildcard-suffix index over a {category: [entries]} map."""
+
+    def __init__(self, mapping):
+        self.exact = {}
+        self.domains = {}
+        self.wildcards = {}
+        for category, entries in mapping.items():
+            for entry in entries:
+                entry = _normalise_address(entry)
+                if not entry:
+                    continue
+                # First category listing an entry wins, as with the old in-order scan
+                if entry.startswith("*."):
+                    self.wildcards.setdefault(entry[2:], category)
+                elif entry.startswith("*@") or entry.startswith("@"):
+                    self.domains.setdefault(entry.rpartition("@")[2], category)
+                elif "@" in entry:
+                    self.exact.setdefault(entry, category)
+                else:
+                    self.domains.setdefault(entry, category)
+
+    def category(self, sender):
+        """Return the email_map category for a sender address, or None."""
+        address = _normalise_address(sender)
+        if not address:
+            return None
+        category = self.exact.get(address)
+        if category:
+            return category
+        domain = address.rpartition("@")[2]
+        category = self.domains.get(domain)
+        if category or not self.wildcards:
+            return category
+        # trans.axisbank.com, then axisbank.com, ... (a bare TLD is never an entry)
+        while domain:
+            category = self.wildcards.get(domain)
+            if category:
+                return category
+            domain = domain.partition(".")[2]
+        return None
+
+    def imap_from_criteria(self, categories=None):
+        """
+        IMAP SEARCH criteria matching any configured sender, as a flat token list
+        ('OR', ..., 'FROM', '"addr"', ...). IMAP FROM is a substring match, so a domain
+        entry also covers its subdomains; the index still decides the category.
+        """
+        wanted = set(categories) if categories else None
+        needles = []
+        for table, prefix in ((self.exact, ""), (self.domains, "@"), (self.wildcards, "")):
+            for key, category in table.items():
+                if wanted is None or category in wanted:
+                    needles.append(prefix + key)
+        if not needles:
+            return []
+        criteria = ["OR"] * (len(needles) - 1)
+        for needle in needles:
+            criteria += ["FROM", f'"{needle}"']
+        return criteria
+
+
+index = SenderIndex(email_map)
@@ -104,8 +104,18 @@ def main():
     # Run migrations in order
     migrations = [
         'migrations/001_initial_schema.sql',
-        'migrations/002_migrate_existing_data.sql'
+        'migrations/002_migrate_existing_data.sql',
+        'migrations/003_merchant_canonical_id.sql',
+        'migrations/004_transactions_keyset_indexes.sql',
+        'migrations/005_categories_from_transactions.sql',
+        'migrations/006_transaction_monthly_rollup.sql',
+        'migrations/007_bills_keyset_index.sql',
+        'migrations/008_transaction_search.sql',
+        'migrations/010_email_notices.sql'
     ]
+    # Optional: monthly range partitioning of transactions/bank_emails (PostgreSQL 13+)
+    if os.getenv('PARTITION_TABLES', 'false').lower() == 'true':
+        migrations.append('migrations/009_partition_by_month.sql')
     
     for migration in migrations:
         if os.path.exists(migration):
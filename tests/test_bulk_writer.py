@@ -0,0 +1,71 @@
+import bulk_writer
+from bulk_writer import DUPLICATE, FAILED, INSERTED, bulk_insert, summarise
+
+COLUMNS = ("amount", "merchant_name", "message_id")
+
+
+class FakeCursor:
+    """
+    Records SQL; answers the merge's RETURNING with `returning`, rejects rows keyed
+    `bad_key` and treats rows keyed in `existing` as conflicts. rowcount follows
+    psycopg2: -1 for utility statements such as SAVEPOINT and RELEASE.
+    """
+
+    def __init__(self, returning=(), bad_key=None, existing=()):
+        self.returning = [{"message_id": key} for key in returning]
+        self.bad_key = bad_key
+        self.existing = set(existing)
+        self.statements = []
+        self.rowcount = -1
+
+    def execute(self, sql, params=None):
+        self.statements.append(" ".join(sql.split()))
+        self.rowcount = -1
+        if params and params[-1] == self.bad_key:
+            raise ValueError("check constraint")
+        if params:
+            self.rowcount = 0 if params[-1] in self.existing else 1
+
+    def fetchall(self):
+        return self.returning
+
+
+def test_merge_reports_inserted_and_duplicates(monkeypatch):
+    staged = []
+    monkeypatch.setattr(bulk_writer, "execute_values", lambda cur, sql, rows, page_size: staged.extend(rows))
+    rows = [(10, "A", "<1>"), (20, "B", "<2>"), (10, "A", "<1>"), (30, "C", "<3>")]
+    cursor = FakeCursor(returning=["<1>", "<3>"])
+
+    statuses = bulk_insert(cursor, "transactions", COLUMNS, rows)
+
+    assert statuses == [INSERTED, DUPLICATE, DUPLICATE, INSERTED]
+    assert summarise(statuses) == {INSERTED: 2, DUPLICATE: 2}
+    assert staged[0] == (0, 10, "A", "<1>")
+    merge = next(sql for sql in cursor.statements if sql.startswith("INSERT INTO transactions"))
+    assert "ON CONFLICT DO NOTHING RETURNING message_id" in merge
+
+
+def test_failed_merge_falls_back_to_isolated_rows(monkeypatch):
+    def failing_execute_values(cur, sql, rows, page_size):
+        raise ValueError("check constraint")
+    monkeypatch.setattr(bulk_writer, "execute_values", failing_execute_values)
+    cursor = FakeCursor(bad_key="<bad>")
+
+    statuses = bulk_insert(cursor, "transactions", COLUMNS, [(10, "A", "<1>"), (-1, "B", "<bad>")])
+
+    assert statuses == [INSERTED, FAILED]
+    assert "ROLLBACK TO SAVEPOINT sp_bulk" in cursor.statements
+    assert cursor.statements.count("ROLLBACK TO SAVEPOINT sp_bulk_row") == 1
+
+
+def test_fallback_reports_conflicting_rows_as_duplicates(monkeypatch):
+    def failing_execute_values(cur, sql, rows, page_size):
+        raise ValueError("check constraint")
+    monkeypatch.setattr(bulk_writer, "execute_values", failing_execute_values)
+    cursor = FakeCursor(bad_key="<bad>", existing=["<2>"])
+
+    rows = [(10, "A", "<1>"), (20, "B", "<2>"), (-1, "C", "<bad>")]
+    statuses = bulk_insert(cursor, "transactions", COLUMNS, rows)
+
+    assert statuses == [INSERTED, DUPLICATE, FAILED]
+    assert cursor.statements.count("RELEASE SAVEPOINT sp_bulk_row") == 2
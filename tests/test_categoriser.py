@@ -0,0 +1,41 @@
+import os
+
+from categoriser import NaiveBayesCategoriser, categorise_records, features, rule_category, train_from_rows
+import categoriser
+from records import TransactionRecord
+
+
+def test_rules_match_whole_words_of_merchant():
+    assert rule_category("ZOMATO ORDER") == "food"
+    assert rule_category("Indian Oil petrol pump") == "fuel"
+    # 'act' is a utilities keyword but must not fire inside other words
+    assert rule_category("Practo") is None
+
+
+def test_model_learns_and_abstains_when_unsure(tmp_path):
+    model = NaiveBayesCategoriser()
+    assert model.predict([features("Cult Fit")]) == [(None, 0.0)]
+    rows = [{"merchant_name": "Cult Fit", "category": "fitness", "transactiontype": "debit"},
+            {"merchant_name": "Apollo Pharmacy", "category": "health", "transactiontype": "debit"}] * 5
+    assert train_from_rows(rows, target=model) == 10
+    (category, confidence), = model.predict([features("CULT FIT GYM")])
+    assert category == "fitness" and confidence > 0.9
+
+    path = str(tmp_path / "model.npz")
+    model.save(path)
+    assert NaiveBayesCategoriser.load(path).predict([features("Apollo Pharmacy")])[0][0] == "health"
+    # Saved through a per-writer temp file in the same directory, which is gone afterwards
+    model.save(path)
+    assert os.listdir(tmp_path) == ["model.npz"]
+
+
+def test_categorise_records_fills_only_unknown(monkeypatch):
+    model = NaiveBayesCategoriser()
+    train_from_rows([{"merchant_name": "Cult Fit", "category": "fitness"},
+                     {"merchant_name": "Apollo Pharmacy", "category": "health"}] * 3, target=model)
+    monkeypatch.setattr(categoriser, "model", model)
+    records = [TransactionRecord(merchant_name="Cult Fit"),
+               TransactionRecord(merchant_name="Swiggy", category="food"),
+               TransactionRecord(merchant_name="Uber trip")]
+    assert categorise_records(records) == 2
+    assert [r.category for r in records] == ["fitness", "food", "travel"]
@@ -0,0 +1,57 @@
+from decimal import Decimal
+import pytest
+
+from extract_mail_data import classify_email
+
+BILL_SAMPLE = '''Your bill payment of Electricity was successful. Paid to BESCOM for consumer 1234 Amount ₹1,234.50'''
+
+ICICI_SAMPLE = '''Dear Customer, Your ICICI Bank Credit Card XX1039 has been used for a transaction of INR 1,149.00 on May 09, 2025 at 06:05:07. Info: IND*Amazon. The Available Credit Limit on your card is INR 1,98,322.31.'''
+
+def test_bill_is_routed_to_bills():
+    kind, data = classify_email(BILL_SAMPLE, "Payment successful")
+    assert kind == "bill"
+    assert data["merchant_name"] == "BESCOM"
+    assert data["amount"] == Decimal("1234.50")
+    assert data["category"] == "utilities"
+    assert data["pattern_name"] == "POWER_BILL_PAYMENT"
+
+def test_transaction_in_same_pass():
+    kind, data = classify_email(ICICI_SAMPLE, "Transaction alert")
+    assert kind == "transaction"
+    assert data["transactiontype"] == "debit"
+
+def test_statement_and_dividend_by_subject():
+    assert classify_email("Please find attached.", "Your credit card Statement for Sep")[0] == "statement"
+    assert classify_email("Dividend of Rs 10 per share credited.", "Dividend payout")[0] == "dividend"
+
+def test_non_transactional_is_dropped():
+    assert classify_email("Exclusive cashback offer on your next transaction of Rs. 500!") == (None, None)
+
+def test_statement_email_is_stored_through_the_chunk(monkeypatch):
+    import app
+    from bulk_writer import INSERTED
+
+    written = []
+
+    def fake_bulk_insert(cursor, table, columns, rows):
+        written.append((table, columns, rows))
+        return [INSERTED] * len(rows)
+
+    raw = b"From: cards@hdfcbank.net\r\nSubject: Statement\r\nMessage-ID: <stmt-1@hdfc>\r\n\r\nbody\r\n"
+    monkeypatch.setattr(app, "parse_email_content", lambda raw_bytes: (
+        "Your credit card Statement for Sep", "Please find attached.", "cards@hdfcbank.net", None))
+    monkeypatch.setattr(app, "assign_email_category", lambda subject, body, sender: "transaction")
+    monkeypatch.setattr(app, "bulk_insert", fake_bulk_insert)
+    monkeypatch.setattr(app, "quarantine", lambda *args: pytest.fail("statement email was quarantined"))
+
+    class NothingStoredCursor:
+        def execute(self, sql, params=None):
+            pass
+
+        def fetchall(self):
+            return []
+
+    assert app.process_email_chunk([raw], NothingStoredCursor()) == 1
+    assert written == [("email_notices", app.NOTICE_COLUMNS, [
+        ("statement", "Your credit card Statement for Sep", "cards@hdfcbank.net", "<stmt-1@hdfc>", None),
+    ])]
@@ -0,0 +1,30 @@
+from datetime import date
+from decimal import Decimal
+import pytest
+from converters import apply_converters, build_converter, parse_amount
+
+def test_parse_amount_is_exact_decimal():
+    assert parse_amount("1,98,322.31") == Decimal("198322.31")
+    assert parse_amount("30000") == Decimal("30000")
+    for bad in ("", "NaN", "1e5", "1.2.3"):
+        with pytest.raises(ValueError):
+            parse_amount(bad)
+
+@pytest.mark.parametrize("spec, value, expected", [
+    ("date:%d-%b-%Y", "09-May-2025", date(2025, 5, 9)),
+    ("date:%d/%m/%Y", "10/05/2025", date(2025, 5, 10)),
+    ("date:%d-%m-%y", "10-05-25", date(2025, 5, 10)),
+    # Doesn't fit the declared format, so the fuzzy fallback takes over
+    ("date:%d/%m/%Y", "May 9, 2025", date(2025, 5, 9)),
+])
+def test_date_converters(spec, value, expected):
+    assert build_converter(spec)(value) == expected
+
+def test_apply_converters_keeps_unparsable_values():
+    data = {"amount": "1,149.00", "date": "09-May-2025", "remarks": "x"}
+    converters = {"amount": build_converter("amount"), "date": build_converter("date:%d-%b-%Y")}
+    apply_converters(data, converters)
+    assert data == {"amount": Decimal("1149.00"), "date": "2025-05-09", "remarks": "x"}
+
+    data = {"amount": "n/a"}
+    assert apply_converters(data, converters) == {"amount": "n/a"}
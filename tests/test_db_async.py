@@ -0,0 +1,142 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+import asgi
+import db_async
+import metadata_cache
+from pagination import encode_cursor
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self._rows = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, sql, params=None):
+        self.conn.executed.append((sql, params))
+        if self.conn.fail:
+            raise RuntimeError("canceling statement due to statement timeout")
+        self._rows = self.conn.results.pop(0) if self.conn.results else []
+
+    async def fetchall(self):
+        return self._rows
+
+    async def fetchone(self):
+        return self._rows[0]
+
+
+class FakeConn:
+    def __init__(self, results=(), fail=False):
+        self.results = list(results)
+        self.fail = fail
+        self.executed = []
+        self.committed = self.rolled_back = 0
+        self.closed = False
+
+    def cursor(self, row_factory=None):
+        return FakeCursor(self)
+
+    async def commit(self):
+        self.committed += 1
+
+    async def rollback(self):
+        self.rolled_back += 1
+
+
+class FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+        self.returned = 0
+
+    async def getconn(self):
+        return self.conn
+
+    async def putconn(self, conn):
+        self.returned += 1
+
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    def install(conn):
+        pool = FakePool(conn)
+        monkeypatch.setattr(db_async, "async_pool", pool)
+        monkeypatch.setattr(db_async, "replica_pool", None)
+        metadata_cache.cache.invalidate("accounts")
+        return pool
+    yield install
+    metadata_cache.cache.invalidate("accounts")
+
+
+def _txn(i):
+    return {"id": i, "email_timestamp": datetime(2024, 3, i, tzinfo=timezone.utc), "date": f"03-0{i}-2024 00:00:00",
+            "amount": Decimal("10.00") * i, "merchant_name": "Swiggy", "transactiontype": "debit",
+            "card_number": "1234" if i % 2 else None, "category": "food"}
+
+
+def test_get_cursor_commits_or_rolls_back(fake_pool):
+    pool = fake_pool(FakeConn())
+
+    async def scenario():
+        async with db_async.get_cursor() as (cur, conn):
+            await cur.execute("SELECT 1")
+        with pytest.raises(RuntimeError):
+            async with db_async.get_cursor() as (cur, conn):
+                raise RuntimeError("boom")
+
+    asyncio.run(scenario())
+    assert pool.conn.committed == 1 and pool.conn.rolled_back == 1 and pool.returned == 2
+
+
+def test_fetch_transactions_pages_and_labels_accounts(fake_pool):
+    accounts = [{"account_number": "1234", "account_name": "HDFC Regalia", "account_type": "credit"}]
+    conn = FakeConn([accounts, [_txn(3), _txn(2), _txn(1)]])
+    fake_pool(conn)
+
+    rows, next_token = asyncio.run(db_async.fetch_transactions(category="food", limit=2))
+    assert [row["id"] for row in rows] == [3, 2]
+    assert rows[0]["account_name"] == "HDFC Regalia" and rows[1]["card_number"] == "-"
+    assert next_token == encode_cursor(_txn(2)["email_timestamp"], 2)
+    sql, params = conn.executed[1]
+    assert "t.category = %s" in sql and params == ["food", 3]
+    assert metadata_cache.cache.fresh("accounts")["1234"]["account_type"] == "credit"
+
+
+def _call(path, query=b""):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": path, "query_string": query}
+    asyncio.run(asgi.app(scope, receive, send))
+    return sent[0]["status"], json.loads(sent[1]["body"])
+
+
+def test_asgi_serves_transactions_and_rejects_bad_tokens(fake_pool):
+    fake_pool(FakeConn([[], [_txn(1)]]))
+    status, body = _call("/api/transactions", b"shape=columns")
+    assert status == 200
+    assert body == {"transactions": {column: [value] for column, value in zip(
+        db_async.TRANSACTION_COLUMNS, [1, "03-01-2024 00:00:00", "10.00", "Swiggy", "debit", "1234", "food", "-", "-"])},
+        "next": None}
+    assert _call("/api/transactions", b"after=nope")[0] == 400
+    assert _call("/api/transactions/search", b"q=ab")[0] == 400
+    assert _call("/api/spending/March")[0] == 400
+
+
+def test_asgi_reports_database_errors_as_500(fake_pool):
+    fake_pool(FakeConn(fail=True))
+    assert _call("/api/accounts") == (500, {"error": "Internal server error"})
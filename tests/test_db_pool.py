@@ -0,0 +1,151 @@
+import threading
+import time
+
+import pytest
+from psycopg2 import extensions
+
+from db_pool import ConnectionPool, PoolTimeout
+
+
+class FakeConn:
+    def __init__(self, fail_ping=False):
+        self.closed = 0
+        self.fail_ping = fail_ping
+        self.pings = 0
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def cursor(self):
+        conn = self
+
+        class Cur:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, sql):
+                conn.pings += 1
+                if conn.fail_ping:
+                    raise Exception("server closed the connection")
+
+        return Cur()
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+def make_pool(minconn=0, maxconn=2, **kwargs):
+    made = []
+
+    def connect():
+        conn = FakeConn()
+        made.append(conn)
+        return conn
+
+    return ConnectionPool(minconn, maxconn, connect=connect, **kwargs), made
+
+
+def test_recently_used_connection_is_reused_without_a_ping():
+    pool, made = make_pool()
+    conn = pool.getconn()
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+    assert conn.pings == 0 and len(made) == 1
+
+
+def test_idle_connection_is_validated_and_replaced_when_dead():
+    pool, made = make_pool(idle_check_seconds=0)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    conn.fail_ping = True
+    replacement = pool.getconn()
+    assert replacement is not conn and conn.closed
+    stats = pool.stats()
+    assert stats["validation_failures"] == 1 and stats["size"] == 1 and stats["active"] == 1
+
+
+def test_aged_connection_is_recycled_on_return():
+    pool, made = make_pool(max_age_seconds=0.01)
+    conn = pool.getconn()
+    time.sleep(0.02)
+    pool.putconn(conn)
+    assert conn.closed
+    assert pool.stats()["recycled"] == 1 and pool.stats()["size"] == 0
+
+
+def test_foreign_connection_is_closed_not_pooled():
+    pool, made = make_pool()
+    stranger = FakeConn()
+    pool.putconn(stranger)
+    assert stranger.closed
+    assert pool.stats()["idle"] == 0
+
+
+def test_connection_left_in_transaction_is_rolled_back():
+    pool, made = make_pool()
+    conn = pool.getconn()
+    conn.status = extensions.TRANSACTION_STATUS_INERROR
+    pool.putconn(conn)
+    assert not conn.closed and conn.status == extensions.TRANSACTION_STATUS_IDLE
+    assert pool.stats()["idle"] == 1
+
+
+def test_checkout_waits_for_a_returned_connection_then_times_out():
+    pool, made = make_pool(maxconn=1)
+    conn = pool.getconn()
+    threading.Timer(0.05, pool.putconn, args=(conn,)).start()
+    assert pool.getconn(timeout=2) is conn
+    with pytest.raises(PoolTimeout):
+        pool.getconn(timeout=0.01)
+    stats = pool.stats()
+    assert stats["timeouts"] == 1 and stats["wait_seconds_max"] >= 0.04
+
+
+def test_concurrent_checkouts_never_exceed_maxconn():
+    pool, made = make_pool(maxconn=3)
+    in_use = []
+    peak = []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(20):
+            conn = pool.getconn(timeout=5)
+            with lock:
+                in_use.append(conn)
+                peak.append(len(in_use))
+            time.sleep(0.001)
+            with lock:
+                in_use.remove(conn)
+            pool.putconn(conn)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert max(peak) <= 3 and len(made) <= 3
+    stats = pool.stats()
+    assert stats["checkouts"] == 160 and stats["active"] == 0 and stats["idle"] == stats["size"]
+
+
+def test_failed_connect_frees_its_slot():
+    calls = []
+
+    def connect():
+        calls.append(1)
+        if len(calls) == 1:
+            raise Exception("connection refused")
+        return FakeConn()
+
+    pool = ConnectionPool(0, 1, connect=connect)
+    with pytest.raises(Exception, match="refused"):
+        pool.getconn()
+    assert pool.getconn(timeout=0.1) is not None
+    assert pool.stats()["connect_errors"] == 1
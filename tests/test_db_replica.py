@@ -0,0 +1,120 @@
+import pytest
+
+import db
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        if self.conn.lag is None:
+            raise Exception("could not connect to server")
+        self.conn.executed.append(sql)
+
+    def fetchone(self):
+        return (self.conn.lag,)
+
+    def fetchall(self):
+        return [{"server": self.conn.name}]
+
+    def close(self):
+        pass
+
+
+class FakeConn:
+    def __init__(self, name, lag=0.0):
+        self.name, self.lag = name, lag
+        self.executed = []
+
+    def cursor(self, cursor_factory=None):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+        self.returned = []
+
+    def getconn(self, timeout=None):
+        return self.conn
+
+    def putconn(self, conn, close=False):
+        self.returned.append((conn, close))
+
+    def stats(self):
+        return {"active": 0}
+
+
+@pytest.fixture
+def pools(monkeypatch):
+    primary, replica = FakePool(FakeConn("primary")), FakePool(FakeConn("replica"))
+    monkeypatch.setattr(db, "db_pool", primary)
+    monkeypatch.setattr(db, "replica_pool", replica)
+    monkeypatch.setattr(db, "REPLICA_DSN", "host=replica")
+    monkeypatch.setattr(db, "_replica_state", {"checked_at": None, "healthy": False, "lag_seconds": None, "fallbacks": 0})
+    monkeypatch.setattr(db, "_primary_pinned_until", 0.0)
+    return primary, replica
+
+
+def _used(readonly):
+    with db.get_cursor(readonly=readonly) as (cur, conn):
+        return conn.name
+
+
+def test_reads_go_to_an_in_sync_replica(pools):
+    primary, replica = pools
+    assert _used(True) == "replica"
+    assert _used(False) == "primary"
+    assert replica.returned == [(replica.conn, False)]
+    # The cached check is reused within DB_REPLICA_LAG_CHECK_SECONDS
+    assert _used(True) == "replica" and len(replica.conn.executed) == 1
+
+
+def test_lagging_replica_falls_back_to_primary(pools):
+    primary, replica = pools
+    replica.conn.lag = db.REPLICA_MAX_LAG_SECONDS + 5
+    assert _used(True) == "primary"
+    assert replica.returned == [(replica.conn, False)]
+    stats = db.pool_stats()["replica"]
+    assert stats["healthy"] is False and stats["primary_fallbacks"] == 1
+
+
+def test_unreachable_replica_is_closed_and_skipped(pools):
+    primary, replica = pools
+    replica.conn.lag = None
+    assert _used(True) == "primary"
+    assert replica.returned == [(replica.conn, True)]
+    assert _used(True) == "primary" and len(replica.returned) == 1
+
+
+def test_without_replica_reads_use_primary(pools, monkeypatch):
+    monkeypatch.setattr(db, "REPLICA_DSN", "")
+    assert _used(True) == "primary"
+    assert db._replica_state["fallbacks"] == 0
+
+
+def test_account_writes_pin_reads_to_primary(pools):
+    primary, replica = pools
+    db.add_account({"account_name": "HDFC Regalia", "account_type": "credit", "bank_name": "HDFC",
+                    "account_number": "1234"})
+    assert _used(True) == "primary"
+    assert replica.returned == [] and db._replica_state["fallbacks"] == 0
+
+
+def test_accounts_page_reads_primary(pools):
+    primary, replica = pools
+    assert db.get_all_accounts() == [{"server": "primary"}]
+    assert replica.returned == []
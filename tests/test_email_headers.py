@@ -0,0 +1,45 @@
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+import pytest
+from email_headers import decode_envelope, message_id_from_bytes, parse_header_date
+
+RAW = (
+    "Received: from mx.example.net; Tue, 09 Sep 2025 03:58:13 +0000\r\n"
+    "From: =?UTF-8?Q?Kotak_Alerts?= <BankAlerts@kotak.com>\r\n"
+    "Subject: =?UTF-8?B?4p2XIFlvdSBoYXZlIGRvbmUgYSBVUEkgdHhu?=\r\n"
+    "Date: Tue, 9 Sep 2025 09:28:13 +0530 (IST)\r\n"
+    "\r\n"
+    "body\r\n"
+).encode("ascii")
+
+@pytest.mark.parametrize("value", [
+    "Tue, 09 Sep 2025 09:28:13 +0530",
+    "9 Sep 2025 03:58 +0000",
+    "Tue, 09 Sep 2025 03:58:13 GMT",
+    "Tue, 09 Sep 2025 03:58:13 -0000",
+    "Tue, 09 Sep 25 09:28:13 +0530",
+    "Mon, 31 Mar 2025 23:59:59 -0700 (PDT)",
+])
+def test_parse_header_date_matches_stdlib(value):
+    expected = parsedate_to_datetime(value)
+    if expected.tzinfo is None:
+        expected = expected.replace(tzinfo=timezone.utc)  # "-0000" means UTC for us
+    assert parse_header_date(value) == expected
+    assert str(parse_header_date(value).tzinfo) == "Asia/Kolkata"
+
+def test_decode_envelope():
+    subject, sender, timestamp = decode_envelope(RAW)
+    assert subject == "❗ You have done a UPI txn"
+    assert sender == "BankAlerts@kotak.com"
+    assert timestamp.isoformat() == "2025-09-09T09:28:13+05:30"
+
+def test_falls_back_to_received_header():
+    raw = RAW.replace(b"Date: Tue, 9 Sep 2025 09:28:13 +0530 (IST)\r\n", b"Date: not a date\r\n")
+    assert decode_envelope(raw)[2].isoformat() == "2025-09-09T09:28:13+05:30"
+
+def test_message_id_from_header_bytes_only():
+    raw = RAW.replace(b"\r\n\r\n", b"\r\nMessage-ID:\r\n <abc.123@kotak.com>\r\n\r\n", 1)
+    assert message_id_from_bytes(raw) == "<abc.123@kotak.com>"
+    assert message_id_from_bytes(RAW) is None
+    # A Message-ID line in the body is not a header
+    assert message_id_from_bytes(RAW + b"Message-ID: <body@x>\r\n") is None
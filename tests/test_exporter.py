@@ -0,0 +1,113 @@
+import csv
+import io
+import json
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+import app
+import exporter
+
+
+def _rows(n):
+    ts = datetime(2024, 3, 1, 9, 0, tzinfo=timezone.utc)
+    return [(i, ts, Decimal("12.50") + i, "INR", f"Shop {i}", f"shop-{i}", "debit", "food", "1234", f"<{i}@bank>")
+            for i in range(n)]
+
+
+class FakeNamedCursor:
+    def __init__(self, conn, name):
+        self.conn, self.name = conn, name
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.conn.closed_cursors += 1
+        return False
+
+    def execute(self, sql, params):
+        self.conn.executed.append((self.name, sql, params))
+
+    def fetchmany(self, size):
+        self.conn.fetch_sizes.append(size)
+        batch, self.conn.rows = self.conn.rows[:size], self.conn.rows[size:]
+        return batch
+
+
+class FakeConn:
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+        self.fetch_sizes = []
+        self.closed_cursors = 0
+
+    def cursor(self, name=None):
+        return FakeNamedCursor(self, name)
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    conn = FakeConn(_rows(5))
+    released = []
+
+    @contextmanager
+    def fake_get_cursor(readonly=False):
+        yield None, conn
+        released.append(conn)
+
+    monkeypatch.setattr(exporter, "get_cursor", fake_get_cursor)
+    conn.released = released
+    return conn
+
+
+def test_csv_is_streamed_in_batches_from_a_named_cursor(fake_db):
+    chunks = list(exporter.export("csv", batch_size=2))
+    assert len(chunks) == 4  # header + batches of 2, 2, 1
+    assert fake_db.executed[0][0] == "transactions_export"
+    assert set(fake_db.fetch_sizes) == {2} and fake_db.released == [fake_db]
+
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+    assert rows[0] == list(exporter.COLUMNS)
+    assert rows[1][:3] == ["0", "2024-03-01T09:00:00+00:00", "12.50"]
+    assert len(rows) == 6
+
+
+def test_ndjson_keeps_amounts_exact(fake_db):
+    lines = b"".join(exporter.export("ndjson", batch_size=3)).decode().splitlines()
+    first = json.loads(lines[0])
+    assert len(lines) == 5
+    assert first["amount"] == "12.50" and first["message_id"] == "<0@bank>"
+
+
+def test_filters_become_query_parameters():
+    sql, params = exporter.build_query(start=datetime(2024, 1, 1), end=exporter.parse_bound("2024-01-31", end=True),
+                                       category="food", account="HDFC Regalia")
+    assert params["end"] == datetime(2024, 2, 1)
+    assert "t.category = %(category)s" in sql and "account_name = %(account)s" in sql
+    assert sql.endswith("ORDER BY t.email_timestamp, t.id")
+
+
+def test_bad_parameters_are_rejected_before_streaming():
+    with pytest.raises(exporter.ExportError):
+        exporter.export("xml")
+    with pytest.raises(exporter.ExportError):
+        exporter.parse_bound("yesterday")
+
+
+def test_parquet_round_trip(fake_db):
+    pq = pytest.importorskip("pyarrow.parquet")
+    data = b"".join(exporter.export("parquet", batch_size=2))
+    table = pq.read_table(io.BytesIO(data))
+    assert table.num_rows == 5 and table.column("amount")[0].as_py() == Decimal("12.50")
+
+
+def test_export_endpoint_streams_an_attachment(fake_db):
+    response = app.app.test_client().get("/export/transactions?format=ndjson&category=food")
+    assert response.status_code == 200
+    assert response.headers["Content-Disposition"] == "attachment; filename=transactions.ndjson"
+    assert len(response.data.splitlines()) == 5
+    assert fake_db.executed[0][2] == {"category": "food"}
+    assert app.app.test_client().get("/export/transactions?start=soon").status_code == 400
@@ -0,0 +1,28 @@
+from extract_mail_data import extract_many, extract_transaction_data
+
+ICICI_SAMPLE = '''Dear Customer, Your ICICI Bank Credit Card XX1039 has been used for a transaction of INR 1,149.00 on May 09, 2025 at 06:05:07. Info: IND*Amazon. The Available Credit Limit on your card is INR 1,98,322.31.'''
+
+KOTAK_NACH_SAMPLE = '''Dear Customer, Your account XXXXXXXX4433 has been credited with payment received via NACH/ECS as per details below. Remitter : NACH-ECS-CR-VEDANTA LIMITED-37405928 Amount: Rs.640.00 Transaction date : 09/09/2025 Thank you for banking with us.'''
+
+PROMO_SAMPLE = '''Exclusive cashback offer on your next transaction of Rs. 500!'''
+
+def test_extract_many_is_columnar_and_aligned():
+    bodies = [PROMO_SAMPLE, ICICI_SAMPLE, "hello there", KOTAK_NACH_SAMPLE]
+    batch = extract_many(bodies, ["", "Transaction alert", "", "NACH/ECS advice"])
+
+    assert batch.index == [1, 3]
+    assert batch.pattern_name == ["APAY ICICI Credit Card", "KOTAK_NACH_CREDIT"]
+    assert batch.amount == [1149.00, 640.00]
+    assert batch.card_number == ["1039", "4433"]
+    assert batch.merchant_name == ["IND*Amazon", "NACH-ECS-CR-VEDANTA LIMITED-37405928"]
+    assert batch.transactiontype == ["debit", "credit"]
+    assert batch.currency == ["INR", "INR"]
+    assert batch.skipped == [0, 2]
+    assert list(batch.rows("index", "amount")) == [(1, 1149.00), (3, 640.00)]
+
+def test_extract_many_agrees_with_single_extraction():
+    batch = extract_many([ICICI_SAMPLE])
+    data = extract_transaction_data(ICICI_SAMPLE)
+    assert (batch.amount[0], batch.merchant_name[0], batch.transactiontype[0]) == (
+        data["amount"], data["merchant_name"], data["transactiontype"]
+    )
@@ -0,0 +1,29 @@
+import app
+
+
+class FakeCursor:
+    def __init__(self, stored):
+        self.stored = stored
+        self.queries = []
+
+    def execute(self, sql, params=None):
+        self.queries.append((sql, params))
+
+    def fetchall(self):
+        _, params = self.queries[-1]
+        return [{"message_id": mid} for mid in params["ids"] if mid in self.stored]
+
+
+def _raw(message_id):
+    return (f"From: alerts@hdfcbank.net\r\nSubject: Alert\r\nMessage-ID: {message_id}\r\n\r\nbody\r\n").encode()
+
+
+def test_known_emails_are_dropped_before_parsing(monkeypatch):
+    parsed = []
+    monkeypatch.setattr(app, "parse_email_content", lambda raw: parsed.append(raw) or ("", "", "", None))
+    cursor = FakeCursor(stored={"<1@hdfc>", "<2@hdfc>"})
+
+    app.process_email_chunk([_raw("<1@hdfc>"), _raw("<2@hdfc>"), _raw("<3@hdfc>")], cursor)
+
+    assert parsed == [_raw("<3@hdfc>")]
+    assert len(cursor.queries) == 1 and "ANY(%(ids)s)" in cursor.queries[0][0]
@@ -0,0 +1,18 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+
+import json_fast
+
+
+def test_dumps_matches_jsonify_conventions():
+    body = json.loads(json_fast.dumps({"amount": Decimal("10.50"), "at": datetime(2024, 1, 2, 3, 4, 5), "name": "Café"}))
+    assert body == {"amount": "10.50", "at": "2024-01-02T03:04:05", "name": "Café"}
+
+
+def test_shape_rows_projects_rows_or_columns():
+    rows = [{"amount": 1, "merchant_name": "A", "id": 9}, {"amount": 2, "merchant_name": "B", "id": 8}]
+    assert json_fast.shape_rows(rows, ("amount", "merchant_name")) == [
+        {"amount": 1, "merchant_name": "A"}, {"amount": 2, "merchant_name": "B"}]
+    assert json_fast.shape_rows(rows, ("amount", "merchant_name"), "columns") == {
+        "amount": [1, 2], "merchant_name": ["A", "B"]}
@@ -0,0 +1,33 @@
+import logging
+import queue
+
+from logging_setup import DeferredQueueHandler, StageSampler
+
+
+def test_sampler_logs_first_then_every_nth():
+    sampler = StageSampler(first=2, every=5)
+    allowed = [n for n in range(1, 16) if sampler.allow("parse")]
+    assert allowed == [1, 2, 5, 10, 15]
+    assert sampler.allow("insert")  # stages are counted separately
+    assert sampler.reset() == {"parse": 15, "insert": 1}
+
+
+def test_queue_handler_defers_formatting():
+    q = queue.SimpleQueue()
+    logger = logging.getLogger("test_logging_setup.deferred")
+    logger.propagate = False
+    logger.addHandler(DeferredQueueHandler(q))
+    try:
+        logger.warning("Parsed %s from %s", "Alert", "bank@example.com")
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.error("failed", exc_info=True)
+    finally:
+        logger.handlers.clear()
+    record = q.get_nowait()
+    # Still unformatted on the producer side
+    assert record.msg == "Parsed %s from %s" and record.args == ("Alert", "bank@example.com")
+    assert record.getMessage() == "Parsed Alert from bank@example.com"
+    failed = q.get_nowait()
+    assert failed.exc_info is None and "ValueError: boom" in failed.exc_text
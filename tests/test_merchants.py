@@ -0,0 +1,34 @@
+from merchants import MerchantIndex, normalise_merchant_key, resolve_merchant
+from records import TransactionRecord
+
+
+def test_spellings_collapse_to_one_merchant():
+    spellings = ["IND*Amazon", "AMAZON PAY INDIA", "amazonpay@apl", "Amazon Pay India Pvt Ltd", "AMZN"]
+    assert {resolve_merchant(s) for s in spellings} == {"amazon"}
+
+
+def test_prefix_truncation_and_fuzzy_rules():
+    assert resolve_merchant("POS 1234 HPCL PETROL PUMP") == "hpcl"
+    assert resolve_merchant("FLIPK") == "flipkart"
+    assert resolve_merchant("Zomatoo") == "zomato"
+
+
+def test_unresolved_names_get_stable_slugs():
+    assert normalise_merchant_key("NACH-ECS-CR-VEDANTA LIMITED-37405928") == "nach ecs cr vedanta"
+    assert resolve_merchant("NACH-ECS-CR-VEDANTA LIMITED-37405928") == "nach_ecs_cr_vedanta"
+    assert resolve_merchant("q12345@ybl") == "upi:q12345@ybl"
+    assert resolve_merchant("unknown", "Swiggy.stores@axb") == "swiggy"
+    assert resolve_merchant("") == "unknown"
+
+
+def test_index_caches_results():
+    index = MerchantIndex({"acme": ["acme corp"]})
+    assert index.resolve("ACME Corp Pvt Ltd") == "acme"
+    index.resolve("ACME Corp Pvt Ltd")
+    assert index.resolve.cache_info().hits == 1
+
+
+def test_record_carries_merchant_id():
+    txn = TransactionRecord.from_extracted({"merchant_name": "IND*Amazon"}, subject="s")
+    assert txn.merchant_id == "amazon"
+    assert dict(zip(TransactionRecord.INSERT_COLUMNS, txn.insert_params()))["merchant_id"] == "amazon"
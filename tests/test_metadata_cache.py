@@ -0,0 +1,47 @@
+import metadata_cache
+from metadata_cache import MetadataCache
+
+
+class FakeCursor:
+    def __init__(self, names=()):
+        self.names = list(names)
+        self.queries = []
+        self.rowcount = 0
+
+    def execute(self, sql, params=None):
+        self.queries.append((sql, params))
+        if sql.lstrip().startswith("INSERT"):
+            new = [n for n in params[0] if n not in self.names]
+            self.names.extend(new)
+            self.rowcount = len(new)
+
+    def fetchall(self):
+        return [{"name": n} for n in sorted(self.names)]
+
+
+def test_entries_expire_after_ttl():
+    now = [0.0]
+    cache = MetadataCache(ttl=10, clock=lambda: now[0])
+    loads = []
+    load = lambda: loads.append(1) or len(loads)
+    assert cache.get("x", load) == 1
+    now[0] = 9
+    assert cache.get("x", load) == 1
+    now[0] = 11
+    assert cache.get("x", load) == 2
+
+
+def test_categories_are_cached_until_a_new_one_is_registered(monkeypatch):
+    monkeypatch.setattr(metadata_cache, "cache", MetadataCache(ttl=300))
+    cursor = FakeCursor(["food", "travel"])
+
+    assert metadata_cache.categories(cursor) == ["food", "travel"]
+    assert metadata_cache.categories(cursor) == ["food", "travel"]
+    assert len(cursor.queries) == 1
+
+    # Known categories cost nothing; a new one is inserted and drops the cached list
+    assert metadata_cache.register_categories(cursor, {"food", None}) == 0
+    assert len(cursor.queries) == 1
+    assert metadata_cache.register_categories(cursor, {"food", "rent"}) == 1
+    assert cursor.queries[-1][1] == (["rent"],)
+    assert metadata_cache.categories(cursor) == ["food", "rent", "travel"]
@@ -0,0 +1,126 @@
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pytest
+
+import app
+from pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_before, split_page
+
+
+def test_cursor_round_trips_timestamps_and_ids():
+    ts = datetime(2024, 5, 1, 10, 30, tzinfo=timezone.utc)
+    token = encode_cursor(ts, 42)
+    assert "=" not in token
+    assert decode_cursor(token, 2) == (ts, 42)
+    assert decode_cursor(encode_cursor(None, 7), 2) == (None, 7)
+
+
+@pytest.mark.parametrize("token", ["garbage!", encode_cursor(1), "e30"])
+def test_foreign_tokens_are_rejected(token):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token, 2)
+
+
+def test_split_page_only_issues_a_token_when_more_rows_exist():
+    rows = [{"id": i} for i in range(3)]
+    page, token = split_page(rows, 2, key=lambda r: (None, r["id"]))
+    assert page == rows[:2] and decode_cursor(token, 2) == (None, 1)
+    assert split_page(rows, 3, key=lambda r: (None, r["id"])) == (rows, None)
+
+
+def test_keyset_before_handles_null_timestamps():
+    params = []
+    assert keyset_before("ts", "id", (None, 5), params) == "((ts IS NULL AND id < %s) OR ts IS NOT NULL)"
+    assert keyset_before("ts", "id", ("2024-01-01", 5), params) == "(ts, id) < (%s, %s)"
+    assert params == [5, "2024-01-01", 5]
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def execute(self, sql, params=None):
+        self.queries.append((sql, params))
+
+    def fetchall(self):
+        sql = self.queries[-1][0]
+        if "FROM categories" in sql:
+            return [{"name": "food"}]
+        if "FROM accounts" in sql:
+            return []
+        return self.rows
+
+    def fetchone(self):
+        return {"oldest": None, "newest": None}
+
+
+def test_transactions_json_pages_by_keyset(monkeypatch):
+    ts = datetime(2024, 5, 1, 10, 30)
+    rows = [{"id": 10 - i, "email_timestamp": ts, "date": "05-01-2024 10:30:00", "amount": 100, "merchant_name": "Swiggy",
+             "transactiontype": "debit", "card_number": None, "category": "food"} for i in range(3)]
+    cursor = FakeCursor(rows)
+
+    @contextmanager
+    def fake_get_cursor(readonly=False):
+        yield cursor, None
+
+    monkeypatch.setattr(app, "get_cursor", fake_get_cursor)
+    app.metadata_cache.cache.invalidate()
+    client = app.app.test_client()
+
+    after = encode_cursor(ts, 11)
+    body = client.get(f"/transactions?format=json&limit=2&category=food&after={after}").get_json()
+    assert len(body["transactions"]) == 2
+    assert decode_cursor(body["next"], 2) == (ts, 9)
+    sql, params = cursor.queries[-1]
+    assert "OFFSET" not in sql and "(t.email_timestamp, t.id) < (%s, %s)" in sql
+    assert params == ("food", ts, 11, 3)
+
+    assert client.get("/transactions?format=json&after=bogus").status_code == 400
+
+    # Non-positive limits are clamped to one row rather than reaching LIMIT
+    assert len(client.get("/transactions?format=json&limit=-5").get_json()["transactions"]) == 1
+    assert cursor.queries[-1][1] == (2,)
+
+
+def test_bills_page_is_keyset_paginated_and_streamed(monkeypatch):
+    ts = datetime(2024, 6, 1, 8, 0)
+    rows = [{"email_timestamp": ts, "amount": 799, "merchant_name": "ACT Fibernet", "transactiontype": "debit",
+             "card_number": None, "category": "utilities", "subject": "Bill", "message_id": f"<{i}@act>"}
+            for i in range(3)]
+    cursor = FakeCursor(rows)
+
+    @contextmanager
+    def fake_get_cursor(readonly=False):
+        yield cursor, None
+
+    monkeypatch.setattr(app, "get_cursor", fake_get_cursor)
+    client = app.app.test_client()
+
+    body = client.get("/bills?format=json&limit=2").get_json()
+    assert [b["card_number"] for b in body["bills"]] == ["-", "-"]
+    assert decode_cursor(body["next"], 2) == (ts, "<1@act>")
+    assert cursor.queries[-1][1] == (3,)
+
+    response = client.get(f"/bills?limit=2&after={body['next']}")
+    assert response.is_streamed
+    html = response.get_data(as_text=True)
+    assert html.count("<td>ACT Fibernet</td>") == 2 and "Older" in html and "Newest" in html
+    assert cursor.queries[-1][1] == (ts, "<1@act>", 3)
+
+
+def test_transactions_json_columnar_shape(monkeypatch):
+    rows = [{"id": 1, "email_timestamp": None, "date": "", "amount": 5, "merchant_name": "Uber",
+             "transactiontype": "upi", "card_number": None, "category": "travel"}]
+    cursor = FakeCursor(rows)
+
+    @contextmanager
+    def fake_get_cursor(readonly=False):
+        yield cursor, None
+
+    monkeypatch.setattr(app, "get_cursor", fake_get_cursor)
+    body = app.app.test_client().get("/transactions?format=json&shape=columns").get_json()
+    assert body["transactions"]["merchant_name"] == ["Uber"]
+    assert body["transactions"]["card_number"] == ["-"] and body["next"] is None
+    assert "TO_CHAR(t.email_timestamp" in cursor.queries[-1][0]
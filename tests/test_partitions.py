@@ -0,0 +1,44 @@
+from contextlib import contextmanager
+
+import app
+import db
+
+
+class FakeCursor:
+    def __init__(self, partitioned=()):
+        self.partitioned = list(partitioned)
+        self.queries = []
+
+    def execute(self, sql, params=None):
+        self.queries.append((sql, params))
+
+    def fetchall(self):
+        return [{"relname": name} for name in self.partitioned]
+
+    def fetchone(self):
+        sql = self.queries[-1][0]
+        if "ensure_monthly_partitions" in sql:
+            return {"created": 2}
+        return {"transactions": 7, "bills": 3}
+
+
+def test_ensure_partitions_only_touches_partitioned_tables():
+    assert db.ensure_partitions(FakeCursor()) == {}
+    cursor = FakeCursor(["transactions"])
+    assert db.ensure_partitions(cursor, months_ahead=6) == {"transactions": 2}
+    assert cursor.queries[-1][1] == ("transactions", "email_timestamp", 6)
+
+
+def test_cleanup_truncates_instead_of_deleting(monkeypatch):
+    cursor = FakeCursor()
+
+    @contextmanager
+    def fake_get_cursor(readonly=False):
+        yield cursor, type("Conn", (), {"commit": lambda self: None})()
+
+    monkeypatch.setattr(app, "get_cursor", fake_get_cursor)
+    body = app.app.test_client().post("/cleanup-emails").get_json()
+    assert body["deleted_transactions"] == 7 and body["deleted_bills"] == 3
+    statements = [sql for sql, _ in cursor.queries]
+    assert "TRUNCATE transactions, bills, transaction_monthly_rollup" in statements
+    assert not any(sql.startswith("DELETE") for sql in statements)
@@ -0,0 +1,78 @@
+import os
+import pytest
+from pattern_registry import PatternRegistry, PatternRegistryError, load_pattern_set
+
+GOOD_YAML = '''
+transactions:
+  ICICI_CARD:
+    pattern: 'ICICI Bank Credit Card\\s+XX(\\d{4})'
+    flags: [IGNORECASE]
+    fields: [card_number]
+    transactiontype: Credit Card Debit
+'''
+
+def write(path, text):
+    path.write_text(text, encoding="utf-8")
+    # Make sure the mtime moves even on coarse-grained filesystems
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+def test_repo_patterns_load():
+    pattern_set = load_pattern_set()
+    assert "KOTAK_IMPS_DEBIT" in pattern_set.transactions
+    assert "POWER_BILL_PAYMENT" in pattern_set.bills
+    assert pattern_set.statics["KOTAK_IMPS_DEBIT"] == {"transactiontype": "IMPS Debit"}
+
+def test_rejects_pattern_that_does_not_compile(tmp_path):
+    path = tmp_path / "patterns.yaml"
+    write(path, "transactions:\n  BROKEN:\n    pattern: '(unclosed'\n    fields: []\n")
+    with pytest.raises(PatternRegistryError) as exc:
+        load_pattern_set(str(path))
+    assert "transactions.BROKEN" in exc.value.problems[0]
+
+def test_rejects_catastrophic_backtracking(tmp_path):
+    path = tmp_path / "patterns.yaml"
+    write(path, "transactions:\n  EVIL:\n    pattern: '(a+)+$'\n    fields: [amount]\n")
+    with pytest.raises(PatternRegistryError, match="backtracking"):
+        load_pattern_set(str(path))
+
+@pytest.mark.parametrize("text", ["- a\n", "transactions:\n  - a\n", "bills: 3\n"])
+def test_rejects_file_that_is_not_a_mapping(tmp_path, text):
+    path = tmp_path / "patterns.yaml"
+    write(path, text)
+    with pytest.raises(PatternRegistryError, match="must be a mapping"):
+        load_pattern_set(str(path))
+
+    write(path, GOOD_YAML)
+    registry = PatternRegistry(str(path), check_interval=0.001)
+    old = registry.current()
+    write(path, text)
+    registry._last_check = 0
+    assert registry.current() is old
+
+def test_reload_on_change_keeps_old_snapshot_usable(tmp_path):
+    path = tmp_path / "patterns.yaml"
+    write(path, GOOD_YAML)
+    registry = PatternRegistry(str(path), check_interval=0.001)
+    old = registry.current()
+
+    write(path, GOOD_YAML.replace("ICICI_CARD", "ICICI_CARD_V2"))
+    registry._last_check = 0
+    new = registry.current()
+    assert new is not old and new.version == old.version + 1
+    assert "ICICI_CARD_V2" in new.transactions
+    # Extractions holding the old snapshot still see a complete, consistent set
+    assert old.select("ICICI Bank Credit Card XX1039")[0] == "ICICI_CARD"
+
+def test_bad_edit_keeps_previous_set(tmp_path):
+    path = tmp_path / "patterns.yaml"
+    write(path, GOOD_YAML)
+    registry = PatternRegistry(str(path), check_interval=0.001)
+    old = registry.current()
+
+    write(path, "transactions:\n  BROKEN:\n    pattern: '('\n")
+    registry._last_check = 0
+    assert registry.current() is old
+    with pytest.raises(PatternRegistryError):
+        registry.reload()
+    assert registry.current() is old
@@ -0,0 +1,37 @@
+import zlib
+
+from quarantine import QuarantineStore
+
+
+def test_background_writes_are_deduplicated_and_queryable(tmp_path):
+    store = QuarantineStore(path=str(tmp_path / "q.db"))
+    assert store.submit("unmatched", "Your a/c XX12 debited Rs 10", "Alert")
+    store.submit("unmatched", "Your a/c XX12 debited Rs 10", "Alert")
+    store.submit("failed", b"\xffraw bytes")
+    store.flush()
+
+    assert store.stats() == {
+        "failed": {"entries": 1, "hits": 1, "bytes": store.recent(reason="failed")[0]["size"]},
+        "unmatched": {"entries": 1, "hits": 2, "bytes": store.recent(reason="unmatched")[0]["size"]},
+    }
+    entry, = store.recent(contains="DEBITED")
+    assert entry["subject"] == "Alert" and entry["hits"] == 2
+    assert store.get(entry["hash"])["body"] == "Your a/c XX12 debited Rs 10"
+
+
+def test_size_cap_evicts_least_recently_seen(tmp_path):
+    # Room for one compressed body, not two
+    store = QuarantineStore(path=str(tmp_path / "q.db"), max_bytes=len(zlib.compress(b"second body", 6)) + 4)
+    store.submit("unmatched", "first body")
+    store.flush()
+    store.submit("unmatched", "second body")
+    store.flush()
+    assert [e["body"] for e in store.recent()] == ["second body"]
+
+
+def test_full_queue_drops_without_blocking(tmp_path):
+    store = QuarantineStore(path=str(tmp_path / "q.db"), queue_size=1)
+    store._writer = object()  # no writer draining the queue
+    assert store.submit("unmatched", "a")
+    assert not store.submit("unmatched", "b")
+    assert store.dropped == 1
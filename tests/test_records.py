@@ -0,0 +1,42 @@
+import hashlib
+from datetime import datetime
+from decimal import Decimal
+
+from records import TransactionRecord
+
+
+def test_from_extracted_normalises_and_defaults():
+    ts = datetime(2025, 9, 9, 9, 28, 13)
+    data = {"amount": "1,149.00", "merchant_name": "  ", "transactiontype": "UPI Payment",
+            "card_number": "1039", "date": "2025-05-09"}
+    txn = TransactionRecord.from_extracted(data, subject="Alert", email_timestamp=ts, imap_server="imap.example")
+
+    assert txn.amount == Decimal("1149.00")
+    assert txn.merchant_name == "unknown"
+    assert txn.transactiontype == "upi"
+    assert txn.currency == "INR"
+    assert txn.category == "unknown"
+    assert txn.extras == {"date": "2025-05-09"}
+    assert txn.message_id == hashlib.sha256(f"Alert{ts}unknown".encode()).hexdigest()
+    assert txn.get("date") == "2025-05-09"
+    assert txn.get("remarks", "-") == "-"
+    assert not hasattr(txn, "__dict__")
+
+
+def test_insert_params_follow_insert_columns():
+    txn = TransactionRecord(amount=Decimal("5"), merchant_name="Shop", message_id="<1@x>")
+    params = dict(zip(TransactionRecord.INSERT_COLUMNS, txn.insert_params()))
+    assert params["message_id"] == "<1@x>"
+    assert params["card_number"] == "0000"
+    assert params["transactiontype"] == "debit"
+
+
+def test_from_row_keeps_stored_values():
+    row = {"email_timestamp": None, "amount": Decimal("10.50"), "merchant_name": None,
+           "transactiontype": "credit", "card_number": None, "category": "food",
+           "account_name": "Savings", "account_type": None}
+    txn = TransactionRecord.from_row(row)
+    assert (txn.amount, txn.merchant_name, txn.category, txn.account_name) == (
+        Decimal("10.50"), "unknown", "food", "Savings"
+    )
+    assert txn.card_number is None and txn.message_id is None
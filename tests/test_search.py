@@ -0,0 +1,63 @@
+from contextlib import contextmanager
+
+import pytest
+
+import app
+import search
+from pagination import decode_cursor, encode_cursor
+
+
+def test_trigram_query_escapes_like_wildcards():
+    sql, params = search.build_query("50%_off", limit=10)
+    assert params["pattern"] == "%50\\%\\_off%"
+    assert "ILIKE %(pattern)s" in sql and "word_similarity" in sql
+    assert params["limit"] == 11
+
+
+def test_text_mode_uses_the_tsvector():
+    sql, params = search.build_query("swiggy -refund", mode="text", category="food")
+    assert "search_tsv @@ websearch_to_tsquery('simple', %(q)s)" in sql
+    assert "ILIKE" not in sql and params["category"] == "food"
+
+
+@pytest.mark.parametrize("kwargs", [{"q": "ab"}, {"q": "   "}, {"q": "swiggy", "mode": "fuzzy"},
+                                    {"q": "swiggy", "after": "junk"}])
+def test_invalid_searches_are_rejected(kwargs):
+    with pytest.raises(search.SearchError):
+        search.build_query(**kwargs)
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def execute(self, sql, params=None):
+        self.queries.append((sql, params))
+
+    def fetchall(self):
+        return self.rows
+
+
+def test_search_endpoint_pages_by_score_then_id(monkeypatch):
+    rows = [{"id": 30 - i, "date": "", "amount": 99, "merchant_name": "Swiggy", "transactiontype": "upi",
+             "card_number": "-", "category": "food", "subject": "", "message_id": f"<{i}>", "score": 1.0 - i / 4}
+            for i in range(3)]
+    cursor = FakeCursor(rows)
+
+    @contextmanager
+    def fake_get_cursor(readonly=False):
+        yield cursor, None
+
+    monkeypatch.setattr(app, "get_cursor", fake_get_cursor)
+    client = app.app.test_client()
+
+    after = encode_cursor(1.0, 31)
+    body = client.get(f"/transactions/search?q=swig&limit=2&after={after}").get_json()
+    assert [t["message_id"] for t in body["transactions"]] == ["<0>", "<1>"]
+    assert decode_cursor(body["next"], 2) == (0.75, 29)
+    sql, params = cursor.queries[-1]
+    assert "(s.score, s.id) < (%(after_score)s::real, %(after_id)s)" in sql
+    assert (params["after_score"], params["after_id"]) == (1.0, 31)
+
+    assert client.get("/transactions/search?q=ab").status_code == 400
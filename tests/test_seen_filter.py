@@ -0,0 +1,97 @@
+import os
+
+from seen_filter import BloomFilter, SeenFilter
+
+
+def test_bloom_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(capacity=10000, error_rate=0.01)
+    for i in range(10000):
+        bloom.add(f"<{i}@bank.example>")
+    assert all(f"<{i}@bank.example>" in bloom for i in range(10000))
+    false_positives = sum(f"<new{i}@bank.example>" in bloom for i in range(10000))
+    assert false_positives < 250
+    assert len(bloom.bits) < 12 * 1024  # ~9.6 bits per id at 1%
+
+
+def test_snapshot_round_trip(tmp_path):
+    seen = SeenFilter(path=str(tmp_path / "seen.bloom"), capacity=1000)
+    seen.bloom = BloomFilter(1000)
+    seen.warm = True
+    seen.complete_until = 1000.0
+    seen.add_many(["<a@x>", "<b@x>", None])
+    assert seen.save()
+    assert not seen.save()  # nothing new since the last snapshot
+
+    bloom, snapshot_at = BloomFilter.from_bytes((tmp_path / "seen.bloom").read_bytes())
+    assert "<a@x>" in bloom and "<b@x>" in bloom and bloom.count == 2
+    # Dated by when the filter was last complete, not by when it was saved
+    assert snapshot_at == 1000.0
+    assert os.listdir(tmp_path) == ["seen.bloom"]
+
+
+class FakeNamedCursor:
+    def __init__(self, rows, log):
+        self.rows, self.log = rows, log
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params):
+        self.sql = sql
+        self.log.append(params)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class FakeConn:
+    def __init__(self, rows):
+        self.rows, self.log = rows, []
+
+    def cursor(self, name=None):
+        self.last_cursor = FakeNamedCursor(self.rows, self.log)
+        return self.last_cursor
+
+
+def test_unwarmed_filter_defers_to_db_then_answers_definite_misses(tmp_path):
+    seen = SeenFilter(path=str(tmp_path / "seen.bloom"), capacity=1000)
+    assert seen.might_contain("<anything@x>")
+    conn = FakeConn([{"message_id": "<1@x>"}, {"message_id": "<2@x>"}])
+    seen.ensure_warm(conn)
+    assert conn.log == [{}]  # no snapshot: full warm
+    assert seen.might_contain("<1@x>") and not seen.might_contain("<3@x>")
+
+    seen.save()
+    restarted = SeenFilter(path=str(tmp_path / "seen.bloom"), capacity=1000)
+    conn = FakeConn([])
+    restarted.ensure_warm(conn)
+    assert "since" in conn.log[0]  # only rows newer than the snapshot are read
+    assert restarted.might_contain("<2@x>")
+
+
+def test_warm_up_reads_every_table_ingestion_checks(tmp_path):
+    seen = SeenFilter(path=str(tmp_path / "seen.bloom"), capacity=1000)
+    conn = FakeConn([])
+    seen.ensure_warm(conn)
+    for table in ("transactions", "bills", "email_notices", "bank_emails"):
+        assert f"FROM {table}" in conn.last_cursor.sql
+
+
+def test_workers_merge_their_saves_and_keep_the_older_coverage_honest(tmp_path):
+    path = str(tmp_path / "seen.bloom")
+    early, late = SeenFilter(path=path, capacity=1000), SeenFilter(path=path, capacity=1000)
+    for seen, complete_until in ((early, 100.0), (late, 200.0)):
+        seen.bloom = BloomFilter(1000)
+        seen.warm = True
+        seen.complete_until = complete_until
+    early.add_many(["<early@x>"])
+    late.add_many(["<late@x>"])
+
+    assert late.save() and early.save()  # the older filter saves last
+
+    bloom, snapshot_at = BloomFilter.from_bytes((tmp_path / "seen.bloom").read_bytes())
+    assert "<early@x>" in bloom and "<late@x>" in bloom
+    assert snapshot_at == 200.0
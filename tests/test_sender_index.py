@@ -0,0 +1,47 @@
+from email_fetcher import fetch_emails
+from sender_index import SenderIndex, index
+
+MAPPING = {
+    "banks": ["Alerts@HDFCBank.net ", "@axis.bank.in", "*.trans.axisbank.com"],
+    "dmat": ["nse_alerts@nse.co.in", "cdslindia.co.in"],
+}
+
+
+def test_exact_domain_and_wildcard_lookup():
+    senders = SenderIndex(MAPPING)
+    assert senders.category("alerts@hdfcbank.net") == "banks"
+    assert senders.category("<ALERTS@HDFCBANK.NET>") == "banks"
+    assert senders.category("alerts@axis.bank.in") == "banks"
+    assert senders.category("cc.alerts@trans.axisbank.com") == "banks"
+    assert senders.category("alerts@mail.trans.axisbank.com") == "banks"
+    assert senders.category("services@cdslindia.co.in") == "dmat"
+    # Domain entries are exact; only wildcard entries cover subdomains
+    assert senders.category("x@evil.axis.bank.in") is None
+    assert senders.category("alerts@axisbank.com") is None
+    assert senders.category("") is None
+
+
+def test_default_index_covers_new_axis_senders():
+    assert index.category("alerts@axis.bank.in") == "banks"
+    assert index.category("bankalerts@kotak.com") == "banks"
+
+
+def test_imap_from_criteria_is_an_or_chain():
+    criteria = SenderIndex(MAPPING).imap_from_criteria(["banks"])
+    assert criteria == ["OR", "OR", "FROM", '"alerts@hdfcbank.net"', "FROM", '"@axis.bank.in"',
+                        "FROM", '"trans.axisbank.com"']
+
+
+class FakeImap:
+    def __init__(self):
+        self.searches = []
+
+    def search(self, charset, *criteria):
+        self.searches.append(criteria)
+        return "OK", [b""]
+
+
+def test_fetch_ands_from_criteria_into_searches():
+    imap = FakeImap()
+    fetch_emails(imap, n_days=3, keywords=["upi"], search_fields=["SUBJECT"], from_criteria=["FROM", '"a@b.c"'])
+    assert imap.searches[0][2:] == ("FROM", '"a@b.c"', "SUBJECT", '"upi"')